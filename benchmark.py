@@ -0,0 +1,503 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+import threading
+import subprocess
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+# 项目根目录，基准测试子进程都在此目录下运行
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# download子命令绝不应该加载的重型模块
+BROWSER_MODULES = ['selenium', 'webdriver_manager']
+
+
+def _run_python(code, repeat):
+    """重复启动Python子进程执行代码，返回每次的耗时（毫秒）和最后一次的标准输出"""
+    timings = []
+    output = ''
+    for _ in range(repeat):
+        start = time.perf_counter()
+        process = subprocess.run(
+            [sys.executable, '-c', code],
+            cwd=PROJECT_DIR,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            timeout=60
+        )
+        timings.append((time.perf_counter() - start) * 1000)
+        if process.returncode != 0:
+            raise Exception(f"子进程执行失败: {process.stderr.decode('utf-8', errors='replace')}")
+        output = process.stdout.decode('utf-8', errors='replace')
+    return timings, output
+
+
+def bench_startup(args):
+    """启动时间基准测试：测量main.py各子命令的导入开销，并检查download路径没有加载浏览器依赖
+
+    Returns:
+        int: 进程退出码，0表示未出现回退
+    """
+    cases = [
+        ('python (空解释器)', 'pass'),
+        ('main.py 参数解析', 'import main; main.build_parser()'),
+        ('download 子命令', 'import main; main._import_downloader()'),
+        ('collect-api 子命令', 'import main; main._import_api_collector()'),
+        ('collect-browser 子命令', 'import main; main._import_selenium_collector()'),
+    ]
+
+    print(f"启动时间基准测试（每项重复 {args.repeat} 次）")
+    print("=" * 60)
+
+    results = {}
+    for label, code in cases:
+        try:
+            timings, _ = _run_python(code, args.repeat)
+        except Exception as e:
+            print(f"{label:<28} 失败: {str(e).strip().splitlines()[-1]}")
+            continue
+        results[label] = {
+            'median_ms': statistics.median(timings),
+            'min_ms': min(timings),
+            'max_ms': max(timings)
+        }
+        print(f"{label:<28} 中位数 {results[label]['median_ms']:8.1f} ms  "
+              f"(最小 {results[label]['min_ms']:.1f} / 最大 {results[label]['max_ms']:.1f})")
+
+    # 检查download路径加载的模块
+    check_code = (
+        "import sys, json, main; main.parse_args(['download', 'BV1xx411c7mD']); main._import_downloader(); "
+        f"print(json.dumps([m for m in {BROWSER_MODULES!r} if m in sys.modules]))"
+    )
+    _, output = _run_python(check_code, 1)
+    leaked = json.loads(output.strip().splitlines()[-1])
+
+    failed = False
+    print("=" * 60)
+    if leaked:
+        print(f"✗ download 子命令加载了浏览器依赖: {', '.join(leaked)}")
+        failed = True
+    else:
+        print("✓ download 子命令未加载浏览器依赖")
+
+    download_result = results.get('download 子命令')
+    if args.max_ms and download_result:
+        if download_result['median_ms'] > args.max_ms:
+            print(f"✗ download 子命令启动耗时 {download_result['median_ms']:.1f} ms 超过阈值 {args.max_ms} ms")
+            failed = True
+        else:
+            print(f"✓ download 子命令启动耗时在阈值 {args.max_ms} ms 以内")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'startup': results, 'leaked_modules': leaked}, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存到: {args.json}")
+
+    return 1 if failed else 0
+
+
+def _run_downloads(server_url, bvids, workers, output_dir):
+    """用共享的MetricsRecorder并发下载一组视频，返回 (MetricsRecorder, 耗时秒数)"""
+    from bilibili_downloader import BilibiliDownloader
+    from bilibili_metrics import MetricsRecorder
+
+    metrics = MetricsRecorder()
+    local = threading.local()
+
+    def download(bvid):
+        # 每个工作线程复用一个下载器（requests会话不是线程安全的）
+        downloader = getattr(local, 'downloader', None)
+        if downloader is None:
+            downloader = local.downloader = BilibiliDownloader(api_base=server_url, metrics=metrics)
+        return downloader.download_video(bvid, output_dir=output_dir)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for path in executor.map(download, bvids):
+            # 立即删除输出文件，避免批量测试占用过多磁盘
+            if path and os.path.exists(path):
+                os.remove(path)
+    return metrics, time.perf_counter() - start
+
+
+def _summarize_run(label, metrics, elapsed):
+    """汇总一轮下载的吞吐量和各阶段平均耗时"""
+    data = metrics.to_dict()
+    videos = data['videos']
+    total_bytes = sum(data['bytes_total'].values())
+    phases = {}
+    for video in videos:
+        for name, seconds in video['phases'].items():
+            phases.setdefault(name, []).append(seconds)
+    return {
+        'label': label,
+        'videos': len(videos),
+        'success': data['results']['success'],
+        'failure': data['results']['failure'],
+        'elapsed_seconds': elapsed,
+        'bytes': total_bytes,
+        'mb_per_second': total_bytes / elapsed / 1024 / 1024 if elapsed > 0 else 0.0,
+        'videos_per_hour': data['results']['success'] / elapsed * 3600 if elapsed > 0 else 0.0,
+        'phase_mean_seconds': {name: statistics.mean(values) for name, values in phases.items()}
+    }
+
+
+def _print_run(result):
+    """打印一轮下载的结果"""
+    print(f"{result['label']}: {result['success']}/{result['videos']} 成功, "
+          f"耗时 {result['elapsed_seconds']:.2f} 秒")
+    print(f"  吞吐量 {result['mb_per_second']:8.1f} MB/s   {result['videos_per_hour']:10.0f} 视频/小时")
+    phases = result['phase_mean_seconds']
+    order = ['info', 'probe', 'select', 'video', 'audio', 'merge', 'total']
+    breakdown = '  '.join(f"{name}={phases[name] * 1000:.1f}ms" for name in order if name in phases)
+    print(f"  各阶段平均耗时: {breakdown}")
+
+
+def bench_throughput(args):
+    """端到端吞吐量基准测试：在本地模拟B站API + CDN服务器上运行单视频和批量下载
+
+    Returns:
+        int: 进程退出码，0表示全部下载成功且未低于阈值
+    """
+    # 进度条和下载日志会干扰计时和输出
+    os.environ.setdefault('TQDM_DISABLE', '1')
+    logging.basicConfig(level=logging.ERROR, format='%(asctime)s [%(levelname)s] %(message)s', datefmt='%H:%M:%S')
+
+    from bilibili_mock_server import MockBilibiliServer, MockBilibiliConfig, parse_size
+
+    config = MockBilibiliConfig(
+        video_size=parse_size(args.video_size),
+        audio_size=parse_size(args.audio_size),
+        bandwidth=parse_size(args.bandwidth) if args.bandwidth else None,
+        latency=args.latency,
+        max_height=args.max_height,
+        api_rate_limit=args.api_rate_limit
+    )
+
+    print("端到端吞吐量基准测试（本地模拟服务器）")
+    print(f"视频流 {args.video_size} / 音频流 {args.audio_size} / 每连接带宽 {args.bandwidth or '不限'} / "
+          f"延迟 {args.latency * 1000:.0f} ms / 最高 {args.max_height}P")
+    print("=" * 60)
+
+    results = []
+    failed = False
+    with MockBilibiliServer(config) as server, tempfile.TemporaryDirectory(prefix='bili_bench_') as output_dir:
+        runs = [('单视频', [f'BV1bench{0:05d}'], 1)]
+        if args.videos > 1:
+            bvids = [f'BV1bench{i:05d}' for i in range(args.videos)]
+            runs.append((f'批量 {args.videos} 个视频 / {args.workers} 线程', bvids, args.workers))
+
+        for label, bvids, workers in runs:
+            for round_index in range(args.repeat):
+                server.state.reset()
+                metrics, elapsed = _run_downloads(server.url, bvids, workers, output_dir)
+                result = _summarize_run(label, metrics, elapsed)
+                result['round'] = round_index + 1
+                result['server'] = server.state.snapshot()
+                results.append(result)
+                _print_run(result)
+                if result['failure']:
+                    failed = True
+
+    print("=" * 60)
+    if failed:
+        print("✗ 存在下载失败的视频")
+    if args.min_mbps:
+        worst = min(r['mb_per_second'] for r in results)
+        if worst < args.min_mbps:
+            print(f"✗ 最低吞吐量 {worst:.1f} MB/s 低于阈值 {args.min_mbps} MB/s")
+            failed = True
+        else:
+            print(f"✓ 吞吐量不低于阈值 {args.min_mbps} MB/s")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'config': config.to_dict(), 'throughput': results}, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存到: {args.json}")
+
+    return 1 if failed else 0
+
+
+def bench_faults(args):
+    """故障注入基准测试：在会随机返回错误、重置/截断连接、忽略Range和停顿的模拟服务器上批量下载，
+    统计有效吞吐量（goodput）、浪费的字节数和全部完成所需时间
+
+    每个视频失败后会重新调用download_video，最多 --attempts 次，模拟用户重跑失败任务。
+
+    Returns:
+        int: 进程退出码，0表示全部视频最终下载成功且内容完整
+    """
+    os.environ.setdefault('TQDM_DISABLE', '1')
+    logging.basicConfig(level=logging.CRITICAL, format='%(asctime)s [%(levelname)s] %(message)s', datefmt='%H:%M:%S')
+
+    from bilibili_downloader import BilibiliDownloader
+    from bilibili_metrics import MetricsRecorder
+    from bilibili_retry import get_default_retrier
+    from bilibili_mock_server import MockBilibiliServer, MockBilibiliConfig, parse_size, fault_config_from_args
+
+    faults = fault_config_from_args(args)
+    config = MockBilibiliConfig(
+        video_size=parse_size(args.video_size),
+        audio_size=parse_size(args.audio_size),
+        bandwidth=parse_size(args.bandwidth) if args.bandwidth else None,
+        faults=faults
+    )
+
+    print("故障注入基准测试（本地模拟服务器）")
+    print(f"{args.videos} 个视频 / {args.workers} 线程 / 每个视频最多 {args.attempts} 次 / "
+          f"视频流 {args.video_size} / 音频流 {args.audio_size}")
+    print("故障: " + ', '.join(f"{k}={v}" for k, v in faults.to_dict().items() if k != 'error_statuses'))
+    print("=" * 60)
+
+    metrics = MetricsRecorder()
+    local = threading.local()
+    attempts = {}
+    attempts_lock = threading.Lock()
+
+    with MockBilibiliServer(config) as server, tempfile.TemporaryDirectory(prefix='bili_faults_') as output_dir:
+        def download(bvid):
+            downloader = getattr(local, 'downloader', None)
+            if downloader is None:
+                downloader = local.downloader = BilibiliDownloader(api_base=server.url, metrics=metrics)
+            for attempt in range(1, args.attempts + 1):
+                with attempts_lock:
+                    attempts[bvid] = attempt
+                path = downloader.download_video(bvid, output_dir=output_dir)
+                if path:
+                    if os.path.exists(path):
+                        os.remove(path)
+                    return True
+            return False
+
+        bvids = [f'BV1fault{i:05d}' for i in range(args.videos)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            outcomes = dict(zip(bvids, executor.map(download, bvids)))
+        elapsed = time.perf_counter() - start
+        server_stats = server.state.snapshot()
+
+    # 成功视频的有效字节 = 其被请求的媒体文件完整大小之和；写入字节数与之不符视为内容损坏
+    transferred = {}
+    for video in metrics.videos:
+        if video.success:
+            transferred[video.bvid] = sum(t['bytes'] for t in video.transfers.values())
+    useful_bytes = 0
+    corrupted = []
+    for bvid, ok in outcomes.items():
+        if not ok:
+            continue
+        expected = sum(server_stats['media_sizes'].get(bvid, {}).values())
+        useful_bytes += expected
+        if transferred.get(bvid) != expected:
+            corrupted.append(bvid)
+
+    media_bytes = server_stats['media_bytes_sent']
+    wasted_bytes = max(0, media_bytes - useful_bytes)
+    succeeded = sum(1 for ok in outcomes.values() if ok)
+    result = {
+        'videos': args.videos,
+        'success': succeeded,
+        'failure': args.videos - succeeded,
+        'corrupted': corrupted,
+        'download_video_calls': sum(attempts.values()),
+        'elapsed_seconds': elapsed,
+        'useful_bytes': useful_bytes,
+        'media_bytes_sent': media_bytes,
+        'wasted_bytes': wasted_bytes,
+        'wasted_ratio': wasted_bytes / media_bytes if media_bytes else 0.0,
+        'goodput_mb_per_second': useful_bytes / elapsed / 1024 / 1024 if elapsed > 0 else 0.0,
+        'requests': server_stats['requests'],
+        'faults_injected': server_stats['faults'],
+        'retrier': dict(get_default_retrier().stats)
+    }
+
+    print(f"完成: {succeeded}/{args.videos} 成功, download_video 调用 {result['download_video_calls']} 次, "
+          f"总耗时 {elapsed:.2f} 秒")
+    print(f"有效吞吐量 (goodput): {result['goodput_mb_per_second']:.1f} MB/s")
+    print(f"媒体传输 {media_bytes / 1024 / 1024:.1f} MB, 有效 {useful_bytes / 1024 / 1024:.1f} MB, "
+          f"浪费 {wasted_bytes / 1024 / 1024:.1f} MB ({result['wasted_ratio'] * 100:.1f}%)")
+    print("请求数: " + ', '.join(f"{k}={v}" for k, v in sorted(result['requests'].items())))
+    print("已注入故障: " + (', '.join(f"{k}={v}" for k, v in sorted(result['faults_injected'].items())) or '无'))
+    print("重试组件: " + ', '.join(f"{k}={v}" for k, v in result['retrier'].items()))
+    print("=" * 60)
+
+    failed = False
+    if result['failure']:
+        print(f"✗ {result['failure']} 个视频在 {args.attempts} 次尝试后仍然失败")
+        failed = True
+    if corrupted:
+        print(f"✗ {len(corrupted)} 个视频下载内容大小与源文件不一致: {', '.join(corrupted)}")
+        failed = True
+    if args.max_wasted_ratio is not None and result['wasted_ratio'] > args.max_wasted_ratio:
+        print(f"✗ 浪费比例 {result['wasted_ratio']:.2f} 超过阈值 {args.max_wasted_ratio}")
+        failed = True
+    if not failed:
+        print("✓ 全部视频下载成功且内容完整")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'config': config.to_dict(), 'faults': result}, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存到: {args.json}")
+
+    return 1 if failed else 0
+
+
+def _measure_browser(collector, url, scrolls, profile_dir):
+    """启动一个浏览器，测量页面加载和逐屏滚动的耗时，返回结果字典，浏览器启动失败时返回None"""
+    from bilibili_page_waits import wait_for_settled
+    from bilibili_video_collector_selenium import SCROLL_SETTLE_TIMEOUT
+
+    start = time.perf_counter()
+    driver = collector._create_driver('benchmark', headless=True, profile_dir=profile_dir)
+    if driver is None:
+        return None
+    try:
+        launch = time.perf_counter() - start
+
+        start = time.perf_counter()
+        driver.get(url)
+        wait_for_settled(driver, timeout=30)
+        load = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(scrolls):
+            driver.execute_script("window.scrollBy(0, window.innerHeight);")
+            wait_for_settled(driver, timeout=SCROLL_SETTLE_TIMEOUT)
+        scroll = time.perf_counter() - start
+
+        heap = driver.execute_script("return (performance.memory && performance.memory.usedJSHeapSize) || 0;")
+        links = driver.execute_script("return document.querySelectorAll('a[href*=\"/video/BV\"]').length;")
+        return {'launch_seconds': launch, 'load_seconds': load, 'scroll_seconds': scroll,
+                'js_heap_mb': (heap or 0) / 1024 / 1024, 'video_links': links}
+    finally:
+        driver.quit()
+
+
+def bench_browser(args):
+    """浏览器基准测试：对比默认浏览器和精简浏览器（--lean）打开UP主空间页、逐屏滚动的耗时和传输量
+
+    默认在本地模拟服务器的简化空间页面上测试（引用封面、头像、字体、预览视频），指定 --url 时测试真实页面。
+
+    Returns:
+        int: 进程退出码，0表示测试完成
+    """
+    logging.basicConfig(level=logging.ERROR, format='%(asctime)s [%(levelname)s] %(message)s', datefmt='%H:%M:%S')
+
+    from bilibili_mock_server import MockBilibiliServer, MockBilibiliConfig, parse_size
+    from bilibili_video_collector_selenium import BilibiliVideoCollectorSelenium
+
+    config = MockBilibiliConfig(
+        bandwidth=parse_size(args.bandwidth) if args.bandwidth else None,
+        latency=args.latency,
+        up_video_count=args.cards,
+        asset_size=parse_size(args.asset_size),
+        space_page_size=args.cards
+    )
+
+    print("浏览器基准测试：默认 vs 精简模式")
+    print("=" * 60)
+
+    results = {}
+    with MockBilibiliServer(config) as server:
+        url = args.url or f"{server.url}/space/{args.uid}/video"
+        print(f"页面: {url}  滚动 {args.scrolls} 屏  每种模式 {args.repeat} 轮")
+        for label, lean in (('默认', False), ('精简', True)):
+            collector = BilibiliVideoCollectorSelenium(lean=lean)
+            runs = []
+            for _ in range(args.repeat):
+                server.state.reset()
+                # 每轮使用全新的用户数据目录，避免缓存影响结果
+                with tempfile.TemporaryDirectory(prefix='bili_browser_') as profile_dir:
+                    run = _measure_browser(collector, url, args.scrolls, profile_dir)
+                if run is None:
+                    print("✗ 无法启动浏览器，请确认已安装Chrome和对应版本的chromedriver")
+                    return 1
+                run['bytes'] = server.state.snapshot()['bytes_sent']
+                runs.append(run)
+            summary = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+            results[label] = {'median': summary, 'runs': runs}
+            print(f"{label}: 启动 {summary['launch_seconds']:.2f}s  加载 {summary['load_seconds']:.2f}s  "
+                  f"滚动 {summary['scroll_seconds']:.2f}s  JS堆 {summary['js_heap_mb']:.1f}MB  "
+                  f"视频链接 {summary['video_links']:.0f}"
+                  + ('' if args.url else f"  传输 {summary['bytes'] / 1024 / 1024:.1f}MB"))
+
+    default, lean = results['默认']['median'], results['精简']['median']
+    print("=" * 60)
+    for key, name in (('load_seconds', '加载'), ('scroll_seconds', '滚动')):
+        if lean[key] > 0:
+            print(f"{name}耗时: 精简模式快 {default[key] / lean[key]:.2f} 倍")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'config': config.to_dict(), 'url': url, 'browser': results}, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存到: {args.json}")
+    return 0
+
+
+def main():
+    """基准测试入口"""
+    from bilibili_mock_server import add_fault_arguments
+
+    parser = argparse.ArgumentParser(description='B站视频工具 - 性能基准测试')
+    subparsers = parser.add_subparsers(dest='benchmark', metavar='<benchmark>')
+    subparsers.required = True
+
+    startup_parser = subparsers.add_parser('startup', help='测量main.py各子命令的启动时间')
+    startup_parser.add_argument('--repeat', type=int, default=10, help='每项重复次数')
+    startup_parser.add_argument('--max-ms', type=float, default=None,
+                                help='download子命令启动耗时中位数阈值（毫秒），超过则以非零状态退出')
+    startup_parser.add_argument('--json', type=str, default=None, help='将结果保存为JSON文件')
+    startup_parser.set_defaults(handler=bench_startup)
+
+    throughput_parser = subparsers.add_parser('throughput', help='在本地模拟服务器上测量单视频和批量下载吞吐量')
+    throughput_parser.add_argument('--videos', type=int, default=8, help='批量测试的视频数量，1表示只测单视频')
+    throughput_parser.add_argument('--workers', type=int, default=4, help='批量测试的并发下载线程数')
+    throughput_parser.add_argument('--repeat', type=int, default=1, help='每项重复轮数')
+    throughput_parser.add_argument('--video-size', type=str, default='64M', help='最高画质视频流大小，如 64M')
+    throughput_parser.add_argument('--audio-size', type=str, default='4M', help='最高音质音频流大小，如 4M')
+    throughput_parser.add_argument('--bandwidth', type=str, default=None, help='每个连接的带宽上限（字节/秒），如 10M')
+    throughput_parser.add_argument('--latency', type=float, default=0.0, help='模拟服务器每个请求的响应延迟（秒）')
+    throughput_parser.add_argument('--max-height', type=int, default=2160,
+                                   help='模拟服务器返回的最高分辨率，低于2160时会触发完整的探测流程')
+    throughput_parser.add_argument('--api-rate-limit', type=float, default=None,
+                                   help='模拟服务器API接口的持续速率上限（次/秒），超出时返回412风控')
+    throughput_parser.add_argument('--min-mbps', type=float, default=None,
+                                   help='吞吐量阈值（MB/s），任一轮低于该值则以非零状态退出')
+    throughput_parser.add_argument('--json', type=str, default=None, help='将结果保存为JSON文件')
+    throughput_parser.set_defaults(handler=bench_throughput)
+
+    faults_parser = subparsers.add_parser('faults', help='在注入故障的模拟服务器上测量重试与断点续传的效果')
+    faults_parser.add_argument('--videos', type=int, default=8, help='下载的视频数量')
+    faults_parser.add_argument('--workers', type=int, default=2, help='并发下载线程数')
+    faults_parser.add_argument('--attempts', type=int, default=3, help='每个视频最多调用download_video的次数')
+    faults_parser.add_argument('--video-size', type=str, default='16M', help='最高画质视频流大小，如 16M')
+    faults_parser.add_argument('--audio-size', type=str, default='2M', help='最高音质音频流大小，如 2M')
+    faults_parser.add_argument('--bandwidth', type=str, default=None, help='每个连接的带宽上限（字节/秒），如 10M')
+    add_fault_arguments(faults_parser)
+    faults_parser.add_argument('--max-wasted-ratio', type=float, default=None,
+                               help='浪费字节占媒体传输总量的比例阈值，超过则以非零状态退出')
+    faults_parser.add_argument('--json', type=str, default=None, help='将结果保存为JSON文件')
+    faults_parser.set_defaults(handler=bench_faults)
+
+    browser_parser = subparsers.add_parser('browser', help='对比默认浏览器和精简浏览器打开空间页、滚动的耗时')
+    browser_parser.add_argument('--uid', type=int, default=123, help='模拟空间页面的UP主UID')
+    browser_parser.add_argument('--url', type=str, default=None, help='测试指定的页面（如真实的UP主空间页），不使用模拟服务器')
+    browser_parser.add_argument('--cards', type=int, default=30, help='模拟空间页面的视频卡片数量')
+    browser_parser.add_argument('--scrolls', type=int, default=5, help='加载完成后逐屏滚动的次数')
+    browser_parser.add_argument('--repeat', type=int, default=3, help='每种模式重复轮数')
+    browser_parser.add_argument('--asset-size', type=str, default='64K', help='模拟页面中每个图片/字体/视频资源的大小')
+    browser_parser.add_argument('--bandwidth', type=str, default='4M', help='模拟服务器每个连接的带宽上限（字节/秒）')
+    browser_parser.add_argument('--latency', type=float, default=0.02, help='模拟服务器每个请求的响应延迟（秒）')
+    browser_parser.add_argument('--json', type=str, default=None, help='将结果保存为JSON文件')
+    browser_parser.set_defaults(handler=bench_browser)
+
+    args = parser.parse_args()
+    sys.exit(args.handler(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+import os
+import json
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from bilibili_retry import get_default_retrier
+from bilibili_pacer import get_default_pacer
+from bilibili_video_collector_api import IncompleteListError
+
+logger = logging.getLogger(__name__)
+
+# 批量收集支持的列表获取方式
+BATCH_METHODS = ('api', 'hybrid', 'browser')
+
+
+def read_uid_file(path):
+    """读取UID列表文件：每行一个UID，忽略空行和 # 开头的注释，重复的UID只保留第一次出现
+
+    Args:
+        path: UID文件路径
+
+    Returns:
+        UID字符串列表
+    """
+    uids = []
+    seen = set()
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            uid = line.split('#', 1)[0].strip()
+            if not uid:
+                continue
+            if not uid.isdigit():
+                logger.warning("UID文件第 %s 行不是有效的UID，已跳过: %s", line_number, uid)
+                continue
+            if uid not in seen:
+                seen.add(uid)
+                uids.append(uid)
+    return uids
+
+
+class BatchCatalog:
+    """批量收集的输出目录文件（JSON Lines），所有工作线程共享
+
+    每个UP主收集完成后立即追加一行记录并刷新到磁盘，进程中断时已完成的UP主不会丢失；
+    同一UID出现多次时以最后一条记录为准。
+    """
+
+    def __init__(self, path):
+        """初始化输出目录文件
+
+        Args:
+            path: JSONL文件路径，不存在时自动创建
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def load(self):
+        """读取已有记录
+
+        Returns:
+            dict: UID -> 最后一条记录
+        """
+        records = {}
+        if not os.path.exists(self.path):
+            return records
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # 进程被杀死时最后一行可能不完整
+                    continue
+                records[str(record.get('uid'))] = record
+        return records
+
+    def completed_uids(self):
+        """已成功收集过的UID集合"""
+        return {uid for uid, record in self.load().items() if record.get('status') == 'ok'}
+
+    def append(self, record):
+        """追加一条UP主记录"""
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+                f.flush()
+
+
+class BatchCollector:
+    """多UP主批量收集：N个工作线程并发收集，共享同一个请求节奏控制器和输出目录文件
+
+    单个UP主失败只记录在目录文件中，不会中断整个批次；视频列表中途获取失败的UP主记录为partial
+    （保存已获取的部分），与失败的UP主一样会在 --resume 时重新收集。
+    """
+
+    def __init__(self, catalog, method='api', workers=4, max_videos=None, cookie_path=None, proxy=None,
+                 retrier=None, pacer=None, api_base='https://api.bilibili.com', headless=True, lean=True,
+                 video_catalog=None, metrics=None, profiler=None):
+        """初始化批量收集器
+
+        Args:
+            catalog: BatchCatalog实例
+            method: 视频列表获取方式，'api'、'hybrid'（浏览器获取Cookie + HTTP分页）或 'browser'（浏览器网络捕获）
+            workers: 并发收集的UP主数量
+            max_videos: 每个UP主最大获取视频数量，None表示获取全部
+            cookie_path: Cookie文件路径
+            proxy: 代理设置，如 http://127.0.0.1:7890
+            retrier: Retrier实例，None表示使用进程内共享的重试组件
+            pacer: AdaptivePacer实例，所有工作线程共享，None表示使用进程内共享的节奏控制器
+            api_base: API根地址，基准测试时可指向本地模拟服务器
+            headless: 浏览器是否使用无头模式（hybrid/browser）
+            lean: 是否使用精简浏览器（hybrid/browser）
+            video_catalog: VideoCatalog实例，成功收集的视频元数据同时写入SQLite目录，None表示不写入
+            metrics: MetricsRecorder实例，批次结束时写入各状态的UP主数、视频数和请求速率，None表示不记录
+            profiler: PhaseProfiler实例，按UP主剖析获取UP主信息和视频列表的阶段，None表示不剖析
+        """
+        if method not in BATCH_METHODS:
+            raise ValueError(f"不支持的收集方式: {method}")
+        self.catalog = catalog
+        self.method = method
+        self.workers = max(1, workers)
+        self.max_videos = max_videos
+        self.headless = headless
+        self.video_catalog = video_catalog
+        self.metrics = metrics
+        self.profiler = profiler
+        self.retrier = retrier if retrier is not None else get_default_retrier()
+        self.pacer = pacer if pacer is not None else get_default_pacer()
+        self.browser_pool = None
+        self.stats = {'ok': 0, 'empty': 0, 'partial': 0, 'error': 0, 'skipped': 0, 'videos': 0}
+        self._stats_lock = threading.Lock()
+
+        # 所有工作线程共用一个收集器实例，请求都经过同一个重试组件和节奏控制器
+        if method == 'api':
+            from bilibili_video_collector_api import BilibiliVideoCollectorAPI
+            self.collector = BilibiliVideoCollectorAPI(cookie_path, proxy, retrier=self.retrier, pacer=self.pacer,
+                                                       api_base=api_base)
+        elif method == 'hybrid':
+            from bilibili_video_collector_hybrid import BilibiliVideoCollectorHybrid
+            self.collector = BilibiliVideoCollectorHybrid(cookie_path, proxy, metrics=metrics, profiler=profiler,
+                                                          retrier=self.retrier, pacer=self.pacer, api_base=api_base,
+                                                          headless=headless, lean=lean)
+        else:
+            from bilibili_video_collector_selenium import BilibiliVideoCollectorSelenium
+            self.collector = BilibiliVideoCollectorSelenium(cookie_path, proxy, metrics=metrics, profiler=profiler,
+                                                            retrier=self.retrier, pacer=self.pacer, lean=lean)
+            self.browser_pool = self.collector.create_browser_pool(self.workers, headless, capture_network=True)
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def _profile_phase(self, uid, phase):
+        """切换到当前线程的下一个剖析阶段，phase为None时结束当前阶段（未启用剖析时不做任何事）"""
+        if self.profiler is None:
+            return
+        if phase is None:
+            self.profiler.stop()
+        else:
+            self.profiler.switch(f'uid_{uid}', phase)
+
+    def _list_videos(self, uid):
+        """获取视频列表，中途失败时保留已获取的部分
+
+        Returns:
+            tuple: (视频信息字典列表, 列表不完整时的错误信息或None)
+        """
+        videos = []
+        try:
+            for video in self.collector.iter_up_videos(uid, self.max_videos):
+                videos.append(video)
+        except IncompleteListError as e:
+            return videos, str(e)
+        return videos, None
+
+    def _collect(self, uid):
+        """按配置的方式获取一个UP主的信息和视频列表
+
+        Returns:
+            tuple: (UP主信息字典, 视频信息字典列表, 列表不完整时的错误信息或None)
+        """
+        error = None
+        if self.method == 'api':
+            self._profile_phase(uid, 'up_info')
+            up_info = self.collector.get_up_info(uid)
+            self._profile_phase(uid, 'list')
+            videos, error = self._list_videos(uid)
+        elif self.method == 'hybrid':
+            self._profile_phase(uid, 'bootstrap')
+            self.collector.ensure_bootstrapped(uid)
+            self._profile_phase(uid, 'up_info')
+            up_info = self.collector.api.get_up_info(uid)
+            self._profile_phase(uid, 'list')
+            videos, error = self._list_videos(uid)
+        else:
+            # 浏览器收集的页面加载、翻页等阶段由Selenium收集器自己剖析
+            self._profile_phase(uid, 'up_info')
+            up_info = self.collector.get_up_info(uid)
+            self._profile_phase(uid, None)
+            videos, page_up_info = self.collector.get_videos_by_network(uid, self.max_videos, self.headless)
+            if up_info.get('name', '').startswith('未知用户') and page_up_info:
+                up_info.update(page_up_info)
+        return up_info, videos, error
+
+    def collect_one(self, uid):
+        """收集一个UP主并写入目录文件，任何异常都只记录为该UP主的失败
+
+        Returns:
+            dict: 写入目录文件的记录
+        """
+        start = time.monotonic()
+        record = {'uid': str(uid), 'method': self.method}
+        try:
+            try:
+                up_info, videos, error = self._collect(uid)
+            finally:
+                self._profile_phase(uid, None)
+            if error is not None:
+                # 列表不完整：已获取部分视频时记录为partial，一个都没有获取到时记录为失败
+                logger.warning("UP主 %s 的视频列表不完整（已获取 %s 个）: %s", uid, len(videos), error)
+                status = 'partial' if videos else 'error'
+                record['error'] = error
+            else:
+                status = 'ok' if videos else 'empty'
+            record.update({
+                'status': status,
+                'up_info': up_info,
+                'total_videos': len(videos),
+                'videos': videos
+            })
+            if videos and self.video_catalog is not None:
+                self.video_catalog.record_collection(uid, up_info, videos)
+        except Exception as e:
+            logger.error("收集UP主 %s 失败: %s", uid, e)
+            record.update({'status': 'error', 'error': str(e), 'total_videos': 0, 'videos': []})
+        record['collect_time'] = time.strftime('%Y-%m-%d %H:%M:%S')
+        record['elapsed'] = round(time.monotonic() - start, 3)
+
+        try:
+            self.catalog.append(record)
+        except Exception as e:
+            logger.error("写入目录文件失败 (UID %s): %s", uid, e)
+        self._count(record['status'])
+        self._count('videos', record['total_videos'])
+        return record
+
+    def run(self, uids, resume=False):
+        """并发收集所有UP主
+
+        Args:
+            uids: UID列表
+            resume: 是否跳过目录文件中已成功收集的UID
+
+        Returns:
+            dict: 统计信息（成功/无视频/不完整/失败/跳过的UP主数，视频总数，耗时）
+        """
+        uids = [str(uid) for uid in uids]
+        if resume:
+            completed = self.catalog.completed_uids()
+            pending = [uid for uid in uids if uid not in completed]
+            self._count('skipped', len(uids) - len(pending))
+            uids = pending
+        logger.info("开始批量收集 %s 个UP主，%s 个工作线程，方式: %s", len(uids), self.workers, self.method)
+
+        start = time.monotonic()
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='batch') as executor:
+                futures = {executor.submit(self.collect_one, uid): uid for uid in uids}
+                for done, future in enumerate(as_completed(futures), 1):
+                    record = future.result()
+                    logger.info("[%s/%s] UP主 %s: %s，%s 个视频，当前请求速率 %.2f 次/秒", done, len(uids),
+                                record['uid'], record['status'], record['total_videos'], self.pacer.rate)
+        finally:
+            if self.browser_pool is not None:
+                self.browser_pool.close()
+
+        stats = dict(self.stats)
+        stats['elapsed'] = round(time.monotonic() - start, 3)
+        self._export_gauges(stats)
+        return stats
+
+    def _export_gauges(self, stats):
+        """把批次统计写入MetricsRecorder"""
+        if self.metrics is None:
+            return
+        for key in ('ok', 'empty', 'partial', 'error', 'skipped'):
+            self.metrics.set_gauge(f'batch_up_{key}', stats[key])
+        self.metrics.set_gauge('batch_videos', stats['videos'])
+        self.metrics.set_gauge('batch_elapsed_seconds', stats['elapsed'])
+        self.metrics.set_gauge('api_request_rate', self.pacer.rate)
@@ -0,0 +1,206 @@
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# 读取当前页面的JS堆内存（Chrome专有的performance.memory），单位字节
+_JS_HEAP_JS = "return (performance.memory && performance.memory.usedJSHeapSize) || 0;"
+
+
+class PooledBrowser:
+    """浏览器池中的一个浏览器实例"""
+
+    def __init__(self, driver, index, profile_dir):
+        """初始化池中的浏览器实例
+
+        Args:
+            driver: WebDriver实例
+            index: 实例序号，决定用户数据目录和调试端口
+            profile_dir: 该实例独占的用户数据目录
+        """
+        self.driver = driver
+        self.index = index
+        self.profile_dir = profile_dir
+        self.uses = 0
+        self.created_at = time.monotonic()
+
+
+class BrowserPool:
+    """长期存活的浏览器池，供多个UP主的收集任务借出和归还
+
+    每个实例使用独立的用户数据目录，可以并行运行，登录状态保存在各自目录中，重启后仍然有效。
+    归还时检查实例健康状况，使用次数或页面内存超过阈值的实例会被关闭，下次借出时重新启动。
+    """
+
+    def __init__(self, factory, size=2, max_uses=20, max_memory_mb=1024, profile_root=None):
+        """初始化浏览器池
+
+        Args:
+            factory: 创建浏览器的函数 factory(profile_dir, index) -> WebDriver，失败时返回None
+            size: 池中最多同时存在的浏览器数量
+            max_uses: 单个浏览器最多被借出的次数，达到后回收
+            max_memory_mb: 页面JS堆内存超过该值（MB）时回收，None表示不检查
+            profile_root: 各实例用户数据目录的父目录，默认为项目目录下的 chrome_profile_pool
+        """
+        self.factory = factory
+        self.size = size
+        self.max_uses = max_uses
+        self.max_memory_mb = max_memory_mb
+        self.profile_root = profile_root or os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                         'chrome_profile_pool')
+        self._idle = []
+        self._free_indexes = list(range(size))
+        self._condition = threading.Condition()
+        self._closed = False
+        self.stats = {'launched': 0, 'acquired': 0, 'recycled': 0, 'unhealthy': 0, 'launch_failed': 0}
+
+    def _count(self, key):
+        with self._condition:
+            self.stats[key] += 1
+
+    def _launch(self, index):
+        """启动序号为index的浏览器，失败时返回None"""
+        profile_dir = os.path.join(self.profile_root, f'browser_{index}')
+        os.makedirs(profile_dir, exist_ok=True)
+        logger.info("浏览器池启动第 %s 个浏览器...", index + 1)
+        try:
+            driver = self.factory(profile_dir, index)
+        except Exception as e:
+            logger.error("浏览器池启动浏览器失败: %s", e)
+            driver = None
+        if driver is None:
+            self._count('launch_failed')
+            return None
+        self._count('launched')
+        return PooledBrowser(driver, index, profile_dir)
+
+    def is_healthy(self, browser):
+        """浏览器是否仍可用（会话存在且能执行脚本）"""
+        try:
+            return browser.driver.execute_script("return 1;") == 1
+        except Exception as e:
+            logger.debug("浏览器 %s 健康检查失败: %s", browser.index, e)
+            return False
+
+    def memory_mb(self, browser):
+        """浏览器当前页面的JS堆内存（MB），无法读取时返回0"""
+        try:
+            return (browser.driver.execute_script(_JS_HEAP_JS) or 0) / 1024 / 1024
+        except Exception:
+            return 0
+
+    def _quit(self, browser):
+        try:
+            browser.driver.quit()
+        except Exception as e:
+            logger.debug("关闭浏览器 %s 时出错: %s", browser.index, e)
+
+    def acquire(self, timeout=None):
+        """借出一个浏览器，池中没有空闲实例且已达到上限时等待其他任务归还
+
+        Args:
+            timeout: 最长等待时间（秒），None表示一直等待
+
+        Returns:
+            PooledBrowser，超时或启动失败时返回None
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._condition:
+                while not self._idle and not self._free_indexes:
+                    if self._closed:
+                        return None
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return None
+                    self._condition.wait(remaining)
+                if self._closed:
+                    return None
+                browser = self._idle.pop() if self._idle else None
+                index = None if browser else self._free_indexes.pop(0)
+
+            if browser is None:
+                # 在锁外启动浏览器，避免阻塞其他任务借还
+                browser = self._launch(index)
+                if browser is None:
+                    self._return_index(index)
+                    return None
+            elif not self.is_healthy(browser):
+                self._count('unhealthy')
+                logger.warning("浏览器 %s 已失效，重新启动", browser.index)
+                self._quit(browser)
+                self._return_index(browser.index)
+                continue
+
+            browser.uses += 1
+            self._count('acquired')
+            return browser
+
+    def _return_index(self, index):
+        with self._condition:
+            self._free_indexes.append(index)
+            self._condition.notify()
+
+    def release(self, browser, broken=False):
+        """归还浏览器，失效、使用次数过多或内存过高的实例会被关闭
+
+        Args:
+            browser: acquire()返回的PooledBrowser
+            broken: 调用方是否确定该实例已不可用
+        """
+        if browser is None:
+            return
+        reason = None
+        if broken or not self.is_healthy(browser):
+            reason = '已失效'
+            self._count('unhealthy')
+        elif self.max_uses and browser.uses >= self.max_uses:
+            reason = f'已使用 {browser.uses} 次'
+        elif self.max_memory_mb:
+            memory = self.memory_mb(browser)
+            if memory > self.max_memory_mb:
+                reason = f'页面内存 {memory:.0f}MB 超过 {self.max_memory_mb}MB'
+
+        if reason is None and not self._closed:
+            with self._condition:
+                self._idle.append(browser)
+                self._condition.notify()
+            return
+
+        if reason:
+            self._count('recycled')
+            logger.info("回收浏览器 %s（%s）", browser.index, reason)
+        self._quit(browser)
+        self._return_index(browser.index)
+
+    @contextmanager
+    def browser(self, timeout=None):
+        """以上下文管理器的方式借用浏览器，退出时自动归还
+
+        Yields:
+            WebDriver实例，无法获取时为None
+        """
+        browser = self.acquire(timeout)
+        try:
+            yield browser.driver if browser else None
+        finally:
+            self.release(browser)
+
+    def close(self):
+        """关闭池中所有空闲的浏览器，之后借出的请求都返回None"""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._condition.notify_all()
+        for browser in idle:
+            self._quit(browser)
+        logger.debug("浏览器池已关闭: %s", self.stats)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,521 @@
+import os
+import re
+import time
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# 下载状态
+STATE_PENDING = 'pending'
+STATE_DOWNLOADED = 'downloaded'
+STATE_FAILED = 'failed'
+
+# 完整性校验状态（unprobed 表示未安装ffprobe，只检查了文件大小和校验值）
+VERIFY_OK = 'ok'
+VERIFY_FAILED = 'failed'
+VERIFY_UNPROBED = 'unprobed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ups (
+    uid TEXT PRIMARY KEY,
+    name TEXT,
+    face TEXT,
+    sign TEXT,
+    level INTEGER,
+    fans INTEGER,
+    archive_count INTEGER,
+    updated_at INTEGER
+);
+CREATE TABLE IF NOT EXISTS videos (
+    bvid TEXT PRIMARY KEY,
+    aid INTEGER,
+    uid TEXT,
+    title TEXT,
+    description TEXT,
+    pic TEXT,
+    created INTEGER,
+    length TEXT,
+    duration INTEGER,
+    play INTEGER,
+    comment INTEGER,
+    video_review INTEGER,
+    favorites INTEGER,
+    typeid INTEGER,
+    typename TEXT,
+    download_state TEXT NOT NULL DEFAULT 'pending',
+    file_path TEXT,
+    file_size INTEGER,
+    error TEXT,
+    collected_at INTEGER,
+    downloaded_at INTEGER,
+    verify_state TEXT,
+    verify_error TEXT,
+    file_hash TEXT,
+    media_duration REAL,
+    verified_at INTEGER,
+    expected_duration REAL
+);
+CREATE INDEX IF NOT EXISTS idx_videos_uid_created ON videos(uid, created);
+CREATE INDEX IF NOT EXISTS idx_videos_created ON videos(created);
+CREATE INDEX IF NOT EXISTS idx_videos_state ON videos(download_state);
+CREATE INDEX IF NOT EXISTS idx_videos_typeid ON videos(typeid);
+CREATE INDEX IF NOT EXISTS idx_videos_duration ON videos(duration);
+"""
+
+# 旧版目录中缺少的列，打开时自动补齐
+MIGRATION_COLUMNS = (
+    ('verify_state', 'TEXT'),
+    ('verify_error', 'TEXT'),
+    ('file_hash', 'TEXT'),
+    ('media_duration', 'REAL'),
+    ('verified_at', 'INTEGER'),
+    ('expected_duration', 'REAL'),
+)
+
+# 标题和简介的全文索引（外部内容表，由触发器与videos表保持同步）；
+# trigram分词支持中文任意子串匹配，旧版SQLite不支持时退回unicode61
+FULLTEXT_TABLE = """
+CREATE VIRTUAL TABLE IF NOT EXISTS videos_fts USING fts5(
+    title, description, content='videos', content_rowid='rowid', tokenize='{tokenizer}'
+)
+"""
+
+FULLTEXT_TRIGGERS = """
+CREATE TRIGGER IF NOT EXISTS videos_fts_insert AFTER INSERT ON videos BEGIN
+    INSERT INTO videos_fts(rowid, title, description) VALUES (new.rowid, new.title, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS videos_fts_delete AFTER DELETE ON videos BEGIN
+    INSERT INTO videos_fts(videos_fts, rowid, title, description) VALUES ('delete', old.rowid, old.title, old.description);
+END;
+CREATE TRIGGER IF NOT EXISTS videos_fts_update AFTER UPDATE OF title, description ON videos BEGIN
+    INSERT INTO videos_fts(videos_fts, rowid, title, description) VALUES ('delete', old.rowid, old.title, old.description);
+    INSERT INTO videos_fts(rowid, title, description) VALUES (new.rowid, new.title, new.description);
+END;
+"""
+
+# trigram分词只能匹配至少3个字符的关键词，更短的关键词改用LIKE扫描
+_TRIGRAM_MIN_LENGTH = 3
+
+_BVID_PATTERN = re.compile(r'^BV[0-9A-Za-z]{10}$')
+
+# 元数据列：重复收集时只用非空的新值覆盖，不会用残缺的数据（如DOM解析结果）覆盖完整的接口数据
+_METADATA_COLUMNS = ('aid', 'uid', 'title', 'description', 'pic', 'created', 'length', 'duration', 'play',
+                     'comment', 'video_review', 'favorites', 'typeid', 'typename')
+
+
+def parse_length(length):
+    """把 "MM:SS" 或 "HH:MM:SS" 格式的时长转换为秒数，无法解析时返回None"""
+    if isinstance(length, (int, float)):
+        return int(length)
+    try:
+        seconds = 0
+        for part in str(length).strip().split(':'):
+            seconds = seconds * 60 + int(part)
+        return seconds
+    except ValueError:
+        return None
+
+
+def parse_duration(text):
+    """解析命令行中的时长：30m、1h、90s、1:30:00，纯数字表示分钟
+
+    Returns:
+        秒数
+
+    Raises:
+        ValueError: 无法解析
+    """
+    text = str(text).strip().lower()
+    if ':' in text:
+        seconds = parse_length(text)
+        if seconds is None:
+            raise ValueError(f"无法解析的时长: {text}")
+        return seconds
+    units = {'s': 1, 'm': 60, 'h': 3600}
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(float(text) * 60)
+
+
+def parse_date(text, end=False):
+    """把 YYYY、YYYY-MM 或 YYYY-MM-DD 解析为本地时间的时间戳
+
+    Args:
+        text: 日期文本
+        end: True时返回该年/月/日结束的时刻（不含），用作区间上界
+
+    Raises:
+        ValueError: 无法解析
+    """
+    parts = [int(part) for part in str(text).strip().split('-')]
+    if not 1 <= len(parts) <= 3:
+        raise ValueError(f"无法解析的日期: {text}")
+    year, month, day = (parts + [1, 1])[:3]
+    if end:
+        if len(parts) == 1:
+            year += 1
+        elif len(parts) == 2:
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        else:
+            return int(time.mktime((year, month, day, 0, 0, 0, 0, 0, -1))) + 86400
+    return int(time.mktime((year, month, day, 0, 0, 0, 0, 0, -1)))
+
+
+def format_length(seconds):
+    """把秒数格式化为 "MM:SS"，超过一小时时为 "HH:MM:SS" """
+    if not seconds:
+        return ''
+    hours, rest = divmod(int(seconds), 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes:02d}:{secs:02d}"
+
+
+def video_info_from_view(info):
+    """将视频详情接口（x/web-interface/view）的data转换为与列表接口一致的视频信息字典"""
+    stat = info.get('stat') or {}
+    return {
+        'bvid': info.get('bvid', ''),
+        'aid': info.get('aid', 0),
+        'uid': str((info.get('owner') or {}).get('mid', '')) or None,
+        'title': info.get('title'),
+        'description': info.get('desc'),
+        'pic': info.get('pic'),
+        'created': info.get('pubdate'),
+        'length': format_length(info.get('duration')),
+        'play': stat.get('view'),
+        'comment': stat.get('reply'),
+        'video_review': stat.get('danmaku'),
+        'favorites': stat.get('favorite'),
+        'typeid': info.get('tid'),
+        'typename': info.get('tname')
+    }
+
+
+class VideoCatalog:
+    """本地视频目录（SQLite）：保存收集到的视频元数据和下载状态，按UP主、发布时间、下载状态建立索引
+
+    使用WAL模式，多个线程共享同一个连接，写操作在锁内以事务提交；需要做统计分析时可导出为Parquet。
+    """
+
+    def __init__(self, path):
+        """打开（不存在时创建）目录数据库
+
+        Args:
+            path: SQLite数据库文件路径，':memory:' 表示内存数据库
+        """
+        self.path = path
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        with self._lock:
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('PRAGMA synchronous=NORMAL')
+            self.conn.executescript(SCHEMA)
+            self._migrate()
+            self.conn.commit()
+            self.fulltext_tokenizer = self._init_fulltext()
+
+    def _migrate(self):
+        """为旧版目录补齐新增的列和索引"""
+        columns = {row['name'] for row in self.conn.execute('PRAGMA table_info(videos)')}
+        for name, column_type in MIGRATION_COLUMNS:
+            if name not in columns:
+                self.conn.execute(f'ALTER TABLE videos ADD COLUMN {name} {column_type}')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_videos_verify ON videos(verify_state)')
+
+    def _init_fulltext(self):
+        """创建全文索引，已有数据的旧目录首次打开时重建索引
+
+        Returns:
+            使用的分词器名称，SQLite不支持FTS5时返回None
+        """
+        existing = self.conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'videos_fts'").fetchone()
+        if existing:
+            return 'trigram' if 'trigram' in existing[0] else 'unicode61'
+
+        for tokenizer in ('trigram', 'unicode61'):
+            try:
+                self.conn.execute(FULLTEXT_TABLE.format(tokenizer=tokenizer))
+                break
+            except sqlite3.OperationalError as e:
+                logger.debug("创建全文索引失败（%s）: %s", tokenizer, e)
+        else:
+            logger.warning("SQLite不支持FTS5，关键词查询将使用LIKE扫描")
+            return None
+        self.conn.executescript(FULLTEXT_TRIGGERS)
+        self.conn.execute("INSERT INTO videos_fts(videos_fts) VALUES ('rebuild')")
+        self.conn.commit()
+        return tokenizer
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def upsert_up(self, uid, up_info):
+        """保存UP主信息"""
+        with self._lock, self.conn:
+            self.conn.execute(
+                """INSERT INTO ups (uid, name, face, sign, level, fans, archive_count, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(uid) DO UPDATE SET
+                       name = COALESCE(excluded.name, ups.name), face = COALESCE(excluded.face, ups.face),
+                       sign = COALESCE(excluded.sign, ups.sign), level = COALESCE(excluded.level, ups.level),
+                       fans = COALESCE(excluded.fans, ups.fans),
+                       archive_count = COALESCE(excluded.archive_count, ups.archive_count),
+                       updated_at = excluded.updated_at""",
+                (str(uid), up_info.get('name'), up_info.get('face'), up_info.get('sign'), up_info.get('level'),
+                 up_info.get('fans'), up_info.get('archive_count'), int(time.time())))
+
+    def _video_row(self, uid, video, now):
+        length = video.get('length') or video.get('duration') or None
+        created = video.get('created')
+        owner = video.get('uid') or uid
+        return (
+            video['bvid'], video.get('aid') or None, str(owner) if owner else None,
+            video.get('title'), video.get('description'), video.get('pic'),
+            created if isinstance(created, int) and created > 0 else None,
+            length, parse_length(length) if length else None,
+            video.get('play'), video.get('comment'), video.get('video_review'), video.get('favorites'),
+            video.get('typeid'), video.get('typename'), now
+        )
+
+    def upsert_videos(self, uid, videos):
+        """批量保存视频元数据（单个事务），已存在的视频保留下载状态
+
+        Args:
+            uid: UP主UID，视频信息中没有uid时使用
+            videos: 视频信息字典列表（video_info_from_api 的结果，或DOM解析得到的部分字段）
+
+        Returns:
+            int: 写入的视频数量
+        """
+        now = int(time.time())
+        rows = [self._video_row(uid, video, now) for video in videos if video.get('bvid')]
+        if not rows:
+            return 0
+        updates = ', '.join(f"{column} = COALESCE(excluded.{column}, videos.{column})" for column in _METADATA_COLUMNS)
+        with self._lock, self.conn:
+            self.conn.executemany(
+                f"""INSERT INTO videos (bvid, aid, uid, title, description, pic, created, length, duration, play,
+                                       comment, video_review, favorites, typeid, typename, collected_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(bvid) DO UPDATE SET {updates}, collected_at = excluded.collected_at""",
+                rows)
+        return len(rows)
+
+    def record_collection(self, uid, up_info, videos):
+        """保存一次收集的结果（UP主信息和视频列表），写入失败只记录日志"""
+        try:
+            if up_info and not str(up_info.get('name', '')).startswith('未知用户'):
+                self.upsert_up(uid, up_info)
+            count = self.upsert_videos(uid, videos)
+            logger.info("已将 %s 个视频写入目录: %s", count, self.path)
+        except sqlite3.Error as e:
+            logger.error("写入视频目录失败: %s", e)
+
+    def mark_downloaded(self, bvid, file_path, file_size=None, expected_duration=None):
+        """记录视频下载完成
+
+        Args:
+            bvid: 视频BV号
+            file_path: 文件路径
+            file_size: 文件大小（字节），None表示读取文件
+            expected_duration: 下载的分P的时长（秒），校验时与文件时长比较；
+                               分P视频只下载第一P，videos.duration是所有分P之和，不能用于比较
+        """
+        if file_size is None and file_path and os.path.exists(file_path):
+            file_size = os.path.getsize(file_path)
+        with self._lock, self.conn:
+            self.conn.execute(
+                """INSERT INTO videos (bvid, download_state, file_path, file_size, downloaded_at, expected_duration)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(bvid) DO UPDATE SET download_state = excluded.download_state,
+                       file_path = excluded.file_path, file_size = excluded.file_size,
+                       downloaded_at = excluded.downloaded_at, expected_duration = excluded.expected_duration,
+                       error = NULL, verify_state = NULL, verify_error = NULL, file_hash = NULL,
+                       media_duration = NULL, verified_at = NULL""",
+                (bvid, STATE_DOWNLOADED, file_path, file_size, int(time.time()), expected_duration))
+
+    def mark_failed(self, bvid, error):
+        """记录视频下载失败（已下载完成的视频不会被改为失败）"""
+        with self._lock, self.conn:
+            self.conn.execute(
+                """INSERT INTO videos (bvid, download_state, error) VALUES (?, ?, ?)
+                   ON CONFLICT(bvid) DO UPDATE SET
+                       download_state = CASE WHEN videos.download_state = ? THEN videos.download_state
+                                             ELSE excluded.download_state END,
+                       error = excluded.error""",
+                (bvid, STATE_FAILED, str(error)[:500], STATE_DOWNLOADED))
+
+    def record_verification(self, bvid, result):
+        """记录一次完整性校验的结果；首次校验的校验值作为基准保留，重新下载时才会清空
+
+        Args:
+            bvid: 视频BV号
+            result: MediaVerifier.verify()的结果（state、errors、hash、duration）
+        """
+        error = '; '.join(result.get('errors') or []) or None
+        with self._lock, self.conn:
+            self.conn.execute(
+                """UPDATE videos SET verify_state = ?, verify_error = ?, file_hash = COALESCE(file_hash, ?),
+                       media_duration = ?, verified_at = ? WHERE bvid = ?""",
+                (result.get('state'), error, result.get('hash'), result.get('duration'), int(time.time()), bvid))
+
+    def verification_targets(self, uid=None, recheck=False):
+        """需要校验的已下载视频：默认只返回未校验过或校验失败的，recheck为True时返回全部
+
+        Returns:
+            视频记录字典列表（bvid、file_path、file_size、expected_duration、file_hash、media_duration、verify_state）
+        """
+        conditions, params = ['download_state = ?', 'file_path IS NOT NULL'], [STATE_DOWNLOADED]
+        if not recheck:
+            conditions.append('(verify_state IS NULL OR verify_state != ?)')
+            params.append(VERIFY_OK)
+        if uid is not None:
+            conditions.append('uid = ?')
+            params.append(str(uid))
+        with self._lock:
+            rows = self.conn.execute(
+                f"""SELECT bvid, file_path, file_size, expected_duration, file_hash, media_duration, verify_state
+                    FROM videos WHERE {' AND '.join(conditions)} ORDER BY downloaded_at""", params).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_video(self, bvid):
+        """按BV号查询视频，不存在时返回None"""
+        with self._lock:
+            row = self.conn.execute('SELECT * FROM videos WHERE bvid = ?', (bvid,)).fetchone()
+        return dict(row) if row else None
+
+    def videos(self, uid=None, state=None):
+        """按UP主和下载状态查询视频，按发布时间从新到旧排序
+
+        Returns:
+            视频记录字典列表
+        """
+        conditions, params = [], []
+        if uid is not None:
+            conditions.append('uid = ?')
+            params.append(str(uid))
+        if state is not None:
+            conditions.append('download_state = ?')
+            params.append(state)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        with self._lock:
+            rows = self.conn.execute(f'SELECT * FROM videos {where} ORDER BY created DESC', params).fetchall()
+        return [dict(row) for row in rows]
+
+    def pending_bvids(self, uid=None):
+        """尚未下载完成的视频BV号"""
+        conditions, params = ["download_state != ?"], [STATE_DOWNLOADED]
+        if uid is not None:
+            conditions.append('uid = ?')
+            params.append(str(uid))
+        with self._lock:
+            rows = self.conn.execute(f"SELECT bvid FROM videos WHERE {' AND '.join(conditions)} ORDER BY created",
+                                     params).fetchall()
+        return [row['bvid'] for row in rows]
+
+    def _keyword_condition(self, keyword):
+        """关键词条件：BV号精确匹配，其余在标题和简介中全文检索"""
+        if _BVID_PATTERN.match(keyword):
+            return 'v.bvid = ?', [keyword]
+        if self.fulltext_tokenizer and (self.fulltext_tokenizer != 'trigram' or len(keyword) >= _TRIGRAM_MIN_LENGTH):
+            phrase = '"' + keyword.replace('"', '""') + '"'
+            return 'v.rowid IN (SELECT rowid FROM videos_fts WHERE videos_fts MATCH ?)', [phrase]
+        pattern = '%' + keyword.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        return "(v.title LIKE ? ESCAPE '\\' OR v.description LIKE ? ESCAPE '\\')", [pattern, pattern]
+
+    def search(self, keyword=None, up=None, since=None, until=None, min_duration=None, max_duration=None,
+               state=None, typeid=None, order='created', limit=50):
+        """按关键词、UP主、发布时间、时长、下载状态查询视频
+
+        Args:
+            keyword: BV号，或标题/简介中的关键词
+            up: UP主UID，或UP主名字（模糊匹配）
+            since: 发布时间下界（时间戳，包含）
+            until: 发布时间上界（时间戳，不含）
+            min_duration: 最短时长（秒）
+            max_duration: 最长时长（秒）
+            state: 下载状态 pending/downloaded/failed
+            typeid: 分区ID
+            order: 排序方式，'created'（从新到旧）、'play'（播放数从高到低）或 'duration'（从长到短）
+            limit: 最多返回的条数，None表示不限制
+
+        Returns:
+            视频记录字典列表，附带UP主名字 up_name
+        """
+        conditions, params = [], []
+        if keyword:
+            condition, values = self._keyword_condition(keyword.strip())
+            conditions.append(condition)
+            params.extend(values)
+        if up is not None:
+            up = str(up)
+            if up.isdigit():
+                conditions.append('v.uid = ?')
+                params.append(up)
+            else:
+                conditions.append('v.uid IN (SELECT uid FROM ups WHERE name LIKE ?)')
+                params.append(f'%{up}%')
+        for condition, value in (('v.created >= ?', since), ('v.created < ?', until),
+                                 ('v.duration >= ?', min_duration), ('v.duration <= ?', max_duration),
+                                 ('v.download_state = ?', state), ('v.typeid = ?', typeid)):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+
+        order_by = {'created': 'v.created DESC', 'play': 'v.play DESC', 'duration': 'v.duration DESC'}[order]
+        sql = (f"SELECT v.*, u.name AS up_name FROM videos v LEFT JOIN ups u ON u.uid = v.uid "
+               f"{'WHERE ' + ' AND '.join(conditions) if conditions else ''} ORDER BY {order_by}")
+        if limit:
+            sql += ' LIMIT ?'
+            params.append(int(limit))
+        with self._lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def stats(self):
+        """目录统计：UP主数量、各下载状态的视频数量、已下载文件总大小、各校验状态的视频数量"""
+        with self._lock:
+            ups = self.conn.execute('SELECT COUNT(*) FROM ups').fetchone()[0]
+            states = dict(self.conn.execute(
+                'SELECT download_state, COUNT(*) FROM videos GROUP BY download_state').fetchall())
+            size = self.conn.execute('SELECT COALESCE(SUM(file_size), 0) FROM videos').fetchone()[0]
+            verify = dict(self.conn.execute(
+                'SELECT verify_state, COUNT(*) FROM videos WHERE verify_state IS NOT NULL GROUP BY verify_state'
+            ).fetchall())
+        return {'ups': ups, 'videos': sum(states.values()), 'states': states, 'downloaded_bytes': size,
+                'verify': verify}
+
+    def to_dataframe(self, table='videos'):
+        """把目录表读入pandas DataFrame"""
+        import pandas as pd
+        if table not in ('videos', 'ups'):
+            raise ValueError(f"未知的表: {table}")
+        with self._lock:
+            return pd.read_sql_query(f'SELECT * FROM {table}', self.conn)
+
+    def export(self, path, table='videos'):
+        """导出目录表，按扩展名选择格式：.parquet（需要pyarrow）或 .csv
+
+        Returns:
+            导出的行数
+        """
+        df = self.to_dataframe(table)
+        if path.endswith('.csv'):
+            df.to_csv(path, index=False)
+        else:
+            df.to_parquet(path, index=False)
+        return len(df)
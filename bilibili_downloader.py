@@ -2,21 +2,72 @@ import os
 import sys
 import json
 import time
+import logging
 import random
 import requests
 from tqdm import tqdm
 import subprocess
+from contextlib import contextmanager
+from ffmpeg_capabilities import get_ffmpeg_capabilities
+from bilibili_metrics import MetricsRecorder
+from bilibili_catalog import video_info_from_view
+from bilibili_planner import MERGE_SPACE_FACTOR, estimate_stream_bytes, stream_duration
+from bilibili_storage import LibraryMover
+from bilibili_sidecar import SidecarFetcher
+from bilibili_pacer import get_default_pacer
+from bilibili_memory import get_default_memory_budget
+from bilibili_retry import (get_default_retrier, RetryPolicy, RetryableResponseError, CircuitOpenError,
+                            IncompleteDownloadError, RETRY_EXCEPTIONS, RETRY_STATUSES, api_code_retryable,
+                            host_of)
+
+logger = logging.getLogger(__name__)
+
+# 播放地址探测本身会遍历多种端点和参数组合，每个组合只需少量重试
+PROBE_RETRY_POLICY = RetryPolicy(max_attempts=2, base_delay=0.5, max_delay=5.0)
+
+# 媒体流下载中途断开时从已写入的位置续传，允许更多次尝试
+DOWNLOAD_RETRY_POLICY = RetryPolicy(max_attempts=5, base_delay=1.0, max_delay=30.0)
+
+# 媒体流每次读取的块大小，每块读取前从内存预算中申请
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
 
 class BilibiliDownloader:
     """B站视频下载类，用于下载单个视频"""
     
-    def __init__(self, cookie_path=None, proxy=None):
+    def __init__(self, cookie_path=None, proxy=None, metrics=None, profiler=None, api_base='https://api.bilibili.com',
+                 retrier=None, pacer=None, catalog=None, disk_guard=None, scratch_dir=None, mover=None,
+                 verifier=None, sidecars=None, memory_budget=None):
         """初始化下载器
         
         Args:
             cookie_path: Cookie文件路径
             proxy: 代理设置，如 http://127.0.0.1:7890
+            metrics: MetricsRecorder实例，用于记录各阶段耗时，None表示使用独立的记录器
+            profiler: PhaseProfiler实例，用于按阶段采集CPU/内存剖析数据，None表示不剖析
+            api_base: API根地址，基准测试时可指向本地模拟服务器
+            retrier: Retrier实例，None表示使用进程内共享的重试组件（共享重试预算和熔断状态）
+            pacer: AdaptivePacer实例，控制API请求节奏，None表示使用进程内共享的节奏控制器
+            catalog: VideoCatalog实例，下载完成或失败时更新视频的下载状态，None表示不记录
+            disk_guard: DiskSpaceGuard实例，开始下载前按估算大小预留磁盘空间，None表示不检查
+            scratch_dir: 暂存目录（如本地NVMe或tmpfs），临时的.m4s文件和合并都在这里进行，
+                完成后再移动到output_dir；None表示直接写入output_dir
+            mover: LibraryMover实例，在后台把暂存目录中的成品移动到output_dir，与后续下载重叠；
+                指定scratch_dir但mover为None时在下载结束前同步移动
+            verifier: VerificationPool实例，下载（和移动）完成的文件交给后台线程校验，None表示不校验
+            sidecars: 与媒体流同时获取的附属文件类型（'cover'、'subtitles'、'danmaku'），None表示不获取
+            memory_budget: MemoryBudget实例，限制在途传输缓冲区总量，None表示使用进程内共享的预算
         """
+        self.catalog = catalog
+        self.disk_guard = disk_guard
+        self.scratch_dir = scratch_dir
+        self.mover = mover
+        self.verifier = verifier
+        self.sidecars = None
+        self.metrics = metrics if metrics is not None else MetricsRecorder()
+        self.profiler = profiler
+        self.retrier = retrier if retrier is not None else get_default_retrier()
+        self.pacer = pacer if pacer is not None else get_default_pacer()
+        self.memory_budget = memory_budget if memory_budget is not None else get_default_memory_budget()
         self.session = requests.Session()
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/128.0.0.0 Safari/537.36',
@@ -47,17 +98,17 @@ class BilibiliDownloader:
                     try:
                         cookies = json.loads(file_content)
                         
-                        print(f"调试: Cookie格式类型: {type(cookies)}")
+                        logger.debug("Cookie格式类型: %s", type(cookies))
                         
                         # 处理常规格式
                         if isinstance(cookies, list):
-                            print(f"调试: 处理列表格式cookie，共{len(cookies)}条")
+                            logger.debug("处理列表格式cookie，共%s条", len(cookies))
                             for cookie in cookies:
                                 if isinstance(cookie, dict):
                                     # 标准浏览器cookie导出格式
                                     if 'name' in cookie and 'value' in cookie:
                                         self.session.cookies.set(cookie['name'], cookie['value'])
-                                        print(f"已加载cookie: {cookie['name']}")
+                                        logger.debug("已加载cookie: %s", cookie['name'])
                                     # 兼容其他可能的格式
                                     elif 'value' in cookie:
                                         # 尝试从value中提取键值对
@@ -66,7 +117,7 @@ class BilibiliDownloader:
                                             try:
                                                 k, v = cookie_str.split('=', 1)
                                                 self.session.cookies.set(k.strip(), v.strip())
-                                                print(f"已加载cookie: {k.strip()}")
+                                                logger.debug("已加载cookie: %s", k.strip())
                                             except:
                                                 continue
                                 elif isinstance(cookie, str):
@@ -77,11 +128,11 @@ class BilibiliDownloader:
                                             try:
                                                 k, v = pair.split('=', 1)
                                                 self.session.cookies.set(k.strip(), v.strip())
-                                                print(f"已加载cookie: {k.strip()}")
+                                                logger.debug("已加载cookie: %s", k.strip())
                                             except:
                                                 continue
                         elif isinstance(cookies, dict):
-                            print(f"调试: 处理字典格式cookie，共{len(cookies)}条")
+                            logger.debug("处理字典格式cookie，共%s条", len(cookies))
                             # 直接设置每个cookie
                             for key, value in cookies.items():
                                 # 如果值本身是一个包含多个cookie的字符串，尝试分割
@@ -92,22 +143,22 @@ class BilibiliDownloader:
                                             try:
                                                 k, v = pair.split('=', 1)
                                                 self.session.cookies.set(k.strip(), v.strip())
-                                                print(f"已加载cookie: {k.strip()}")
+                                                logger.debug("已加载cookie: %s", k.strip())
                                             except:
                                                 continue
                                 else:
                                     # 直接设置单个cookie
                                     self.session.cookies.set(key, str(value))
-                                    print(f"已加载cookie: {key}")
+                                    logger.debug("已加载cookie: %s", key)
                     except json.JSONDecodeError:
-                        print("JSON解析失败，尝试作为文本直接解析cookie")
+                        logger.debug("JSON解析失败，尝试作为文本直接解析cookie")
                         import re
                         cookie_pairs = re.findall(r'([^=;]+)=([^;]+)', file_content)
                         for name, value in cookie_pairs:
                             name = name.strip()
                             value = value.strip()
                             self.session.cookies.set(name, value)
-                            print(f"已从文本提取cookie: {name}")
+                            logger.debug("已从文本提取cookie: %s", name)
                     
                     # 额外检查：直接从文件内容中提取所有可能的cookie
                     import re
@@ -115,25 +166,23 @@ class BilibiliDownloader:
                     for name, value in cookie_matches:
                         if name not in self.session.cookies:
                             self.session.cookies.set(name, value.split(';')[0])
-                            print(f"已从文件内容提取cookie: {name}")
+                            logger.debug("已从文件内容提取cookie: %s", name)
                     
                     self.cookies_loaded = True
-                    print(f"Cookie加载完成，总共加载了{len(self.session.cookies)}个cookie")
+                    logger.info("Cookie加载完成，总共加载了%s个cookie", len(self.session.cookies))
                     
                     # 检查关键cookie是否已加载
                     critical_cookies = ['SESSDATA', 'bili_jct', 'DedeUserID', 'DedeUserID__ckMd5', 'sid']
                     for critical in critical_cookies:
                         if critical in self.session.cookies:
-                            print(f"✓ 关键cookie已加载: {critical}")
+                            logger.debug("✓ 关键cookie已加载: %s", critical)
                         else:
-                            print(f"✗ 关键cookie缺失: {critical}")
+                            logger.debug("✗ 关键cookie缺失: %s", critical)
                             
             except Exception as e:
-                print(f"警告: 加载Cookie失败 - {str(e)}")
-                import traceback
-                traceback.print_exc()
+                logger.warning("加载Cookie失败 - %s", e, exc_info=True)
         else:
-            print("警告: Cookie文件不存在或路径无效")
+            logger.warning("Cookie文件不存在或路径无效")
         
         # 设置代理
         if proxy:
@@ -141,13 +190,22 @@ class BilibiliDownloader:
             self.session.proxies.update(self.proxies)
         
         # API地址
+        self.api_base = api_base.rstrip('/')
         self.api_urls = {
-            'video_info': 'https://api.bilibili.com/x/web-interface/view',
-            'play_url': 'https://api.bilibili.com/x/player/playurl'
+            'video_info': f'{self.api_base}/x/web-interface/view',
+            'play_url': f'{self.api_base}/x/player/playurl',
+            'play_url_wbi': f'{self.api_base}/x/player/wbi/playurl',
+            'play_url_v2': f'{self.api_base}/x/player/playurl/v2'
         }
         
-        # 重试次数
-        self.max_retries = 3
+        # 附属文件与媒体流共用会话、重试组件和节奏控制器
+        if sidecars:
+            self.sidecars = SidecarFetcher(self, sidecars)
+
+    def close(self):
+        """停止附属文件获取的后台线程"""
+        if self.sidecars is not None:
+            self.sidecars.close()
     
     def get_video_info(self, bvid):
         """获取视频信息
@@ -159,51 +217,45 @@ class BilibiliDownloader:
             视频信息字典
         """
         params = {'bvid': bvid}
-        for retry in range(self.max_retries):
-            try:
-                response = self.session.get(self.api_urls['video_info'], params=params, timeout=30)
-                response.raise_for_status()
-                data = response.json()
-                
-                if data.get('code') == 0:
-                    return data['data']
-                else:
-                    print(f"获取视频信息失败: {data.get('message', '未知错误')}")
-                    if retry < self.max_retries - 1:
-                        print(f"{retry + 1} 秒后重试...")
-                        time.sleep(retry + 1)
-            except Exception as e:
-                print(f"获取视频信息异常: {str(e)}")
-                if retry < self.max_retries - 1:
-                    print(f"{retry + 1} 秒后重试...")
-                    time.sleep(retry + 1)
+        try:
+            response = self.retrier.request('GET', self.api_urls['video_info'], session=self.session,
+                                            check=api_code_retryable, pacer=self.pacer, params=params, timeout=30)
+            response.raise_for_status()
+            data = response.json()
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            raise Exception(f"获取视频信息失败: {e}")
         
-        raise Exception(f"获取视频信息失败，已重试{self.max_retries}次")
+        if data.get('code') != 0:
+            raise Exception(f"获取视频信息失败: {data.get('message', '未知错误')} (code: {data.get('code')})")
+        return data['data']
     
-    def get_video_streams(self, bvid, cid, quality=127):
+    def get_video_streams(self, bvid, cid, quality=127, video_metrics=None):
         """获取视频流信息
         
         Args:
             bvid: 视频BV号
             cid: 视频cid
             quality: 请求的视频质量等级
+            video_metrics: VideoMetrics实例，用于统计探测请求次数
             
         Returns:
             视频流信息字典
         """
-        print(f"\n===== 获取视频流信息 =====")
-        print(f"请求参数 - bvid: {bvid}, cid: {cid}, quality: {quality}")
+        logger.debug("===== 获取视频流信息 =====")
+        logger.debug("请求参数 - bvid: %s, cid: %s, quality: %s", bvid, cid, quality)
         
         # 确保cookie正确设置到session中
         critical_cookies = ['SESSDATA', 'bili_jct', 'DedeUserID', 'DedeUserID__ckMd5', 'sid']
         found_cookies = [cookie.name for cookie in self.session.cookies if cookie.name in critical_cookies]
-        print(f"当前session中的关键cookie: {', '.join(found_cookies)} ({len(found_cookies)}/{len(critical_cookies)})")
+        logger.debug("当前session中的关键cookie: %s (%s/%s)", ', '.join(found_cookies), len(found_cookies), len(critical_cookies))
         
         # 更新API地址列表，增加wbi API支持
         api_endpoints = [
-            'https://api.bilibili.com/x/player/wbi/playurl',  # 主要API（WBI加密）
-            'https://api.bilibili.com/x/player/playurl',      # 传统API
-            'https://api.bilibili.com/x/player/playurl/v2'    # V2 API
+            self.api_urls['play_url_wbi'],  # 主要API（WBI加密）
+            self.api_urls['play_url'],      # 传统API
+            self.api_urls['play_url_v2']    # V2 API
         ]
         
         # 定义不同的请求参数组合，尝试多种方式获取高质量视频
@@ -357,15 +409,28 @@ class BilibiliDownloader:
             
             return max_height, has_high_avc, best_avc_codec
         
+        def count_probe(attempt, error):
+            # 重试的请求同样计入探测次数
+            if video_metrics is not None:
+                video_metrics.probe_attempts += 1
+        
+        # API熔断或重试用尽后不再继续探测剩余的组合
+        api_blocked = False
+        last_error = None
+        
         # 尝试不同的API端点
         for endpoint in api_endpoints:
-            print(f"\n尝试API端点: {endpoint}")
+            if api_blocked:
+                break
+            logger.debug("尝试API端点: %s", endpoint)
             
             # 尝试不同的请求配置
             for config in request_configs:
+                if api_blocked:
+                    break
                 params_template = config['params']
                 label = config['label']
-                print(f"尝试配置: {label}")
+                logger.debug("尝试配置: %s", label)
                 
                 # 对每个配置尝试不同的quality值
                 for q in quality_values:
@@ -373,7 +438,7 @@ class BilibiliDownloader:
                         # 复制参数模板并更新quality
                         params = params_template.copy()
                         params['qn'] = q
-                        print(f"  尝试quality值: {q}, fnval={params.get('fnval')}, fourk={params.get('fourk')}")
+                        logger.debug("尝试quality值: %s, fnval=%s, fourk=%s", q, params.get('fnval'), params.get('fourk'))
                         
                         # 设置增强的请求头
                         enhanced_headers = create_enhanced_headers(bvid)
@@ -381,44 +446,52 @@ class BilibiliDownloader:
                         # 打印当前请求的关键信息
                         has_sessdata = 'SESSDATA' in enhanced_headers.get('Cookie', '')
                         has_bili_jct = 'bili_jct' in enhanced_headers.get('Cookie', '')
-                        print(f"  Cookie状态: SESSDATA={'✓' if has_sessdata else '✗'}, bili_jct={'✓' if has_bili_jct else '✗'}")
+                        logger.debug("Cookie状态: SESSDATA=%s, bili_jct=%s", '✓' if has_sessdata else '✗', '✓' if has_bili_jct else '✗')
                         
                         # 发送请求
-                        response = self.session.get(
-                            endpoint, 
-                            params=params, 
+                        if video_metrics is not None:
+                            video_metrics.probe_attempts += 1
+                        response = self.retrier.request(
+                            'GET',
+                            endpoint,
+                            session=self.session,
+                            policy=PROBE_RETRY_POLICY,
+                            check=api_code_retryable,
+                            on_retry=count_probe,
+                            pacer=self.pacer,
+                            params=params,
                             headers=enhanced_headers,
                             timeout=30
                         )
                         
-                        print(f"  响应状态码: {response.status_code}")
+                        logger.debug("响应状态码: %s", response.status_code)
                         
                         # 检查是否需要认证
                         if response.status_code == 401:
-                            print("  警告: 需要登录认证，检查cookie是否有效")
+                            logger.debug("需要登录认证，检查cookie是否有效")
                             continue
                         
                         # 尝试解析响应
                         try:
                             data = response.json()
                         except json.JSONDecodeError as e:
-                            print(f"  JSON解析错误: {str(e)}")
-                            print(f"  响应内容开头: {response.text[:100]}...")
+                            logger.debug("JSON解析错误: %s", e)
+                            logger.debug("响应内容开头: %s...", response.text[:100])
                             # 尝试从文本中提取JSON
                             import re
                             json_match = re.search(r'\{.*\}', response.text, re.DOTALL)
                             if json_match:
                                 try:
                                     data = json.loads(json_match.group())
-                                    print("  成功从文本中提取JSON")
+                                    logger.debug("成功从文本中提取JSON")
                                 except:
-                                    print("  无法提取有效JSON")
+                                    logger.debug("无法提取有效JSON")
                                     continue
                             else:
                                 continue
                         
                         # 检查API响应状态
-                        print(f"  API响应状态码: {data.get('code', '未知')}")
+                        logger.debug("API响应状态码: %s", data.get('code', '未知'))
                         
                         if data.get('code') == 0 and 'data' in data:
                             # 检查是否获取到视频流，并分析其质量
@@ -430,21 +503,21 @@ class BilibiliDownloader:
                                 max_height, has_high_avc, best_avc_codec = analyze_streams(video_streams)
                                 
                                 # 输出详细信息
-                                print(f"  ✓ 成功获取视频流信息")
-                                print(f"  最高分辨率: {max_height}P")
-                                print(f"  视频流数量: {len(video_streams)}")
+                                logger.debug("✓ 成功获取视频流信息")
+                                logger.debug("最高分辨率: %sP", max_height)
+                                logger.debug("视频流数量: %s", len(video_streams))
                                 
                                 # 输出所有可用的视频流质量
                                 available_qualities = set([v.get('height', 0) for v in video_streams])
-                                print(f"  可用分辨率: {sorted(available_qualities, reverse=True)}P")
+                                logger.debug("可用分辨率: %sP", sorted(available_qualities, reverse=True))
                                 
                                 # 输出编码信息
                                 codecs = [v.get('codecs', '') for v in video_streams]
-                                print(f"  可用编码: {codecs}")
+                                logger.debug("可用编码: %s", codecs)
                                 
                                 # 特殊标记高规格编码
                                 if best_avc_codec:
-                                    print(f"  ✓ 发现高规格AVC编码: {best_avc_codec} (优先级: {AVC_PRIORITY[best_avc_codec]})")
+                                    logger.debug("✓ 发现高规格AVC编码: %s (优先级: %s)", best_avc_codec, AVC_PRIORITY[best_avc_codec])
                                 
                                 # 保存当前找到的最佳流，继续尝试获取更高质量的流
                                 if 'best_streams' not in locals():
@@ -456,46 +529,59 @@ class BilibiliDownloader:
                                         (not best_streams['best_codec'] or \
                                          (best_streams['best_codec'] and AVC_PRIORITY.get(best_avc_codec, 0) > AVC_PRIORITY.get(best_streams['best_codec'], 0)))):
                                         best_streams = {'data': data['data'], 'max_height': max_height, 'best_codec': best_avc_codec}
-                                        print(f"✓ 更新最佳视频流: {max_height}P, 编码: {best_avc_codec or '未知'}")
+                                        logger.debug("✓ 更新最佳视频流: %sP, 编码: %s", max_height, best_avc_codec or '未知')
                                     
                                 # 如果已经找到4K或高规格AVC编码，可以提前返回
                                 if max_height >= 2160 or best_avc_codec == 'avc1.640033':
-                                    print(f"🎉 找到最高质量视频流！4K或高规格AVC编码")
+                                    logger.info("🎉 找到最高质量视频流！4K或高规格AVC编码")
                                     return data['data']
                             else:
-                                print("  警告: API返回成功但未包含视频流信息")
+                                logger.debug("API返回成功但未包含视频流信息")
                                 # 检查是否有权限信息
                                 message = data.get('data', {}).get('message', '')
                                 if message:
-                                    print(f"  提示信息: {message}")
+                                    logger.debug("提示信息: %s", message)
                                     if '大会员' in message or '会员' in message:
-                                        print("  检测到会员专属内容，请确保cookie包含有效的会员权限")
+                                        logger.debug("检测到会员专属内容，请确保cookie包含有效的会员权限")
                                 continue
                         else:
                             error_msg = data.get('message', '未知错误')
-                            print(f"  获取失败: {error_msg}")
+                            logger.debug("获取失败: %s", error_msg)
                             # 特殊处理常见错误
                             if '权限不足' in error_msg or '权限' in error_msg:
-                                print("  提示: 权限错误可能是因为cookie无效或内容需要特殊权限")
+                                logger.debug("权限错误可能是因为cookie无效或内容需要特殊权限")
                             elif '403' in str(response.status_code):
-                                print("  提示: 403错误通常表示被API拒绝，可能需要更新cookie或参数")
+                                logger.warning("403错误通常表示被API拒绝，可能需要更新cookie或参数")
                             continue
                             
+                    except CircuitOpenError as e:
+                        logger.warning("停止探测: %s", e)
+                        last_error = e
+                        api_blocked = True
+                        break
+                    except RETRY_EXCEPTIONS as e:
+                        # 重试组件已按退避策略重试过（或重试预算已用完），其余组合请求的是同一个接口
+                        logger.warning("播放地址接口重试后仍失败，停止探测: %s", e)
+                        last_error = e
+                        api_blocked = True
+                        break
                     except Exception as e:
-                        print(f"  获取异常: {str(e)}")
+                        logger.warning("探测失败 (%s, qn=%s): %s", label, q, e)
+                        last_error = e
                         continue
-                
-                # 短暂延迟后重试
-                time.sleep(0.5)
         
         # 如果在前面的尝试中找到了最佳流，返回它
         if 'best_streams' in locals():
-            print(f"\n🏆 返回最佳视频流: {best_streams['max_height']}P, 最佳编码: {best_streams['best_codec'] or '未知'}")
+            logger.info("🏆 返回最佳视频流: %sP, 最佳编码: %s", best_streams['max_height'], best_streams['best_codec'] or '未知')
             return best_streams['data']
             
+        if api_blocked:
+            logger.error("获取视频流信息失败，播放地址接口不可用: %s", last_error)
+            raise Exception(f"获取视频流信息失败，播放地址接口不可用: {last_error}")
+        
         # 最后的尝试：使用最简化的参数
         try:
-            url = 'https://api.bilibili.com/x/player/playurl'
+            url = self.api_urls['play_url']
             params = {
                 'bvid': bvid,
                 'cid': cid,
@@ -506,19 +592,25 @@ class BilibiliDownloader:
                 'platform': 'html5'
             }
             
-            print("\n尝试最后一次获取 (极简参数)")
+            logger.debug("尝试最后一次获取 (极简参数)")
             headers = create_enhanced_headers(bvid)
-            response = self.session.get(url, params=params, headers=headers, timeout=30)
+            if video_metrics is not None:
+                video_metrics.probe_attempts += 1
+            response = self.retrier.request('GET', url, session=self.session, policy=PROBE_RETRY_POLICY,
+                                            check=api_code_retryable, on_retry=count_probe, pacer=self.pacer,
+                                            params=params, headers=headers, timeout=30)
             result = response.json()
             
             if result.get('code') == 0 and 'data' in result:
-                print("✓ 成功获取基础视频流")
+                logger.info("✓ 成功获取基础视频流")
                 return result['data']
             else:
-                print(f"最终尝试失败: {result.get('message', '未知错误')}")
+                logger.warning("最终尝试失败: %s", result.get('message', '未知错误'))
         except Exception as e:
-            print(f"最终尝试异常: {str(e)}")
+            logger.warning("最终尝试异常: %s", e)
+            last_error = e
             
+        logger.error("获取视频流信息失败，已尝试所有可用API和配置（最后的错误: %s）", last_error)
         raise Exception(f"获取视频流信息失败，已尝试所有可用API和配置")
     
     def select_best_stream(self, streams, prefer_quality=None, prefer_audio_quality=None):
@@ -532,7 +624,7 @@ class BilibiliDownloader:
         Returns:
             (best_video, best_audio) 元组
         """
-        print(f"\n===== 媒体流选择与优化 =====")
+        logger.debug("===== 媒体流选择与优化 =====")
         
         dash = streams.get('dash', {})
         video_streams = dash.get('video', [])
@@ -544,7 +636,7 @@ class BilibiliDownloader:
             raise Exception("未找到可用的音频流")
         
         # 打印所有视频流的详细信息，帮助诊断问题
-        print("\n📺 所有可用视频流信息:")
+        logger.debug("📺 所有可用视频流信息:")
         for i, stream in enumerate(video_streams):
             height = stream.get('height', '未知')
             width = stream.get('width', '未知')
@@ -553,7 +645,7 @@ class BilibiliDownloader:
             mimeType = stream.get('mimeType', '未知')
             bitrate = stream.get('bitrate', 0)
             fps = stream.get('frameRate', '未知')
-            print(f"[{i+1}] {width}x{height}P, {codecs}, ID={stream_id}, FPS={fps}, 比特率={bitrate//1000}kbps, MIME={mimeType}")
+            logger.debug("[%s] %sx%sP, %s, ID=%s, FPS=%s, 比特率=%skbps, MIME=%s", i + 1, width, height, codecs, stream_id, fps, bitrate // 1000, mimeType)
         
         # 定义扩展的编码优先级字典
         AVC_PRIORITY = {
@@ -588,27 +680,27 @@ class BilibiliDownloader:
             for avc_codec, priority in AVC_PRIORITY.items():
                 if avc_codec.lower() in codecs:
                     score += priority * 2000  # 大幅提高编码优先级权重
-                    print(f"  🔍 发现高级AVC编码: {codecs}, 优先级: {priority}")
+                    logger.debug("🔍 发现高级AVC编码: %s, 优先级: %s", codecs, priority)
                     is_specific_avc = True
                     break
             
             # 2. 如果不是特定的AVC编码，但包含avc或h264关键字
             if not is_specific_avc and any(keyword in codecs for keyword in ['avc', 'h264', 'x264', 'h.264']):
                 score += 50000  # 给普通AVC编码更高权重
-                print(f"  🔍 发现普通AVC编码流: {codecs}")
+                logger.debug("🔍 发现普通AVC编码流: %s", codecs)
             
             # 3. 检查其他编码类型
             for codec_type, priority in OTHER_CODEC_PRIORITY.items():
                 if codec_type in codecs:
                     score += priority * 1000
-                    print(f"  🔍 发现{codec_type.upper()}编码流: {codecs}, 优先级: {priority}")
+                    logger.debug("🔍 发现%s编码流: %s, 优先级: %s", codec_type.upper(), codecs, priority)
                     break
             
             # 4. 分辨率权重 - 大幅提高分辨率权重
             height = stream.get('height', 0) or 0
             if height >= 2160:  # 4K
                 score += 100000
-                print(f"  🎯 发现4K分辨率: {height}P")
+                logger.debug("🎯 发现4K分辨率: %sP", height)
             elif height >= 1440:  # 2K
                 score += 70000
             elif height >= 1080:  # 1080P
@@ -631,7 +723,7 @@ class BilibiliDownloader:
                 fps_num = float(fps)
                 if fps_num >= 60:
                     score += 10000  # 高帧率加分
-                    print(f"  ⚡ 发现高帧率: {fps} FPS")
+                    logger.debug("⚡ 发现高帧率: %s FPS", fps)
                 elif fps_num >= 30:
                     score += 5000  # 标准高帧率加分
             except (ValueError, TypeError):
@@ -640,7 +732,7 @@ class BilibiliDownloader:
             # 7. 特殊处理：4K AVC编码(avc1.640033)给予超高优先级
             if 'avc1.640033' in codecs and height >= 2160:
                 score += 200000  # 为4K AVC编码提供绝对优先级
-                print(f"  🚀 发现4K AVC编码(avc1.640033)，获得超高优先级")
+                logger.debug("🚀 发现4K AVC编码(avc1.640033)，获得超高优先级")
             
             return score
         
@@ -650,7 +742,7 @@ class BilibiliDownloader:
                          if stream.get('height', 0) >= 2160]
         
         if all_4k_streams:
-            print(f"\n🔍 发现{len(all_4k_streams)}个4K流！")
+            logger.debug("🔍 发现%s个4K流！", len(all_4k_streams))
             
             # 为4K流定义优先级评分函数
             def fourk_stream_score(stream):
@@ -691,7 +783,7 @@ class BilibiliDownloader:
             all_4k_streams.sort(key=fourk_stream_score, reverse=True)
             
             # 输出所有4K流的详细信息
-            print("📊 4K流详细分析:")
+            logger.debug("📊 4K流详细分析:")
             for i, stream in enumerate(all_4k_streams):
                 codecs = stream.get('codecs', '未知')
                 width = stream.get('width', '未知')
@@ -711,15 +803,15 @@ class BilibiliDownloader:
                 elif 'vp9' in codecs.lower():
                     codec_type = "VP9"
                 
-                print(f"  [{i+1}] {codec_type} | {codecs} | {width}x{height}P | {bitrate//1000}kbps | {fps}FPS | 评分={score:.0f}")
+                logger.debug("[%s] %s | %s | %sx%sP | %skbps | %sFPS | 评分=%.0f", i + 1, codec_type, codecs, width, height, bitrate // 1000, fps, score)
             
             # 直接选择评分最高的4K流
             best_video = all_4k_streams[0]
-            print(f"\n🏆 优先选择4K流！")
-            print(f"   分辨率: {best_video.get('width', '未知')}x{best_video.get('height')}P")
-            print(f"   编码: {best_video.get('codecs', '未知')}")
-            print(f"   比特率: {best_video.get('bitrate', 0)//1000}kbps")
-            print(f"   帧率: {best_video.get('frameRate', '未知')} FPS")
+            logger.debug("🏆 优先选择4K流！")
+            logger.debug("分辨率: %sx%sP", best_video.get('width', '未知'), best_video.get('height'))
+            logger.debug("编码: %s", best_video.get('codecs', '未知'))
+            logger.debug("比特率: %skbps", best_video.get('bitrate', 0) // 1000)
+            logger.debug("帧率: %s FPS", best_video.get('frameRate', '未知'))
         else:
             # 对所有视频流进行评分和排序
             video_streams_sorted = sorted(video_streams, key=video_stream_score, reverse=True)
@@ -733,7 +825,7 @@ class BilibiliDownloader:
                                  if stream.get('height') == best_height]
             
             if len(same_height_streams) > 1:
-                print(f"\n🔍 在{best_height}P高度下发现{len(same_height_streams)}个流，进行精细编码分析...")
+                logger.debug("🔍 在%sP高度下发现%s个流，进行精细编码分析...", best_height, len(same_height_streams))
                 
                 # 为相同高度的流定义更精确的评分函数，重点关注编码规格和质量
                 def same_height_score(stream):
@@ -787,7 +879,7 @@ class BilibiliDownloader:
                 same_height_streams.sort(key=same_height_score, reverse=True)
                 
                 # 输出详细分析结果
-                print("📊 相同高度流精细分析结果:")
+                logger.debug("📊 相同高度流精细分析结果:")
                 for i, stream in enumerate(same_height_streams):
                     codecs = stream.get('codecs', '未知')
                     bitrate = stream.get('bitrate', 0) or 0
@@ -811,7 +903,7 @@ class BilibiliDownloader:
                     elif 'vp9' in codecs.lower():
                         codec_analysis = "VP9编码"
                     
-                    print(f"  [{i+1}] {codecs} | {codec_analysis} | {bitrate//1000}kbps | {fps}FPS | 精细评分={score:.0f}")
+                    logger.debug("[%s] %s | %s | %skbps | %sFPS | 精细评分=%.0f", i + 1, codecs, codec_analysis, bitrate // 1000, fps, score)
                 
                 # 选择评分最高的流
                 best_video = same_height_streams[0]
@@ -832,7 +924,7 @@ class BilibiliDownloader:
                 elif 'vp9' in selected_codecs.lower():
                     codec_type = f"VP9编码 ({selected_codecs})"
                 
-                print(f"\n✅ 选择最佳流 - 高度: {best_height}P, 编码: {codec_type}")
+                logger.debug("✅ 选择最佳流 - 高度: %sP, 编码: %s", best_height, codec_type)
         
         # 增强版音频流评分函数
         def audio_stream_score(stream):
@@ -846,10 +938,10 @@ class BilibiliDownloader:
             sample_rate = stream.get('sampling_rate', 0) or 0
             if sample_rate >= 96000:
                 score += 5000  # 超高采样率
-                print(f"  🔊 发现超高采样率音频: {sample_rate}Hz")
+                logger.debug("🔊 发现超高采样率音频: %sHz", sample_rate)
             elif sample_rate >= 48000:
                 score += 3000  # 高采样率
-                print(f"  🔊 发现高采样率音频: {sample_rate}Hz")
+                logger.debug("🔊 发现高采样率音频: %sHz", sample_rate)
             elif sample_rate >= 44100:
                 score += 1000  # 标准采样率
             
@@ -857,7 +949,7 @@ class BilibiliDownloader:
             codec = stream.get('codecs', '').lower()
             if 'flac' in codec:
                 score += 10000  # FLAC无损音频最高优先级
-                print(f"  🎵 发现FLAC无损音频")
+                logger.debug("🎵 发现FLAC无损音频")
             elif 'aac-lc' in codec or 'mp4a.40.2' in codec:
                 score += 5000  # AAC-LC高品质
             elif 'aac' in codec:
@@ -873,7 +965,7 @@ class BilibiliDownloader:
             channels = stream.get('channels', 0)
             if channels >= 6:
                 score += 8000  # 5.1声道
-                print(f"  🔊 发现多声道音频: {channels}声道")
+                logger.debug("🔊 发现多声道音频: %s声道", channels)
             elif channels >= 2:
                 score += 2000  # 立体声
             
@@ -884,21 +976,21 @@ class BilibiliDownloader:
             return score
         
         # 打印所有音频流信息
-        print("\n🔊 所有可用音频流信息:")
+        logger.debug("🔊 所有可用音频流信息:")
         for i, stream in enumerate(audio_streams):
             codecs = stream.get('codecs', '未知')
             bitrate = stream.get('bitrate', 0) or 0
             sample_rate = stream.get('sampling_rate', '未知')
             channels = stream.get('channels', '未知')
             audio_id = stream.get('id', '未知')
-            print(f"[{i+1}] {codecs} | {bitrate//1000}kbps | {sample_rate}Hz | 声道数:{channels} | ID:{audio_id}")
+            logger.debug("[%s] %s | %skbps | %sHz | 声道数:%s | ID:%s", i + 1, codecs, bitrate // 1000, sample_rate, channels, audio_id)
         
         # 排序音频流
         audio_streams_sorted = sorted(audio_streams, key=audio_stream_score, reverse=True)
         best_audio = audio_streams_sorted[0]
         
         # 输出最终选择的媒体流详细信息
-        print(f"\n🎉 最终选择的媒体流:")
+        logger.debug("🎉 最终选择的媒体流:")
         
         # 视频信息
         video_width = best_video.get('width', '未知')
@@ -922,11 +1014,11 @@ class BilibiliDownloader:
         elif 'vp9' in video_codecs.lower():
             video_codec_type = "VP9编码"
         
-        print(f"📹 视频:")
-        print(f"  分辨率: {video_width}x{video_height}P")
-        print(f"  编码: {video_codecs} ({video_codec_type})")
-        print(f"  比特率: {video_bitrate//1000}kbps")
-        print(f"  帧率: {video_fps} FPS")
+        logger.debug("📹 视频:")
+        logger.debug("分辨率: %sx%sP", video_width, video_height)
+        logger.debug("编码: %s (%s)", video_codecs, video_codec_type)
+        logger.debug("比特率: %skbps", video_bitrate // 1000)
+        logger.debug("帧率: %s FPS", video_fps)
         
         # 音频信息
         audio_codecs = best_audio.get('codecs', '未知')
@@ -947,33 +1039,36 @@ class BilibiliDownloader:
         elif 'mp3' in audio_codecs.lower():
             audio_quality = "MP3"
         
-        print(f"🔊 音频:")
-        print(f"  编码: {audio_codecs} ({audio_quality})")
-        print(f"  比特率: {audio_bitrate//1000}kbps")
-        print(f"  采样率: {audio_sample_rate}Hz")
-        print(f"  声道数: {audio_channels}")
+        logger.debug("🔊 音频:")
+        logger.debug("编码: %s (%s)", audio_codecs, audio_quality)
+        logger.debug("比特率: %skbps", audio_bitrate // 1000)
+        logger.debug("采样率: %sHz", audio_sample_rate)
+        logger.debug("声道数: %s", audio_channels)
         
-        print(f"\n📋 媒体流摘要:")
-        print(f"  视频: {video_height}P {video_codec_type}, {video_bitrate//1000}kbps")
-        print(f"  音频: {audio_quality}, {audio_bitrate//1000}kbps, {audio_sample_rate}Hz")
+        logger.info("媒体流: 视频 %sP %s, %skbps | 音频 %s, %skbps, %sHz",
+                    video_height, video_codec_type, video_bitrate // 1000,
+                    audio_quality, audio_bitrate // 1000, audio_sample_rate)
         
         return best_video, best_audio
     
-    def download_file(self, url, save_path):
+    def download_file(self, url, save_path, backup_urls=None):
         """下载文件，支持断点续传
         
+        传输中途断开、响应体不完整或返回可重试状态码时，通过重试组件从已写入的位置继续下载；
+        服务器忽略Range返回完整内容时从头覆盖写入，不会把重复内容追加到文件末尾。
+        主地址所在主机熔断或重试用尽后依次尝试备用地址。
+        
         Args:
             url: 文件下载链接
             save_path: 保存路径
+            backup_urls: 备用下载链接列表（playurl返回的backup_url）
             
         Returns:
             保存路径
         """
         # 检查文件是否已存在
-        resume_size = 0
         if os.path.exists(save_path):
-            resume_size = os.path.getsize(save_path)
-            print(f"文件已存在，尝试断点续传 (已下载 {resume_size} 字节)")
+            logger.info("文件已存在，尝试断点续传 (已下载 %s 字节)", os.path.getsize(save_path))
         
         # 增强的请求头，添加B站下载必需的头信息
         headers = self.headers.copy()
@@ -990,47 +1085,148 @@ class BilibiliDownloader:
             'Accept-Language': 'zh-CN,zh;q=0.9'
         })
         
+        # 进度条在多次尝试之间复用
+        progress = {'bar': None}
+        urls = [url] + [u for u in (backup_urls or []) if u and u != url]
+        try:
+            for index, candidate in enumerate(urls):
+                try:
+                    self.retrier.call(
+                        self._download_attempt, candidate, save_path, headers, progress,
+                        host=host_of(candidate),
+                        policy=DOWNLOAD_RETRY_POLICY,
+                        on_retry=self._on_download_retry,
+                        description=f"下载 {os.path.basename(save_path)}"
+                    )
+                    return save_path
+                except Exception as e:
+                    if index == len(urls) - 1:
+                        raise
+                    logger.warning("下载地址不可用 (%s)，切换到备用地址", e)
+        finally:
+            if progress['bar'] is not None:
+                progress['bar'].close()
+    
+    def _on_download_retry(self, attempt, error):
+        """下载重试前的回调：403时刷新会话"""
+        if isinstance(error, RetryableResponseError) and error.response.status_code == 403:
+            self._refresh_session()
+    
+    def _download_attempt(self, url, save_path, headers, progress):
+        """发起一次下载请求，从本地文件已有的位置续传
+        
+        Args:
+            url: 文件下载链接
+            save_path: 保存路径
+            headers: 请求头
+            progress: 保存tqdm进度条的字典，多次尝试共用
+            
+        Raises:
+            RetryableResponseError: 返回了可重试的状态码
+            IncompleteDownloadError: 响应体不完整或本地文件与源文件不一致
+        """
+        resume_size = os.path.getsize(save_path) if os.path.exists(save_path) else 0
+        request_headers = dict(headers)
         if resume_size > 0:
-            headers['Range'] = f'bytes={resume_size}-'
+            request_headers['Range'] = f'bytes={resume_size}-'
         
-        # 添加更多的错误处理和重试逻辑
-        max_download_retries = 3
-        for retry in range(max_download_retries):
-            try:
-                # 使用session保持会话一致性
-                response = self.session.get(url, headers=headers, stream=True, timeout=60)
-                response.raise_for_status()
-                break
-            except requests.exceptions.HTTPError as e:
-                if response.status_code == 403 and retry < max_download_retries - 1:
-                    print(f"403错误，{retry + 1} 秒后重试...")
-                    time.sleep(retry + 1)
-                    # 尝试更新Cookie或刷新会话
-                    self._refresh_session()
-                else:
-                    raise e
-            except Exception as e:
-                if retry < max_download_retries - 1:
-                    print(f"下载异常: {str(e)}, {retry + 1} 秒后重试...")
-                    time.sleep(retry + 1)
-                else:
-                    raise e
-        
-        # 获取文件大小
-        total_size = int(response.headers.get('content-length', 0)) + resume_size
-        
-        # 写入文件
-        mode = 'ab' if resume_size > 0 else 'wb'
-        with open(save_path, mode) as f:
-            with tqdm(total=total_size, initial=resume_size, unit='B', unit_scale=True, desc=os.path.basename(save_path)) as pbar:
-                for chunk in response.iter_content(chunk_size=1024 * 1024):
-                    if chunk:
+        # 使用session保持会话一致性
+        response = self.session.get(url, headers=request_headers, stream=True, timeout=60)
+        with response:
+            if response.status_code == 416 and resume_size > 0:
+                # 请求的起始位置超出文件大小：本地文件已完整，或此前写入了错误内容
+                total = response.headers.get('Content-Range', '').rpartition('/')[2]
+                if total.isdigit() and int(total) == resume_size:
+                    return save_path
+                os.remove(save_path)
+                raise IncompleteDownloadError("本地文件大小与源文件不一致，重新下载")
+            if response.status_code in RETRY_STATUSES:
+                raise RetryableResponseError(response, f"HTTP {response.status_code}")
+            response.raise_for_status()
+            
+            if response.status_code == 206:
+                # 确认服务器从请求的位置开始返回
+                content_range = response.headers.get('Content-Range', '')
+                range_start = content_range.replace('bytes ', '').split('-', 1)[0]
+                if not range_start.isdigit() or int(range_start) != resume_size:
+                    os.remove(save_path)
+                    raise IncompleteDownloadError(f"服务器返回的范围与请求不一致: {content_range}")
+                mode, offset = 'ab', resume_size
+            else:
+                if resume_size > 0:
+                    logger.debug("服务器忽略了Range请求，从头下载")
+                mode, offset = 'wb', 0
+            
+            # 获取文件大小
+            length = int(response.headers.get('content-length', 0))
+            total_size = offset + length
+            bar = progress['bar']
+            if bar is None:
+                bar = progress['bar'] = tqdm(total=total_size, initial=offset, unit='B', unit_scale=True,
+                                             desc=os.path.basename(save_path))
+            else:
+                bar.reset(total=total_size)
+                bar.update(offset)
+            
+            # 写入文件：每读取一块前从内存预算中申请，写出后归还
+            written = 0
+            chunks = response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE)
+            with open(save_path, mode) as f:
+                while True:
+                    with self.memory_budget.reserve(DOWNLOAD_CHUNK_SIZE):
+                        chunk = next(chunks, None)
+                        if chunk is None:
+                            break
                         f.write(chunk)
-                        f.flush()
-                        pbar.update(len(chunk))
+                        written += len(chunk)
+                        bar.update(len(chunk))
+                        chunk = None
+            
+            if length and written < length:
+                raise IncompleteDownloadError(f"响应体不完整: {written}/{length} 字节")
+            
+            # 续传拼接后的文件必须与源文件大小（Content-Length / Content-Range）一致
+            actual_size = os.path.getsize(save_path)
+            if length and actual_size != total_size:
+                if actual_size > total_size:
+                    os.remove(save_path)
+                raise IncompleteDownloadError(f"文件大小与源文件不一致: {actual_size}/{total_size} 字节")
         
         return save_path
     
+    @contextmanager
+    def _phase(self, video_metrics, name):
+        """下载流程的一个阶段：记录耗时，启用剖析时同时采集该阶段的剖析数据
+        
+        Args:
+            video_metrics: VideoMetrics实例
+            name: 阶段名称
+        """
+        with video_metrics.phase(name):
+            if self.profiler is None:
+                yield
+            else:
+                with self.profiler.profile(video_metrics.bvid, name):
+                    yield
+    
+    def _download_stream(self, url, save_path, stream, video_metrics, backup_urls=None):
+        """下载单个媒体流并记录耗时和实际传输字节数
+        
+        Args:
+            url: 文件下载链接
+            save_path: 保存路径
+            stream: 流类型（'video' / 'audio'），作为阶段名称
+            video_metrics: VideoMetrics实例
+            backup_urls: 备用下载链接列表
+        """
+        resume_size = os.path.getsize(save_path) if os.path.exists(save_path) else 0
+        start = time.perf_counter()
+        with self._phase(video_metrics, stream):
+            self.download_file(url, save_path, backup_urls=backup_urls)
+        transferred = os.path.getsize(save_path) - resume_size
+        video_metrics.record_transfer(stream, transferred, time.perf_counter() - start)
+        return save_path
+    
     def _refresh_session(self):
         """刷新会话，尝试更新Cookie和请求头"""
         # 重新设置请求头
@@ -1039,16 +1235,12 @@ class BilibiliDownloader:
         pass
     
     def _check_ffmpeg(self):
-        """检查ffmpeg是否可用
+        """检查ffmpeg是否可用（使用进程级缓存的能力信息，不会重复启动ffmpeg）
         
         Returns:
             bool: ffmpeg是否可用
         """
-        try:
-            subprocess.run(['ffmpeg', '-version'], stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=10)
-            return True
-        except (subprocess.SubprocessError, FileNotFoundError):
-            return False
+        return get_ffmpeg_capabilities().available
     
     def merge_video_audio(self, video_path, audio_path, output_path, force_avc=False):
         """合并视频和音频
@@ -1062,16 +1254,24 @@ class BilibiliDownloader:
         Returns:
             输出文件路径
         """
-        if not self._check_ffmpeg():
+        ffmpeg = get_ffmpeg_capabilities()
+        if not ffmpeg.available:
             raise Exception("ffmpeg未安装或未添加到系统PATH中")
         
-        print(f"\n正在合并视频和音频{'并强制转换为AVC格式' if force_avc else '...'}")
+        # 根据缓存的能力信息确认输出容器可用
+        output_format = os.path.splitext(output_path)[1].lstrip('.').lower()
+        if ffmpeg.muxers and not ffmpeg.muxer_for_format(output_format):
+            raise Exception(f"当前ffmpeg不支持输出格式: {output_format}")
+        
+        logger.info("正在合并视频和音频%s", '并强制转换为AVC格式' if force_avc else '...')
         
         # 根据是否需要强制AVC编码设置视频编码参数
         if force_avc:
+            if ffmpeg.encoders and not ffmpeg.has_encoder('libx264'):
+                raise Exception("当前ffmpeg未包含libx264编码器，无法转换为AVC格式")
             # 强制使用H.264/AVC编码
             video_codec = 'libx264'
-            print("使用H.264编码器将视频转换为AVC格式")
+            logger.debug("使用H.264编码器将视频转换为AVC格式")
             # 为H.264编码添加优化参数
             # crf参数控制质量(0-51，0为无损，23为默认，数值越小质量越好)
             # preset参数控制编码速度(slow, medium, fast等，越慢质量越好体积越小)
@@ -1081,8 +1281,11 @@ class BilibiliDownloader:
             video_codec = 'copy'
             avc_params = []
         
+        # 音频编码为AAC以保证兼容性；缺少aac编码器时直接复制音频流
+        audio_codec = 'aac' if not ffmpeg.encoders or ffmpeg.has_encoder('aac') else 'copy'
+        
         command = [
-            'ffmpeg',
+            ffmpeg.path,
             '-i', video_path,
             '-i', audio_path,
             '-c:v', video_codec  # 使用指定的视频编码器
@@ -1093,7 +1296,7 @@ class BilibiliDownloader:
             command.extend(avc_params)
         
         command.extend([
-            '-c:a', 'aac',   # 音频编码为AAC以保证兼容性
+            '-c:a', audio_codec,
             '-y',            # 覆盖已存在的文件
             output_path
         ])
@@ -1109,7 +1312,7 @@ class BilibiliDownloader:
                     error_msg = str(process.stderr)
                 raise Exception(f"ffmpeg合并失败: {error_msg}")
             
-            print("合并完成！")
+            logger.info("合并完成！")
             return output_path
         except subprocess.TimeoutExpired:
             raise Exception("ffmpeg合并超时")
@@ -1143,6 +1346,61 @@ class BilibiliDownloader:
             filename = filename[:197] + '...'
         return filename
     
+    @staticmethod
+    def _part_duration(video_info):
+        """下载的分P的时长（秒）：分P视频只下载第一P，接口的duration是所有分P之和"""
+        cid = video_info.get('cid')
+        page = next((p for p in video_info.get('pages') or [] if p.get('cid') == cid), None)
+        return (page or {}).get('duration') or video_info.get('duration')
+    
+    def _record_download(self, bvid, video_info, output_path):
+        """在视频目录中记录下载完成的视频（含详情接口的元数据和下载分P的时长）"""
+        if self.catalog is None:
+            return
+        try:
+            info = video_info_from_view(video_info)
+            info['bvid'] = bvid
+            self.catalog.upsert_videos(info.get('uid'), [info])
+            self.catalog.mark_downloaded(bvid, output_path, expected_duration=self._part_duration(video_info))
+        except Exception as e:
+            logger.warning("更新视频目录失败: %s", e)
+    
+    def _finish_download(self, bvid, video_info, output_path):
+        """文件到达最终位置后：记录到视频目录，并提交后台完整性校验"""
+        self._record_download(bvid, video_info, output_path)
+        if self.verifier is None:
+            return
+        self.verifier.submit(bvid, output_path, expected_duration=self._part_duration(video_info))
+    
+    def _record_failure(self, bvid, error):
+        """在视频目录中记录下载失败"""
+        if self.catalog is None:
+            return
+        try:
+            self.catalog.mark_failed(bvid, error)
+        except Exception as e:
+            logger.warning("更新视频目录失败: %s", e)
+    
+    def _promote(self, bvid, video_info, output_path, output_dir):
+        """把暂存目录中的成品移动到资料库，移动完成后才在视频目录中记录为已下载
+
+        Returns:
+            str: 文件在资料库中的路径
+        """
+        def on_done(path, size):
+            self._finish_download(bvid, video_info, path)
+
+        def on_error(error):
+            self._record_failure(bvid, error)
+
+        if self.mover is None:
+            path = os.path.join(output_dir, os.path.basename(output_path))
+            LibraryMover().move(output_path, path)
+            on_done(path, None)
+            return path
+        logger.info("已提交到后台移动: %s", os.path.basename(output_path))
+        return self.mover.submit(output_path, output_dir, on_done=on_done, on_error=on_error)
+    
     def download_video(self, bvid, output_dir='./downloads', quality=None, audio_quality=None, format='mp4'):
         """下载单个视频
         
@@ -1154,21 +1412,29 @@ class BilibiliDownloader:
             format: 输出格式 (mp4/mkv/flv)
             
         Returns:
-            下载后的文件路径
+            下载后的文件路径（使用后台移动时为移动完成后的资料库路径）
         """
         start_time = time.time()
+        video_metrics = self.metrics.start_video(bvid)
+        success = False
+        reserved = 0
+        sidecar_jobs = None
         
-        # 创建输出目录
+        # 创建输出目录，临时文件和合并输出写入暂存目录（未指定时即输出目录）
         os.makedirs(output_dir, exist_ok=True)
+        work_dir = self.scratch_dir or output_dir
+        os.makedirs(work_dir, exist_ok=True)
         
-        # 检查ffmpeg
-        if not self._check_ffmpeg():
-            print("警告: ffmpeg未安装或未添加到系统PATH中，将无法合并视频和音频")
+        # 检查ffmpeg（能力信息按进程缓存，后续合并直接复用）
+        ffmpeg_available = self._check_ffmpeg()
+        if not ffmpeg_available:
+            logger.warning("ffmpeg未安装或未添加到系统PATH中，将无法合并视频和音频")
         
         try:
             # 1. 获取视频信息
-            print(f"\n获取视频信息: {bvid}")
-            video_info = self.get_video_info(bvid)
+            logger.info("获取视频信息: %s", bvid)
+            with self._phase(video_metrics, 'info'):
+                video_info = self.get_video_info(bvid)
             
             # 获取视频标题、cid和发布日期
             title = self.clean_filename(video_info.get('title', f'视频_{bvid}'))
@@ -1183,65 +1449,102 @@ class BilibiliDownloader:
             else:
                 publish_date_str = '日期未知'
                 
-            print(f"视频标题: {title}")
-            print(f"视频CID: {cid}")
-            print(f"发布日期: {publish_date_str}")
+            logger.info("视频标题: %s", title)
+            logger.debug("视频CID: %s", cid)
+            logger.debug("发布日期: %s", publish_date_str)
             
             # 2. 获取视频流
-            print("获取视频流信息...")
-            streams = self.get_video_streams(bvid, cid)
+            logger.debug("获取视频流信息...")
+            with self._phase(video_metrics, 'probe'):
+                streams = self.get_video_streams(bvid, cid, video_metrics=video_metrics)
             
             # 3. 选择最佳媒体流
-            best_video, best_audio = self.select_best_stream(streams, quality, audio_quality)
+            with self._phase(video_metrics, 'select'):
+                best_video, best_audio = self.select_best_stream(streams, quality, audio_quality)
             
             # 移除强制转换格式的检测逻辑
             
+            # 按码率和时长估算需要的空间，剩余空间低于水位线时等待或放弃
+            if self.disk_guard is not None:
+                duration = stream_duration(streams, video_info)
+                needed = estimate_stream_bytes(best_video, duration) + estimate_stream_bytes(best_audio, duration)
+                if ffmpeg_available:
+                    needed = int(needed * MERGE_SPACE_FACTOR)
+                reserved = self.disk_guard.admit(needed)
+            
+            # 选定媒体流后不再需要完整的播放地址响应，避免在整个传输期间占用内存
+            streams = None
+            
+            # 附属文件（封面、字幕、弹幕）在后台获取，与媒体流下载同时进行；磁盘空间不足被放弃的视频不获取
+            if self.sidecars is not None:
+                sidecar_jobs = self.sidecars.start(video_info, output_dir, f"{publish_date_str} - {title}")
+            
             # 4. 下载视频和音频
             video_url = best_video.get('base_url')
             audio_url = best_audio.get('base_url')
             
             # 生成临时文件名
-            temp_video = os.path.join(output_dir, f"{bvid}_video_temp.m4s")
-            temp_audio = os.path.join(output_dir, f"{bvid}_audio_temp.m4s")
+            temp_video = os.path.join(work_dir, f"{bvid}_video_temp.m4s")
+            temp_audio = os.path.join(work_dir, f"{bvid}_audio_temp.m4s")
             
             # 下载视频
-            print(f"\n下载视频...")
-            self.download_file(video_url, temp_video)
+            logger.info("下载视频...")
+            self._download_stream(video_url, temp_video, 'video', video_metrics,
+                                  backup_urls=best_video.get('backup_url') or best_video.get('backupUrl'))
             
             # 下载音频
-            print(f"\n下载音频...")
-            self.download_file(audio_url, temp_audio)
+            logger.info("下载音频...")
+            self._download_stream(audio_url, temp_audio, 'audio', video_metrics,
+                                  backup_urls=best_audio.get('backup_url') or best_audio.get('backupUrl'))
             
             # 5. 合并视频和音频 - 格式化为 "上传日期 - 原来的视频名"
             output_filename = f"{publish_date_str} - {title}.{format}"
-            output_path = os.path.join(output_dir, output_filename)
+            output_path = os.path.join(work_dir, output_filename)
             
-            if self._check_ffmpeg():
+            if ffmpeg_available:
                 # 不再强制转换视频格式，始终保留原始编码
-                output_path = self.merge_video_audio(temp_video, temp_audio, output_path, force_avc=False)
+                with self._phase(video_metrics, 'merge'):
+                    output_path = self.merge_video_audio(temp_video, temp_audio, output_path, force_avc=False)
             else:
                 # 如果没有ffmpeg，只保留视频文件
-                print("无法合并音视频，仅保留视频文件")
-                output_path = os.path.join(output_dir, f"{publish_date_str} - {title}_video_only.mp4")
+                logger.warning("无法合并音视频，仅保留视频文件")
+                output_path = os.path.join(work_dir, f"{publish_date_str} - {title}_video_only.mp4")
                 os.rename(temp_video, output_path)
                 if os.path.exists(temp_audio):
                     os.remove(temp_audio)
             
+            # 等待附属文件（通常早已完成，只有比媒体下载更慢时才会等待）
+            if sidecar_jobs:
+                wait_start = time.time()
+                sidecar_result = self.sidecars.collect(sidecar_jobs)
+                video_metrics.phases['sidecars'] = sidecar_result['seconds']
+                video_metrics.phases['sidecar_wait'] = time.time() - wait_start
+                logger.info("附属文件: %s 个", len(sidecar_result['paths']))
+            
             # 6. 计算下载时间
             end_time = time.time()
             duration = end_time - start_time
-            print(f"\n视频下载完成！")
-            print(f"总耗时: {duration:.2f} 秒")
-            print(f"保存路径: {output_path}")
+            logger.info("视频下载完成！")
+            logger.info("总耗时: %.2f 秒", duration)
+            logger.info("保存路径: %s", output_path)
             
+            if work_dir != output_dir:
+                output_path = self._promote(bvid, video_info, output_path, output_dir)
+            else:
+                self._finish_download(bvid, video_info, output_path)
+            success = True
             return output_path
             
         except Exception as e:
-            print(f"\n下载失败: {str(e)}")
+            logger.error("下载失败: %s", e)
+            self._record_failure(bvid, e)
+            # 媒体下载失败时不保留附属文件
+            if sidecar_jobs:
+                self.sidecars.discard(sidecar_jobs)
             # 清理临时文件
             for temp_file in [
-                os.path.join(output_dir, f"{bvid}_video_temp.m4s"),
-                os.path.join(output_dir, f"{bvid}_audio_temp.m4s")
+                os.path.join(work_dir, f"{bvid}_video_temp.m4s"),
+                os.path.join(work_dir, f"{bvid}_audio_temp.m4s")
             ]:
                 if os.path.exists(temp_file):
                     try:
@@ -1249,6 +1552,13 @@ class BilibiliDownloader:
                     except:
                         pass
             return None
+        finally:
+            if reserved:
+                self.disk_guard.release(reserved)
+            video_metrics.phases['total'] = time.time() - start_time
+            self.metrics.finish_video(video_metrics, success)
+            self.metrics.set_gauge('api_request_rate', self.pacer.rate)
+            self.memory_budget.export_gauges(self.metrics)
 
 if __name__ == "__main__":
     # 简单的命令行接口
@@ -0,0 +1,89 @@
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBudget:
+    """进程内传输缓冲区的内存预算
+
+    下载、移动和校验每读取一块数据前先从预算中申请该块的大小，写出后归还；预算用尽时新的读取等待
+    其他传输归还，在途缓冲区总量因此不会随并发视频数和连接数增长。线程安全，所有传输共享同一个实例。
+    单次申请超过总预算时，只要当前没有其他在途缓冲区就允许通过，不会永久阻塞。
+    """
+
+    def __init__(self, limit=None):
+        """初始化内存预算
+
+        Args:
+            limit: 在途缓冲区的总字节数上限，None表示不限制（仍统计在途字节数和峰值）
+        """
+        self.limit = limit
+        self.in_use = 0
+        self.peak = 0
+        self._condition = threading.Condition()
+        self.stats = {'acquired': 0, 'waits': 0, 'waited_seconds': 0.0}
+
+    def set_limit(self, limit):
+        """修改预算上限，正在等待的申请会按新上限重新检查"""
+        with self._condition:
+            self.limit = limit
+            self._condition.notify_all()
+
+    def _fits(self, size):
+        return self.limit is None or self.in_use == 0 or self.in_use + size <= self.limit
+
+    def acquire(self, size):
+        """申请size字节，预算不足时等待"""
+        with self._condition:
+            if not self._fits(size):
+                start = time.monotonic()
+                self.stats['waits'] += 1
+                while not self._fits(size):
+                    self._condition.wait()
+                self.stats['waited_seconds'] += time.monotonic() - start
+            self.in_use += size
+            self.peak = max(self.peak, self.in_use)
+            self.stats['acquired'] += 1
+
+    def release(self, size):
+        """归还size字节"""
+        with self._condition:
+            self.in_use = max(0, self.in_use - size)
+            self._condition.notify_all()
+
+    @contextmanager
+    def reserve(self, size):
+        """在上下文中占用size字节"""
+        self.acquire(size)
+        try:
+            yield
+        finally:
+            self.release(size)
+
+    def export_gauges(self, metrics):
+        """把在途缓冲区字节数、峰值和等待时间写入MetricsRecorder"""
+        if metrics is None:
+            return
+        with self._condition:
+            in_use, peak, waited = self.in_use, self.peak, self.stats['waited_seconds']
+        metrics.set_gauge('inflight_buffer_bytes', in_use)
+        metrics.set_gauge('inflight_buffer_peak_bytes', peak)
+        metrics.set_gauge('memory_budget_wait_seconds', round(waited, 3))
+        if self.limit is not None:
+            metrics.set_gauge('memory_budget_bytes', self.limit)
+
+
+_default_budget = None
+_default_lock = threading.Lock()
+
+
+def get_default_memory_budget():
+    """返回进程内共享的传输缓冲区内存预算（默认不限制，由 --memory-budget 设置上限）"""
+    global _default_budget
+    with _default_lock:
+        if _default_budget is None:
+            _default_budget = MemoryBudget()
+        return _default_budget
@@ -0,0 +1,261 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+# 阶段耗时直方图的桶边界（秒）
+PHASE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+# 传输速率直方图的桶边界（字节/秒）
+THROUGHPUT_BUCKETS = (
+    128 * 1024, 512 * 1024, 1024 * 1024, 2 * 1024 * 1024, 5 * 1024 * 1024,
+    10 * 1024 * 1024, 20 * 1024 * 1024, 50 * 1024 * 1024, 100 * 1024 * 1024
+)
+
+# 每个视频流探测请求次数直方图的桶边界
+PROBE_ATTEMPT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+# 导出指标名前缀
+METRIC_PREFIX = 'bilibili_download'
+
+
+class Histogram:
+    """累积直方图，与Prometheus histogram语义一致"""
+
+    def __init__(self, buckets):
+        """初始化直方图
+
+        Args:
+            buckets: 升序排列的桶上边界
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        """记录一个观测值"""
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def cumulative_counts(self):
+        """返回各桶的累积计数（le语义）"""
+        result = []
+        total = 0
+        for c in self.counts:
+            total += c
+            result.append(total)
+        return result
+
+    def to_dict(self):
+        """转换为可JSON序列化的字典"""
+        return {
+            'buckets': list(self.buckets),
+            'counts': self.cumulative_counts(),
+            'count': self.count,
+            'sum': self.sum
+        }
+
+
+class VideoMetrics:
+    """单个视频的下载指标"""
+
+    def __init__(self, bvid):
+        self.bvid = bvid
+        self.started_at = time.time()
+        self.phases = {}
+        self.probe_attempts = 0
+        self.transfers = {}
+        self.success = None
+
+    @contextmanager
+    def phase(self, name):
+        """计时上下文，记录一个阶段的耗时（同名阶段累加）"""
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def record_transfer(self, stream, num_bytes, seconds):
+        """记录一次流传输
+
+        Args:
+            stream: 流类型，如 'video' / 'audio'
+            num_bytes: 本次实际传输的字节数
+            seconds: 传输耗时
+        """
+        transfer = self.transfers.setdefault(stream, {'bytes': 0, 'seconds': 0.0})
+        transfer['bytes'] += num_bytes
+        transfer['seconds'] += seconds
+
+    def throughput(self, stream):
+        """返回指定流的平均传输速率（字节/秒），无数据时返回None"""
+        transfer = self.transfers.get(stream)
+        if not transfer or transfer['seconds'] <= 0:
+            return None
+        return transfer['bytes'] / transfer['seconds']
+
+    def to_dict(self):
+        """转换为可JSON序列化的字典"""
+        return {
+            'bvid': self.bvid,
+            'started_at': self.started_at,
+            'success': self.success,
+            'phases': {name: round(seconds, 6) for name, seconds in self.phases.items()},
+            'probe_attempts': self.probe_attempts,
+            'transfers': {
+                stream: {
+                    'bytes': t['bytes'],
+                    'seconds': round(t['seconds'], 6),
+                    'bytes_per_second': self.throughput(stream)
+                } for stream, t in self.transfers.items()
+            }
+        }
+
+
+class MetricsRecorder:
+    """下载指标记录器：按视频记录各阶段耗时，并汇总为批次直方图
+
+    线程安全，可在多个下载任务之间共享，运行结束时导出为
+    Prometheus textfile collector格式或JSON。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.videos = []
+        self.phase_histograms = {}
+        self.throughput_histograms = {}
+        self.probe_histogram = Histogram(PROBE_ATTEMPT_BUCKETS)
+        self.bytes_total = {}
+        self.results = {'success': 0, 'failure': 0}
+        self.gauges = {}
+
+    def start_video(self, bvid):
+        """开始记录一个视频，返回VideoMetrics"""
+        return VideoMetrics(bvid)
+
+    def finish_video(self, video_metrics, success):
+        """结束一个视频的记录并汇总到批次直方图"""
+        video_metrics.success = bool(success)
+        with self._lock:
+            self.videos.append(video_metrics)
+            self.results['success' if success else 'failure'] += 1
+            for name, seconds in video_metrics.phases.items():
+                histogram = self.phase_histograms.setdefault(name, Histogram(PHASE_BUCKETS))
+                histogram.observe(seconds)
+            if video_metrics.probe_attempts:
+                self.probe_histogram.observe(video_metrics.probe_attempts)
+            for stream, transfer in video_metrics.transfers.items():
+                self.bytes_total[stream] = self.bytes_total.get(stream, 0) + transfer['bytes']
+                rate = video_metrics.throughput(stream)
+                if rate is not None:
+                    histogram = self.throughput_histograms.setdefault(stream, Histogram(THROUGHPUT_BUCKETS))
+                    histogram.observe(rate)
+
+    def set_gauge(self, name, value):
+        """设置一个瞬时值指标（导出时加上统一前缀）"""
+        with self._lock:
+            self.gauges[name] = value
+
+    def to_dict(self):
+        """转换为可JSON序列化的字典"""
+        with self._lock:
+            return {
+                'started_at': self.started_at,
+                'finished_at': time.time(),
+                'results': dict(self.results),
+                'bytes_total': dict(self.bytes_total),
+                'gauges': dict(self.gauges),
+                'histograms': {
+                    'phase_seconds': {name: h.to_dict() for name, h in self.phase_histograms.items()},
+                    'throughput_bytes_per_second': {stream: h.to_dict() for stream, h in self.throughput_histograms.items()},
+                    'probe_attempts': self.probe_histogram.to_dict()
+                },
+                'videos': [v.to_dict() for v in self.videos]
+            }
+
+    def _format_histogram(self, lines, name, histogram, labels):
+        """按Prometheus文本格式输出一个直方图"""
+        label_str = ','.join(f'{k}="{v}"' for k, v in labels.items())
+        prefix = label_str + ',' if label_str else ''
+        for bound, count in zip(histogram.buckets, histogram.cumulative_counts()):
+            lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {count}')
+        lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {histogram.count}')
+        suffix = f'{{{label_str}}}' if label_str else ''
+        lines.append(f'{name}_sum{suffix} {histogram.sum}')
+        lines.append(f'{name}_count{suffix} {histogram.count}')
+
+    def to_prometheus(self):
+        """生成Prometheus textfile collector格式的文本"""
+        with self._lock:
+            lines = []
+
+            name = f'{METRIC_PREFIX}_phase_seconds'
+            lines.append(f'# HELP {name} Time spent in each download pipeline phase per video.')
+            lines.append(f'# TYPE {name} histogram')
+            for phase, histogram in sorted(self.phase_histograms.items()):
+                self._format_histogram(lines, name, histogram, {'phase': phase})
+
+            name = f'{METRIC_PREFIX}_throughput_bytes_per_second'
+            lines.append(f'# HELP {name} Average transfer rate per stream per video.')
+            lines.append(f'# TYPE {name} histogram')
+            for stream, histogram in sorted(self.throughput_histograms.items()):
+                self._format_histogram(lines, name, histogram, {'stream': stream})
+
+            name = f'{METRIC_PREFIX}_probe_attempts'
+            lines.append(f'# HELP {name} Playurl requests needed to resolve streams per video.')
+            lines.append(f'# TYPE {name} histogram')
+            self._format_histogram(lines, name, self.probe_histogram, {})
+
+            name = f'{METRIC_PREFIX}_bytes_total'
+            lines.append(f'# HELP {name} Bytes transferred per stream.')
+            lines.append(f'# TYPE {name} counter')
+            for stream, total in sorted(self.bytes_total.items()):
+                lines.append(f'{name}{{stream="{stream}"}} {total}')
+
+            name = f'{METRIC_PREFIX}_videos_total'
+            lines.append(f'# HELP {name} Videos processed by result.')
+            lines.append(f'# TYPE {name} counter')
+            for result, count in sorted(self.results.items()):
+                lines.append(f'{name}{{result="{result}"}} {count}')
+
+            for gauge, value in sorted(self.gauges.items()):
+                name = f'{METRIC_PREFIX}_{gauge}'
+                lines.append(f'# TYPE {name} gauge')
+                lines.append(f'{name} {value}')
+
+            name = f'{METRIC_PREFIX}_run_duration_seconds'
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name} {time.time() - self.started_at:g}')
+
+            name = f'{METRIC_PREFIX}_last_run_timestamp_seconds'
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name} {time.time():g}')
+
+            return '\n'.join(lines) + '\n'
+
+    def _write_atomic(self, path, content):
+        """先写临时文件再替换，textfile collector不会读到写了一半的文件"""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(temp_path, path)
+
+    def write_prometheus(self, path):
+        """导出为Prometheus textfile collector文件（建议以.prom结尾）"""
+        self._write_atomic(path, self.to_prometheus())
+        return path
+
+    def write_json(self, path):
+        """导出为JSON文件"""
+        self._write_atomic(path, json.dumps(self.to_dict(), ensure_ascii=False, indent=2))
+        return path
@@ -0,0 +1,921 @@
+import re
+import json
+import time
+import zlib
+import random
+import socket
+import struct
+import logging
+import argparse
+import threading
+from http.cookies import SimpleCookie
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from bilibili_wbi import get_mixin_key, sign_params
+
+logger = logging.getLogger(__name__)
+
+# 合成媒体内容的重复块（64KiB），任意偏移处的内容都可直接计算，支持Range请求
+PATTERN_BLOCK = bytes(range(256)) * 256
+
+# 每次写入套接字的最大字节数
+WRITE_CHUNK_SIZE = 64 * 1024
+
+# 模拟的WBI密钥（nav接口返回的wbi_img地址中的文件名，空间页面的localStorage中也会写入）
+MOCK_IMG_KEY = '7cd084941338484aae1ad9425b84077c'
+MOCK_SUB_KEY = '4932caff0ff746eab6f01bf08b70ac45'
+
+# 静态资源的Content-Type
+ASSET_CONTENT_TYPES = {
+    'jpg': 'image/jpeg', 'png': 'image/png', 'webp': 'image/webp',
+    'woff2': 'font/woff2', 'mp4': 'video/mp4', 'js': 'application/javascript',
+}
+
+# 模拟的视频流规格：(清晰度ID, 宽, 高, 编码, 码率占比)
+VIDEO_PROFILES = [
+    (120, 3840, 2160, 'avc1.640033', 1.0),
+    (120, 3840, 2160, 'hev1.1.6.L153.90', 0.7),
+    (116, 1920, 1080, 'avc1.640032', 0.45),
+    (80, 1920, 1080, 'avc1.640028', 0.35),
+    (64, 1280, 720, 'avc1.64001F', 0.2),
+    (32, 852, 480, 'avc1.64001E', 0.1),
+    (16, 640, 360, 'avc1.64001E', 0.05),
+]
+
+# 模拟的音频流规格：(音质ID, 编码, 码率)
+AUDIO_PROFILES = [
+    (30280, 'mp4a.40.2', 320000),
+    (30232, 'mp4a.40.2', 128000),
+    (30216, 'mp4a.40.2', 64000),
+]
+
+
+def parse_size(value):
+    """解析带单位的大小，如 '10M' -> 10485760，'512K' -> 524288"""
+    value = str(value).strip().upper()
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    if value and value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(float(value))
+
+
+def synthetic_bytes(offset, length):
+    """返回合成媒体内容中 [offset, offset+length) 区间的字节"""
+    start = offset % len(PATTERN_BLOCK)
+    data = PATTERN_BLOCK[start:start + length]
+    while len(data) < length:
+        data += PATTERN_BLOCK[:length - len(data)]
+    return data
+
+
+# 故障注入时可返回的HTTP错误状态码（412为B站风控拦截）
+FAULT_STATUSES = (403, 412, 500, 502, 503)
+
+
+class MockFaultConfig:
+    """故障注入配置，各概率取值0~1，按请求独立抽样"""
+
+    def __init__(self, error_rate=0.0, error_statuses=FAULT_STATUSES, reset_rate=0.0, truncate_rate=0.0,
+                 ignore_range_rate=0.0, stall_rate=0.0, stall_seconds=5.0, seed=None):
+        """初始化故障注入配置
+
+        Args:
+            error_rate: 任意请求直接返回错误状态码的概率
+            error_statuses: 错误状态码候选列表
+            reset_rate: 媒体请求在传输中途被RST重置连接的概率
+            truncate_rate: 媒体请求在传输中途被正常关闭（响应体不完整）的概率
+            ignore_range_rate: 媒体请求忽略Range头、返回200和完整内容的概率
+            stall_rate: 媒体请求在传输中途停顿（slow-loris）的概率
+            stall_seconds: 每次停顿的秒数
+            seed: 随机种子，指定后故障序列可重复
+        """
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.reset_rate = reset_rate
+        self.truncate_rate = truncate_rate
+        self.ignore_range_rate = ignore_range_rate
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+        self.seed = seed
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        """是否启用了任何故障"""
+        return any((self.error_rate, self.reset_rate, self.truncate_rate, self.ignore_range_rate, self.stall_rate))
+
+    def roll(self, rate):
+        """按概率抽样一次"""
+        if rate <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < rate
+
+    def choice(self, values):
+        with self._lock:
+            return self._rng.choice(values)
+
+    def uniform(self, low, high):
+        with self._lock:
+            return self._rng.uniform(low, high)
+
+    def to_dict(self):
+        """转换为可JSON序列化的字典"""
+        return {k: v for k, v in vars(self).items() if not k.startswith('_')}
+
+
+def add_fault_arguments(parser):
+    """向argparse解析器添加故障注入参数（模拟服务器和基准测试共用）"""
+    parser.add_argument('--error-rate', type=float, default=0.0, help='请求直接返回403/412/5xx的概率')
+    parser.add_argument('--reset-rate', type=float, default=0.0, help='媒体传输中途重置连接的概率')
+    parser.add_argument('--truncate-rate', type=float, default=0.0, help='媒体响应体被截断的概率')
+    parser.add_argument('--ignore-range-rate', type=float, default=0.0, help='忽略Range头返回完整内容的概率')
+    parser.add_argument('--stall-rate', type=float, default=0.0, help='媒体传输中途停顿的概率')
+    parser.add_argument('--stall-seconds', type=float, default=5.0, help='每次停顿的秒数')
+    parser.add_argument('--seed', type=int, default=None, help='故障注入随机种子')
+
+
+def fault_config_from_args(args):
+    """根据add_fault_arguments添加的参数创建MockFaultConfig"""
+    return MockFaultConfig(
+        error_rate=args.error_rate,
+        reset_rate=args.reset_rate,
+        truncate_rate=args.truncate_rate,
+        ignore_range_rate=args.ignore_range_rate,
+        stall_rate=args.stall_rate,
+        stall_seconds=args.stall_seconds,
+        seed=args.seed
+    )
+
+
+class MockBilibiliConfig:
+    """模拟服务器配置"""
+
+    def __init__(self, video_size=64 * 1024 * 1024, audio_size=4 * 1024 * 1024, bandwidth=None,
+                 latency=0.0, max_height=2160, duration=600, up_video_count=120, faults=None, api_rate_limit=None,
+                 asset_size=64 * 1024, space_page_size=30, require_wbi=False, fingerprint_requests=None):
+        """初始化配置
+
+        Args:
+            video_size: 最高画质视频流的字节数（其他画质按码率比例缩小）
+            audio_size: 最高音质音频流的字节数
+            bandwidth: 每个连接的带宽上限（字节/秒），None表示不限速
+            latency: 每个请求在返回响应头前的延迟（秒）
+            max_height: 返回的最高分辨率，小于2160时下载器会遍历所有探测组合
+            duration: 视频时长（秒）
+            up_video_count: 每个UP主的投稿数量（空间视频列表接口）
+            faults: MockFaultConfig实例，None表示不注入故障
+            api_rate_limit: API接口允许的持续请求速率（次/秒，允许1秒的突发），
+                超出时像B站风控一样返回HTTP 412和code -412，None表示不限制
+            asset_size: 空间页面引用的每个封面、头像、字体等静态资源的字节数
+            space_page_size: 模拟空间页面（/space/{mid}/video）每页的视频卡片数量
+            require_wbi: 空间列表接口是否要求有效的WBI签名和buvid3 Cookie，不满足时返回-352
+            fingerprint_requests: 每个buvid3允许的空间列表请求次数，超出后返回-352（模拟指纹被风控），None表示不限制
+        """
+        self.video_size = video_size
+        self.audio_size = audio_size
+        self.bandwidth = bandwidth
+        self.latency = latency
+        self.max_height = max_height
+        self.duration = duration
+        self.up_video_count = up_video_count
+        self.faults = faults or MockFaultConfig()
+        self.api_rate_limit = api_rate_limit
+        self.asset_size = asset_size
+        self.space_page_size = space_page_size
+        self.require_wbi = require_wbi
+        self.fingerprint_requests = fingerprint_requests
+
+    def to_dict(self):
+        """转换为可JSON序列化的字典"""
+        data = dict(vars(self))
+        data['faults'] = self.faults.to_dict()
+        return data
+
+
+class MockBilibiliState:
+    """模拟服务器运行统计（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def count_request(self, route):
+        with self._lock:
+            self.requests[route] = self.requests.get(route, 0) + 1
+
+    def take_api_token(self, rate):
+        """从API令牌桶中取一个令牌（桶容量为1秒的请求量），取不到返回False"""
+        with self._lock:
+            now = time.monotonic()
+            capacity = max(1.0, rate)
+            if self._api_tokens is None:
+                self._api_tokens = capacity
+            else:
+                self._api_tokens = min(capacity, self._api_tokens + (now - self._api_refilled) * rate)
+            self._api_refilled = now
+            if self._api_tokens < 1:
+                return False
+            self._api_tokens -= 1
+            return True
+
+    def issue_buvid(self):
+        """生成新的buvid3（每次调用finger/spi接口都不同）"""
+        with self._lock:
+            self._buvid_serial += 1
+            return f"MOCK{self._buvid_serial:08d}-0000-0000-0000-000000000000infoc"
+
+    def use_fingerprint(self, buvid):
+        """记录一次使用该buvid3的请求，返回该buvid3累计的请求次数"""
+        with self._lock:
+            self.fingerprint_uses[buvid] = self.fingerprint_uses.get(buvid, 0) + 1
+            return self.fingerprint_uses[buvid]
+
+    def count_fault(self, fault):
+        with self._lock:
+            self.faults[fault] = self.faults.get(fault, 0) + 1
+
+    def add_bytes(self, num_bytes, media=False):
+        with self._lock:
+            self.bytes_sent += num_bytes
+            if media:
+                self.media_bytes_sent += num_bytes
+
+    def record_media(self, bvid, path, size):
+        """记录某个视频被请求过的媒体文件及其完整大小"""
+        with self._lock:
+            self.media_sizes.setdefault(bvid, {})[path] = size
+
+    def snapshot(self):
+        """返回当前统计的副本"""
+        with self._lock:
+            return {
+                'requests': dict(self.requests),
+                'faults': dict(self.faults),
+                'bytes_sent': self.bytes_sent,
+                'media_bytes_sent': self.media_bytes_sent,
+                'media_sizes': {bvid: dict(sizes) for bvid, sizes in self.media_sizes.items()}
+            }
+
+    def reset(self):
+        with self._lock:
+            self.requests = {}
+            self.faults = {}
+            self.bytes_sent = 0
+            self.media_bytes_sent = 0
+            self.media_sizes = {}
+            self.fingerprint_uses = {}
+            self._buvid_serial = getattr(self, '_buvid_serial', 0)
+            self._api_tokens = None
+            self._api_refilled = 0.0
+
+
+# 每个6分钟弹幕分段中的弹幕条数
+DANMAKU_PER_SEGMENT = 50
+
+
+def _protobuf_varint(value):
+    """编码protobuf varint"""
+    out = bytearray()
+    while True:
+        byte = value & 0x7f
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _protobuf_field(field, value):
+    """编码一个protobuf字段：int为varint，str/bytes为长度分隔"""
+    if isinstance(value, int):
+        return _protobuf_varint(field << 3) + _protobuf_varint(value)
+    if isinstance(value, str):
+        value = value.encode('utf-8')
+    return _protobuf_varint(field << 3 | 2) + _protobuf_varint(len(value)) + value
+
+
+def _danmaku_segment(cid, index, duration):
+    """生成一段合成弹幕（DmSegMobileReply），超出视频时长的分段为空"""
+    start_ms = (index - 1) * 360000
+    end_ms = min(index * 360000, duration * 1000)
+    if start_ms >= end_ms:
+        return b''
+    step = max(1, (end_ms - start_ms) // DANMAKU_PER_SEGMENT)
+    segment = bytearray()
+    for n, progress in enumerate(range(start_ms, end_ms, step)):
+        elem = b''.join((
+            _protobuf_field(1, cid * 1000 + index * 100 + n),
+            _protobuf_field(2, progress),
+            _protobuf_field(3, 1),
+            _protobuf_field(4, 25),
+            _protobuf_field(5, 16777215),
+            _protobuf_field(6, f'{zlib.crc32(str(n).encode()):08x}'),
+            _protobuf_field(7, f'模拟弹幕 {index}-{n}'),
+            _protobuf_field(8, 1600000000 + n),
+        ))
+        segment += _protobuf_field(1, elem)
+    return bytes(segment)
+
+
+def _cid_for(bvid):
+    """根据BV号生成稳定的cid"""
+    return zlib.crc32(bvid.encode('utf-8')) + 100000
+
+
+class MockBilibiliHandler(BaseHTTPRequestHandler):
+    """模拟B站API和CDN的请求处理器"""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'MockBilibili/1.0'
+
+    # 路由表：(路径正则, 处理方法名, 统计用路由名)
+    ROUTES = [
+        (re.compile(r'^/x/web-interface/view$'), '_handle_view', 'view'),
+        (re.compile(r'^/x/player/(?:wbi/)?playurl(?:/v2)?$'), '_handle_playurl', 'playurl'),
+        (re.compile(r'^/x/player/(?:wbi/)?v2$'), '_handle_player_v2', 'player_v2'),
+        (re.compile(r'^/x/v2/dm/web/seg\.so$'), '_handle_danmaku', 'danmaku'),
+        (re.compile(r'^/subtitle/(?P<bvid>[^/-]+)-(?P<lan>[\w-]+)\.json$'), '_handle_subtitle', 'subtitle'),
+        (re.compile(r'^/x/space/(?:wbi/)?acc/info$'), '_handle_up_info', 'up_info'),
+        (re.compile(r'^/x/space/(?:wbi/)?arc/search$'), '_handle_arc_search', 'arc_search'),
+        (re.compile(r'^/x/web-interface/nav$'), '_handle_nav', 'nav'),
+        (re.compile(r'^/x/frontend/finger/spi$'), '_handle_finger_spi', 'finger_spi'),
+        (re.compile(r'^/space/(?P<mid>\d+)/video$'), '_handle_space_page', 'space_page'),
+        (re.compile(r'^/(?:cover|face|static)/[^/]+\.(?P<ext>jpg|png|webp|woff2|mp4|js)$'), '_handle_asset', 'asset'),
+        (re.compile(r'^/upgcxcode/(?P<bvid>[^/]+)/(?P<kind>video|audio)-(?P<stream_id>\d+)-(?P<variant>\d+)\.m4s$'),
+         '_handle_media', 'media'),
+    ]
+
+    def log_message(self, format, *args):
+        """将访问日志转到logging的调试级别"""
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    @property
+    def config(self):
+        return self.server.config
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def do_GET(self):
+        self._dispatch(send_body=True)
+
+    def do_HEAD(self):
+        self._dispatch(send_body=False)
+
+    def _dispatch(self, send_body):
+        """根据路径分发请求"""
+        parsed = urlparse(self.path)
+        self.query = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+        for pattern, handler_name, route in self.ROUTES:
+            match = pattern.match(parsed.path)
+            if match:
+                self.state.count_request(route)
+                if self.config.latency:
+                    time.sleep(self.config.latency)
+                try:
+                    if self._inject_error(send_body) or self._rate_limited(route, send_body):
+                        return
+                    getattr(self, handler_name)(match, send_body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                return
+        self.state.count_request('not_found')
+        self._send_json({'code': -404, 'message': '啥都木有'}, status=404, send_body=send_body)
+
+    def _inject_error(self, send_body):
+        """按概率直接返回错误状态码，返回是否已注入"""
+        faults = self.config.faults
+        if not faults.roll(faults.error_rate):
+            return False
+        status = faults.choice(faults.error_statuses)
+        self.state.count_fault(f'http_{status}')
+        code = -412 if status == 412 else -status
+        self._send_json({'code': code, 'message': '请求被拦截' if status == 412 else '模拟故障'},
+                        status=status, send_body=send_body)
+        return True
+
+    def _rate_limited(self, route, send_body):
+        """API请求超过限速时返回风控拦截，返回是否已拦截"""
+        rate = self.config.api_rate_limit
+        if not rate or route in ('media', 'asset', 'space_page', 'subtitle') or self.state.take_api_token(rate):
+            return False
+        self.state.count_fault('rate_limited')
+        self._send_json({'code': -412, 'message': '请求过于频繁，请稍后再试'}, status=412, send_body=send_body)
+        return True
+
+    def _send_json(self, payload, status=200, send_body=True):
+        """发送JSON响应"""
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+            self.state.add_bytes(len(body))
+
+    def _base_url(self):
+        """返回本服务器的根地址，用于生成媒体流地址"""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handle_view(self, match, send_body):
+        """视频信息接口 x/web-interface/view"""
+        bvid = self.query.get('bvid', 'BV1mock000000')
+        cid = _cid_for(bvid)
+        pubdate = 1600000000 + cid % 100000000
+        self._send_json({
+            'code': 0,
+            'message': '0',
+            'data': {
+                'bvid': bvid,
+                'aid': cid * 7,
+                'cid': cid,
+                'title': f'模拟视频 {bvid}',
+                'desc': f'模拟视频 {bvid} 的简介',
+                'pic': f"{self._base_url()}/cover/{bvid}.jpg",
+                'pubdate': pubdate,
+                'ctime': pubdate,
+                'duration': self.config.duration,
+                'owner': {'mid': 10000 + cid % 1000, 'name': '模拟UP主'},
+                'pages': [{'cid': cid, 'page': 1, 'part': f'模拟视频 {bvid}', 'duration': self.config.duration}],
+                'stat': {'view': cid % 100000, 'danmaku': cid % 1000, 'reply': cid % 500}
+            }
+        }, send_body=send_body)
+
+    def _handle_player_v2(self, match, send_body):
+        """播放器信息接口 x/player/v2，只返回CC字幕列表"""
+        bvid = self.query.get('bvid', 'BV1mock000000')
+        base = self._base_url()
+        subtitles = [{'id': index, 'lan': lan, 'lan_doc': doc, 'subtitle_url': f"{base}/subtitle/{bvid}-{lan}.json"}
+                     for index, (lan, doc) in enumerate((('zh-CN', '中文（中国）'), ('ai-zh', '中文（自动生成）')))]
+        self._send_json({'code': 0, 'message': '0', 'data': {
+            'bvid': bvid, 'cid': _cid_for(bvid), 'subtitle': {'allow_submit': False, 'subtitles': subtitles}
+        }}, send_body=send_body)
+
+    def _handle_subtitle(self, match, send_body):
+        """CC字幕JSON（字幕CDN）"""
+        duration = self.config.duration
+        body = [{'from': float(t), 'to': float(t) + 4.5, 'location': 2,
+                 'content': f"{match.group('lan')} 字幕 {t // 5}"} for t in range(0, duration, 5)]
+        self._send_json({'font_size': 0.4, 'font_color': '#FFFFFF', 'body': body}, send_body=send_body)
+
+    def _handle_danmaku(self, match, send_body):
+        """分段弹幕接口 x/v2/dm/web/seg.so，返回protobuf"""
+        cid = int(self.query.get('oid', 0))
+        index = int(self.query.get('segment_index', 1))
+        body = _danmaku_segment(cid, index, self.config.duration)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+            self.state.add_bytes(len(body))
+
+    def _stream_size(self, kind, ratio):
+        """计算某个流的字节数"""
+        base = self.config.video_size if kind == 'video' else self.config.audio_size
+        return max(1, int(base * ratio))
+
+    def _handle_playurl(self, match, send_body):
+        """播放地址接口 x/player/playurl 及其 wbi/v2 变体，返回DASH格式"""
+        bvid = self.query.get('bvid', 'BV1mock000000')
+        base = self._base_url()
+        duration = self.config.duration
+        videos = []
+        for variant, (stream_id, width, height, codecs, ratio) in enumerate(VIDEO_PROFILES):
+            if height > self.config.max_height:
+                continue
+            size = self._stream_size('video', ratio)
+            url = f"{base}/upgcxcode/{bvid}/video-{stream_id}-{variant}.m4s"
+            videos.append({
+                'id': stream_id,
+                'base_url': url,
+                'baseUrl': url,
+                'backup_url': [url],
+                'bandwidth': int(size * 8 / duration),
+                'mimeType': 'video/mp4',
+                'mime_type': 'video/mp4',
+                'codecs': codecs,
+                'width': width,
+                'height': height,
+                'frameRate': '60' if height >= 1080 else '30',
+                'codecid': 12 if codecs.startswith('hev') else 7,
+                'segment_base': {'initialization': '0-1000', 'index_range': '1001-2000'}
+            })
+        audios = []
+        for variant, (stream_id, codecs, bitrate) in enumerate(AUDIO_PROFILES):
+            ratio = bitrate / AUDIO_PROFILES[0][2]
+            url = f"{base}/upgcxcode/{bvid}/audio-{stream_id}-{variant}.m4s"
+            audios.append({
+                'id': stream_id,
+                'base_url': url,
+                'baseUrl': url,
+                'backup_url': [url],
+                'bandwidth': int(self._stream_size('audio', ratio) * 8 / duration),
+                'mimeType': 'audio/mp4',
+                'mime_type': 'audio/mp4',
+                'codecs': codecs,
+                'sampling_rate': 48000,
+                'channels': 2,
+                'segment_base': {'initialization': '0-900', 'index_range': '901-1500'}
+            })
+        accept_quality = sorted({v['id'] for v in videos}, reverse=True)
+        self._send_json({
+            'code': 0,
+            'message': '0',
+            'data': {
+                'quality': accept_quality[0] if accept_quality else 16,
+                'format': 'dash',
+                'timelength': duration * 1000,
+                'accept_quality': accept_quality,
+                'dash': {'duration': duration, 'video': videos, 'audio': audios}
+            }
+        }, send_body=send_body)
+
+    def _handle_up_info(self, match, send_body):
+        """UP主信息接口 x/space/acc/info"""
+        mid = self.query.get('mid', '0')
+        self._send_json({
+            'code': 0,
+            'message': '0',
+            'data': {'mid': int(mid) if mid.isdigit() else 0, 'name': f'模拟UP主{mid}', 'sign': '模拟签名',
+                     'level': 6, 'face': '', 'fans': 12345, 'archive_count': self.config.up_video_count}
+        }, send_body=send_body)
+
+    def _handle_nav(self, match, send_body):
+        """导航栏用户信息接口 x/web-interface/nav（未登录时code为-101，但仍返回WBI密钥）"""
+        self._send_json({
+            'code': -101,
+            'message': '账号未登录',
+            'data': {
+                'isLogin': False,
+                'wbi_img': {
+                    'img_url': f'https://i0.hdslb.com/bfs/wbi/{MOCK_IMG_KEY}.png',
+                    'sub_url': f'https://i0.hdslb.com/bfs/wbi/{MOCK_SUB_KEY}.png'
+                }
+            }
+        }, send_body=send_body)
+
+    def _handle_finger_spi(self, match, send_body):
+        """设备指纹接口 x/frontend/finger/spi，返回新的buvid3/buvid4"""
+        buvid = self.state.issue_buvid()
+        self._send_json({'code': 0, 'message': 'ok', 'data': {'b_3': buvid, 'b_4': buvid.replace('infoc', '-b4')}},
+                        send_body=send_body)
+
+    def _fingerprint_rejected(self):
+        """空间列表请求是否因签名或设备指纹无效被风控，返回拒绝原因或None"""
+        cookies = SimpleCookie(self.headers.get('Cookie', ''))
+        buvid = cookies['buvid3'].value if 'buvid3' in cookies else None
+        if self.config.require_wbi:
+            if not buvid:
+                return 'no_buvid3'
+            if not self.query.get('wts', '').isdigit():
+                return 'bad_w_rid'
+            expected = sign_params({k: v for k, v in self.query.items() if k not in ('w_rid', 'wts')},
+                                   get_mixin_key(MOCK_IMG_KEY, MOCK_SUB_KEY), wts=self.query.get('wts', 0))
+            if self.query.get('w_rid') != expected['w_rid']:
+                return 'bad_w_rid'
+        limit = self.config.fingerprint_requests
+        if limit and buvid and self.state.use_fingerprint(buvid) > limit:
+            return 'fingerprint_flagged'
+        return None
+
+    def _handle_arc_search(self, match, send_body):
+        """UP主投稿列表接口 x/space/wbi/arc/search"""
+        rejected = self._fingerprint_rejected()
+        if rejected:
+            self.state.count_fault(rejected)
+            self._send_json({'code': -352, 'message': '风控校验失败'}, send_body=send_body)
+            return
+        mid = self.query.get('mid', '0')
+        try:
+            pn = max(1, int(self.query.get('pn', 1)))
+            ps = max(1, min(50, int(self.query.get('ps', 30))))
+        except ValueError:
+            self._send_json({'code': -400, 'message': '请求错误'}, send_body=send_body)
+            return
+        total = self.config.up_video_count
+        start = (pn - 1) * ps
+        vlist = []
+        for index in range(start, min(start + ps, total)):
+            # 与真实BV号一样为12个字符
+            bvid = f"BV1m{int(mid) % 1000 if mid.isdigit() else 0:03d}{index:05d}"
+            created = 1700000000 - index * 86400
+            vlist.append({
+                'bvid': bvid,
+                'aid': _cid_for(bvid) * 7,
+                'title': f'模拟投稿 {index + 1}',
+                'description': f'第 {index + 1} 个模拟投稿',
+                'pic': f"{self._base_url()}/cover/{bvid}.jpg",
+                'created': created,
+                'length': f"{self.config.duration // 60}:{self.config.duration % 60:02d}",
+                'play': 1000 + index,
+                'comment': index,
+                'video_review': index * 2,
+                'favorites': index * 3,
+                'author': f'模拟UP主{mid}',
+                'mid': int(mid) if mid.isdigit() else 0,
+                'typeid': 17,
+                'typename': '单机游戏',
+                'is_union_video': 0
+            })
+        self._send_json({
+            'code': 0,
+            'message': '0',
+            'data': {
+                'list': {'vlist': vlist, 'tlist': {}},
+                'page': {'pn': pn, 'ps': ps, 'count': total}
+            }
+        }, send_body=send_body)
+
+    def _handle_space_page(self, match, send_body):
+        """UP主空间视频页 space.bilibili.com/{mid}/video 的简化版本
+
+        与真实页面一样引用封面、头像、字体、预览视频和统计脚本，用于测量浏览器加载和滚动的开销。
+        """
+        mid = match.group('mid')
+        try:
+            pn = max(1, int(self.query.get('pn', 1)))
+        except ValueError:
+            pn = 1
+        size = self.config.space_page_size
+        start = (pn - 1) * size
+        cards = []
+        for index in range(start, min(start + size, self.config.up_video_count)):
+            bvid = f"BV1m{int(mid) % 1000:03d}{index:05d}"
+            cards.append(
+                f'<li class="small-item" data-aid="{bvid}">'
+                f'<a class="cover" href="//www.bilibili.com/video/{bvid}" target="_blank">'
+                f'<img loading="lazy" src="/cover/{bvid}.jpg" width="320" height="180">'
+                f'<span class="length">{self.config.duration // 60}:{self.config.duration % 60:02d}</span></a>'
+                f'<a class="title" href="//www.bilibili.com/video/{bvid}" title="模拟投稿 {index + 1}">模拟投稿 {index + 1}</a>'
+                f'<span class="time">{time.strftime("%Y-%m-%d", time.localtime(1700000000 - index * 86400))}</span>'
+                f'</li>'
+            )
+        total_pages = max(1, (self.config.up_video_count + size - 1) // size)
+        next_button = (f'<a class="be-pager-next" href="?pn={pn + 1}" title="下一页">下一页</a>'
+                       if pn < total_pages else '')
+        html = (
+            '<!DOCTYPE html><html><head><meta charset="utf-8">'
+            f'<title>模拟UP主{mid}的个人空间-模拟UP主{mid}个人主页 - 哔哩哔哩</title>'
+            '<style>@font-face{font-family:mock;src:url(/static/mock-font.woff2)}'
+            'body{font-family:mock,sans-serif}.small-item{display:inline-block;width:330px;height:260px}</style>'
+            '<script src="/static/tracker.js"></script>'
+            f"<script>localStorage.setItem('wbi_img_urls', 'https://i0.hdslb.com/bfs/wbi/{MOCK_IMG_KEY}.png-"
+            f"https://i0.hdslb.com/bfs/wbi/{MOCK_SUB_KEY}.png')</script></head><body>"
+            f'<div class="h-info"><img src="/face/{mid}.jpg" width="64"><span class="name">模拟UP主{mid}</span></div>'
+            '<video src="/static/preview.mp4" autoplay muted width="320"></video>'
+            f'<div id="submit-video-list"><ul class="list-list">{"".join(cards)}</ul></div>'
+            f'<div class="be-pager">{next_button}</div></body></html>'
+        )
+        body = html.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        # 与真实站点一样，首次访问时下发设备指纹Cookie
+        if 'buvid3=' not in self.headers.get('Cookie', ''):
+            self.send_header('Set-Cookie', f'buvid3={self.state.issue_buvid()}; Path=/')
+            self.send_header('Set-Cookie', f'b_nut={int(time.time())}; Path=/')
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+            self.state.add_bytes(len(body))
+
+    def _handle_asset(self, match, send_body):
+        """封面、头像、字体、预览视频、统计脚本等静态资源（内容为合成字节，禁止缓存）"""
+        ext = match.group('ext')
+        size = 64 if ext == 'js' else self.config.asset_size
+        self.send_response(200)
+        self.send_header('Content-Type', ASSET_CONTENT_TYPES[ext])
+        self.send_header('Content-Length', str(size))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        if not send_body:
+            return
+        if ext == 'js':
+            self.wfile.write(b'/* mock tracker */'.ljust(size))
+            self.state.add_bytes(size)
+        else:
+            self._write_body(0, size)
+
+    def _parse_range(self, total):
+        """解析Range请求头，返回 (start, end)（包含end），无效或未指定时返回None"""
+        header = self.headers.get('Range')
+        if not header:
+            return None
+        match = re.match(r'bytes=(\d*)-(\d*)$', header.strip())
+        if not match or (not match.group(1) and not match.group(2)):
+            return None
+        if match.group(1):
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else total - 1
+        else:
+            # 后缀范围: bytes=-N
+            start = max(0, total - int(match.group(2)))
+            end = total - 1
+        return start, min(end, total - 1)
+
+    def _media_size(self, match):
+        """根据流地址计算媒体文件大小"""
+        kind = match.group('kind')
+        variant = int(match.group('variant'))
+        if kind == 'video':
+            ratio = VIDEO_PROFILES[variant][4] if variant < len(VIDEO_PROFILES) else 0.05
+        else:
+            ratio = AUDIO_PROFILES[variant][2] / AUDIO_PROFILES[0][2] if variant < len(AUDIO_PROFILES) else 0.2
+        return self._stream_size(kind, ratio)
+
+    def _handle_media(self, match, send_body):
+        """CDN媒体文件，支持Range请求和按连接限速"""
+        faults = self.config.faults
+        total = self._media_size(match)
+        self.state.record_media(match.group('bvid'), urlparse(self.path).path, total)
+        byte_range = self._parse_range(total)
+        if byte_range and faults.roll(faults.ignore_range_rate):
+            self.state.count_fault('ignore_range')
+            byte_range = None
+
+        if byte_range and byte_range[0] >= total:
+            self.send_response(416)
+            self.send_header('Content-Range', f'bytes */{total}')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        if byte_range:
+            start, end = byte_range
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{total}')
+        else:
+            start, end = 0, total - 1
+            self.send_response(200)
+        length = end - start + 1
+        self.send_header('Content-Type', 'video/mp4')
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(length))
+        self.end_headers()
+
+        if not send_body:
+            return
+
+        # 中途故障：在响应体的随机位置重置连接、截断或停顿
+        abort_at, abort_fault, stall_at = None, None, None
+        if faults.roll(faults.reset_rate):
+            abort_at, abort_fault = int(length * faults.uniform(0.05, 0.95)), 'reset'
+        elif faults.roll(faults.truncate_rate):
+            abort_at, abort_fault = int(length * faults.uniform(0.05, 0.95)), 'truncate'
+        if faults.roll(faults.stall_rate):
+            stall_at = int(length * faults.uniform(0.0, 0.9))
+            self.state.count_fault('stall')
+
+        self._write_body(start, length if abort_at is None else abort_at, stall_at)
+
+        if abort_fault:
+            self.state.count_fault(abort_fault)
+            self.close_connection = True
+            if abort_fault == 'reset':
+                # SO_LINGER=0 使close()发送RST而不是FIN
+                self.wfile.flush()
+                self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+                self.connection.close()
+
+    def _write_body(self, offset, length, stall_at=None):
+        """写出合成媒体内容，按配置的带宽限速
+
+        Args:
+            offset: 起始偏移
+            length: 写出的字节数
+            stall_at: 写到该位置时停顿stall_seconds秒，None表示不停顿
+        """
+        bandwidth = self.config.bandwidth
+        chunk_size = WRITE_CHUNK_SIZE
+        if bandwidth:
+            # 每次写入约1/20秒的数据量，使限速更平滑
+            chunk_size = max(4096, min(WRITE_CHUNK_SIZE, int(bandwidth / 20)))
+        started = time.perf_counter()
+        sent = 0
+        while sent < length:
+            if stall_at is not None and sent >= stall_at:
+                self.wfile.flush()
+                time.sleep(self.config.faults.stall_seconds)
+                started += self.config.faults.stall_seconds
+                stall_at = None
+            size = min(chunk_size, length - sent)
+            if stall_at is not None and sent < stall_at < sent + size:
+                size = stall_at - sent
+            self.wfile.write(synthetic_bytes(offset + sent, size))
+            sent += size
+            self.state.add_bytes(size, media=True)
+            if bandwidth:
+                expected = sent / bandwidth
+                elapsed = time.perf_counter() - started
+                if expected > elapsed:
+                    time.sleep(expected - elapsed)
+
+
+class _MockHTTPServer(ThreadingHTTPServer):
+    """客户端中途断开属于正常情况（尤其是故障注入时），只记录调试日志"""
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        logger.debug("处理来自 %s 的请求时连接异常", client_address, exc_info=True)
+
+
+class MockBilibiliServer:
+    """本地模拟B站API + CDN服务器，用于离线、可重复的性能基准测试
+
+    用法:
+        with MockBilibiliServer(MockBilibiliConfig(bandwidth=parse_size('20M'))) as server:
+            downloader = BilibiliDownloader(api_base=server.url)
+    """
+
+    def __init__(self, config=None, host='127.0.0.1', port=0):
+        """初始化服务器
+
+        Args:
+            config: MockBilibiliConfig实例
+            host: 监听地址
+            port: 监听端口，0表示自动分配
+        """
+        self.config = config or MockBilibiliConfig()
+        self.state = MockBilibiliState()
+        self.httpd = _MockHTTPServer((host, port), MockBilibiliHandler)
+        self.httpd.config = self.config
+        self.httpd.state = self.state
+        self._thread = None
+
+    @property
+    def url(self):
+        """服务器根地址"""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """在后台线程中启动服务器"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='mock-bilibili', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """停止服务器"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def main():
+    """独立运行模拟服务器"""
+    parser = argparse.ArgumentParser(description='本地模拟B站API + CDN服务器')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='监听地址')
+    parser.add_argument('--port', type=int, default=8000, help='监听端口')
+    parser.add_argument('--video-size', type=str, default='64M', help='最高画质视频流大小，如 64M')
+    parser.add_argument('--audio-size', type=str, default='4M', help='最高音质音频流大小，如 4M')
+    parser.add_argument('--bandwidth', type=str, default=None, help='每个连接的带宽上限（字节/秒），如 10M')
+    parser.add_argument('--latency', type=float, default=0.0, help='每个请求的响应延迟（秒）')
+    parser.add_argument('--max-height', type=int, default=2160, help='返回的最高分辨率')
+    parser.add_argument('--api-rate-limit', type=float, default=None, help='API接口允许的持续请求速率（次/秒），超出时返回412风控')
+    parser.add_argument('--require-wbi', action='store_true', help='空间列表接口要求有效的WBI签名和buvid3 Cookie')
+    parser.add_argument('--fingerprint-requests', type=int, default=None,
+                        help='每个buvid3允许的空间列表请求次数，超出后返回-352风控')
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG, format='%(asctime)s [%(levelname)s] %(message)s', datefmt='%H:%M:%S')
+    config = MockBilibiliConfig(
+        video_size=parse_size(args.video_size),
+        audio_size=parse_size(args.audio_size),
+        bandwidth=parse_size(args.bandwidth) if args.bandwidth else None,
+        latency=args.latency,
+        max_height=args.max_height,
+        faults=fault_config_from_args(args),
+        api_rate_limit=args.api_rate_limit,
+        require_wbi=args.require_wbi,
+        fingerprint_requests=args.fingerprint_requests
+    )
+    server = MockBilibiliServer(config, host=args.host, port=args.port)
+    print(f"模拟服务器已启动: {server.url}")
+    print(f"示例: BilibiliDownloader(api_base='{server.url}')")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+if __name__ == "__main__":
+    main()
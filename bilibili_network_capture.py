@@ -0,0 +1,120 @@
+import json
+import time
+import base64
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class NetworkCapture:
+    """通过Chrome性能日志（CDP Network事件）捕获页面自身发出的接口响应
+
+    需要在创建浏览器时设置 goog:loggingPrefs = {'performance': 'ALL'}。
+    只关注URL中包含指定片段的请求，在其加载完成后用 Network.getResponseBody 读取响应体并解析为JSON。
+    """
+
+    def __init__(self, driver, url_patterns):
+        """初始化网络捕获
+
+        Args:
+            driver: 开启了性能日志的WebDriver实例
+            url_patterns: 需要捕获的URL片段列表，如 ['x/space/wbi/arc/search']
+        """
+        self.driver = driver
+        self.url_patterns = tuple(url_patterns)
+        # requestId -> URL，已收到响应头、等待加载完成的请求
+        self._pending = {}
+        # 已捕获但尚未被wait_for取走的响应
+        self._captured = deque()
+        # 丢弃之前积累的日志（复用的浏览器中可能残留上一个UP主的请求）
+        try:
+            self.driver.get_log('performance')
+        except Exception as e:
+            logger.debug("清空性能日志失败: %s", e)
+
+    def matches(self, url, pattern=None):
+        """URL是否属于需要捕获的请求（指定pattern时只匹配该片段）"""
+        patterns = (pattern,) if pattern else self.url_patterns
+        return any(p in url for p in patterns)
+
+    def _read_body(self, request_id):
+        """读取响应体并解析JSON，失败时返回None"""
+        try:
+            result = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+        except Exception as e:
+            logger.debug("读取响应体失败 (%s): %s", request_id, e)
+            return None
+        body = result.get('body', '')
+        if result.get('base64Encoded'):
+            body = base64.b64decode(body).decode('utf-8', errors='replace')
+        try:
+            return json.loads(body)
+        except ValueError:
+            logger.debug("响应体不是JSON (%s)", request_id)
+            return None
+
+    def poll(self):
+        """读取新的性能日志，返回本次新捕获的 (URL, JSON数据) 列表"""
+        captured = []
+        try:
+            entries = self.driver.get_log('performance')
+        except Exception as e:
+            logger.debug("读取性能日志失败: %s", e)
+            return captured
+
+        for entry in entries:
+            try:
+                message = json.loads(entry['message'])['message']
+            except (KeyError, ValueError, TypeError):
+                continue
+            method = message.get('method')
+            params = message.get('params', {})
+            request_id = params.get('requestId')
+
+            if method == 'Network.responseReceived':
+                url = params.get('response', {}).get('url', '')
+                if self.matches(url):
+                    self._pending[request_id] = url
+            elif method == 'Network.loadingFinished':
+                url = self._pending.pop(request_id, None)
+                if url:
+                    data = self._read_body(request_id)
+                    if data is not None:
+                        logger.debug("捕获接口响应: %s", url)
+                        captured.append((url, data))
+            elif method == 'Network.loadingFailed':
+                self._pending.pop(request_id, None)
+
+        self._captured.extend(captured)
+        return captured
+
+    def wait_for(self, predicate, timeout=20.0, interval=0.2):
+        """等待一个满足条件的响应
+
+        Args:
+            predicate: 判定函数 predicate(url, data) -> bool
+            timeout: 最长等待时间（秒）
+            interval: 轮询性能日志的间隔（秒）
+
+        Returns:
+            (URL, JSON数据)，超时返回None
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            for item in list(self._captured):
+                if predicate(*item):
+                    self._captured.remove(item)
+                    return item
+            if time.monotonic() >= deadline:
+                return None
+            if not self.poll():
+                time.sleep(interval)
+
+    def take(self, pattern):
+        """取走所有已捕获的、URL包含pattern的响应"""
+        self.poll()
+        taken = [item for item in self._captured if pattern in item[0]]
+        for item in taken:
+            self._captured.remove(item)
+        return taken
@@ -0,0 +1,152 @@
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# B站风控相关的业务错误码：-412 请求被拦截，-352 风控校验失败，-799 请求过于频繁
+RISK_CONTROL_CODES = frozenset({-412, -352, -799})
+
+# 默认允许连续发出的请求数：单个视频的信息和播放地址等少量请求不必按初始速率逐个等待
+DEFAULT_BURST = 4
+
+
+def is_risk_control(response):
+    """响应是否表明触发了风控（HTTP 412 或风控业务错误码）"""
+    if response.status_code == 412:
+        return True
+    try:
+        return response.json().get('code') in RISK_CONTROL_CODES
+    except (ValueError, AttributeError):
+        return False
+
+
+class AdaptivePacer:
+    """AIMD自适应请求节奏控制
+
+    每次成功响应后请求速率加性增加，遇到风控（HTTP 412 / -412 / -352 / -799）时乘性降低，
+    从而在不被封禁的前提下逼近服务器能承受的最高持续速率。按令牌桶放行：空闲时积累最多burst个令牌，
+    短时间内的少量请求可以立即发出，AIMD速率只限制持续的请求。线程安全，可在多个组件之间共享。
+    """
+
+    def __init__(self, initial_rate=1.0, min_rate=0.05, max_rate=8.0, increase=0.1, decrease=0.5, name='api',
+                 burst=DEFAULT_BURST):
+        """初始化节奏控制器
+
+        Args:
+            initial_rate: 初始速率（请求/秒）
+            min_rate: 最低速率（请求/秒）
+            max_rate: 最高速率（请求/秒）
+            increase: 每次成功后增加的速率（请求/秒）
+            decrease: 触发风控时速率乘以的系数
+            name: 日志中显示的名称
+            burst: 令牌桶容量，即空闲后可以不等待连续发出的请求数，1表示严格按速率间隔发送
+        """
+        self.rate = initial_rate
+        self.burst = max(1, burst)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.name = name
+        self._next_slot = 0.0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'throttled': 0, 'waited_seconds': 0.0}
+
+    def acquire(self, background=False):
+        """等待到下一个可发送请求的时间点
+
+        Args:
+            background: 后台请求（如附属文件）只在没有请求排队时占用空闲的时间点，
+                不会排在已预约的请求前面，并且至少为前台请求留下一个令牌，前台请求最多因此多等待一个请求间隔
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                # _next_slot是按当前速率计算的下一个请求时间点，提前量不超过 burst-1 个间隔时立即放行
+                interval = 1.0 / self.rate
+                ready = self._next_slot - (self.burst - 1) * interval
+                if background:
+                    ready = min(ready + interval, self._next_slot)
+                if background and ready > now:
+                    wait = ready - now
+                    self.stats['waited_seconds'] += wait
+                else:
+                    slot = max(now, ready)
+                    self._next_slot = max(self._next_slot, slot) + interval
+                    self.stats['requests'] += 1
+                    wait = slot - now
+                    self.stats['waited_seconds'] += wait
+                    break
+            time.sleep(wait)
+        if wait > 0:
+            time.sleep(wait)
+
+    def background(self):
+        """返回共享同一节奏的后台视图，可以像节奏控制器一样传给重试组件"""
+        return BackgroundPacer(self)
+
+    def on_success(self):
+        """成功响应：加性增加速率"""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self):
+        """触发风控：乘性降低速率，并推迟下一个请求
+
+        并发请求往往会同时收到风控响应，同一个请求间隔内只降低一次，避免速率被连续砍到最低。
+        """
+        with self._lock:
+            self.stats['throttled'] += 1
+            now = time.monotonic()
+            if now - self._last_decrease < 1.0 / self.rate:
+                return
+            self._last_decrease = now
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self._next_slot = max(self._next_slot, now + 1.0 / self.rate)
+            rate = self.rate
+        logger.warning("%s 触发风控，请求速率降低到 %.2f 次/秒", self.name, rate)
+
+    def observe(self, response):
+        """根据响应调整速率
+
+        Returns:
+            bool: 是否触发了风控
+        """
+        if is_risk_control(response):
+            self.on_throttle()
+            return True
+        if response.status_code < 400:
+            self.on_success()
+        return False
+
+
+class BackgroundPacer:
+    """节奏控制器的后台视图：以低优先级获取请求时间点，响应仍反馈给同一个节奏控制器"""
+
+    def __init__(self, pacer):
+        self.pacer = pacer
+
+    @property
+    def rate(self):
+        return self.pacer.rate
+
+    def acquire(self):
+        self.pacer.acquire(background=True)
+
+    def observe(self, response):
+        return self.pacer.observe(response)
+
+
+_default_pacer = None
+_default_lock = threading.Lock()
+
+
+def get_default_pacer():
+    """返回进程内共享的api.bilibili.com请求节奏控制器"""
+    global _default_pacer
+    with _default_lock:
+        if _default_pacer is None:
+            _default_pacer = AdaptivePacer(name='api.bilibili.com')
+        return _default_pacer
@@ -0,0 +1,152 @@
+import time
+import logging
+
+from selenium.common.exceptions import WebDriverException
+
+logger = logging.getLogger(__name__)
+
+# 在页面中安装一次性的活动监视器：包装fetch/XHR统计在途请求，MutationObserver记录DOM变化时间
+_INSTALL_WATCH_JS = """
+if (!window.__bilibiliWatch) {
+    const watch = window.__bilibiliWatch = {inflight: 0, last: performance.now()};
+    const touch = () => { watch.last = performance.now(); };
+    const done = () => { watch.inflight--; touch(); };
+    if (window.fetch) {
+        const originalFetch = window.fetch;
+        window.fetch = function () {
+            watch.inflight++;
+            touch();
+            const promise = originalFetch.apply(this, arguments);
+            promise.then(done, done);
+            return promise;
+        };
+    }
+    const originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        watch.inflight++;
+        touch();
+        this.addEventListener('loadend', done);
+        return originalSend.apply(this, arguments);
+    };
+    new MutationObserver(touch).observe(document.documentElement, {childList: true, subtree: true});
+    if (performance.setResourceTimingBufferSize) performance.setResourceTimingBufferSize(10000);
+}
+"""
+
+# 返回页面活动状态：加载状态、在途请求数、距最后一次网络或DOM活动的毫秒数
+_ACTIVITY_JS = _INSTALL_WATCH_JS + """
+const watch = window.__bilibiliWatch;
+let last = watch.last;
+const entries = performance.getEntriesByType('resource');
+if (entries.length) last = Math.max(last, entries[entries.length - 1].responseEnd);
+return {ready: document.readyState, inflight: Math.max(watch.inflight, 0), idle: performance.now() - last};
+"""
+
+# 视频列表的状态签名：URL、视频链接数量、前几个视频链接、分页器当前页
+_LIST_SIGNATURE_JS = """
+const links = Array.from(document.querySelectorAll('a[href*="/video/BV"]'), a => a.getAttribute('href'));
+const active = document.querySelector('.be-pager-item-active, .vui_pagenation--btn-num.vui_button--active');
+return [location.href, links.length, links.slice(0, 3).join('|'), active ? active.textContent.trim() : ''].join('#');
+"""
+
+_VIDEO_LINK_COUNT_JS = "return document.querySelectorAll('a[href*=\"/video/BV\"]').length;"
+
+
+def wait_for_settled(driver, quiet=0.5, timeout=10.0, poll=0.1):
+    """等待页面稳定：文档加载完成、没有在途的fetch/XHR请求，且quiet秒内没有新的网络或DOM活动
+
+    Args:
+        driver: WebDriver实例
+        quiet: 要求的静默时间（秒）
+        timeout: 最长等待时间（秒）
+        poll: 轮询间隔（秒）
+
+    Returns:
+        bool: 页面是否在超时前稳定
+    """
+    start = time.monotonic()
+    while True:
+        try:
+            state = driver.execute_script(_ACTIVITY_JS)
+        except WebDriverException as e:
+            # 页面正在跳转时脚本可能执行失败，稍后重试
+            logger.debug("读取页面活动状态失败: %s", e)
+            state = None
+        if state and state.get('ready') == 'complete' and not state.get('inflight') and state.get('idle', 0) >= quiet * 1000:
+            logger.debug("页面已稳定，用时 %.2f 秒", time.monotonic() - start)
+            return True
+        if time.monotonic() - start >= timeout:
+            logger.debug("等待页面稳定超时（%s 秒），继续处理", timeout)
+            return False
+        time.sleep(poll)
+
+
+def list_signature(driver):
+    """返回当前视频列表的状态签名，用于判断翻页是否生效"""
+    try:
+        return driver.execute_script(_LIST_SIGNATURE_JS)
+    except WebDriverException:
+        return None
+
+
+def wait_for_list_change(driver, before, timeout=10.0, poll=0.2):
+    """等待视频列表相对翻页前发生变化（URL、视频链接或分页器当前页），变化后再等待页面稳定
+
+    Args:
+        driver: WebDriver实例
+        before: 翻页前的list_signature()
+        timeout: 最长等待时间（秒）
+        poll: 轮询间隔（秒）
+
+    Returns:
+        bool: 列表是否在超时前发生变化
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        signature = list_signature(driver)
+        if signature is not None and signature != before:
+            wait_for_settled(driver, timeout=max(deadline - time.monotonic(), 1.0))
+            return True
+        if time.monotonic() >= deadline:
+            logger.debug("等待列表变化超时（%s 秒）", timeout)
+            return False
+        time.sleep(poll)
+
+
+def wait_for_video_links(driver, timeout=15.0, poll=0.2):
+    """等待页面中出现视频链接
+
+    Returns:
+        int: 视频链接数量，超时返回0
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            count = driver.execute_script(_VIDEO_LINK_COUNT_JS)
+        except WebDriverException:
+            count = 0
+        if count:
+            return count
+        if time.monotonic() >= deadline:
+            logger.debug("等待视频链接出现超时（%s 秒）", timeout)
+            return 0
+        time.sleep(poll)
+
+
+def wait_for_login(driver, timeout=30.0, poll=1.0):
+    """等待用户在浏览器中完成登录（出现SESSDATA Cookie）
+
+    Returns:
+        bool: 是否在超时前完成登录
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if driver.get_cookie('SESSDATA'):
+                logger.info("检测到已登录")
+                return True
+        except WebDriverException as e:
+            logger.debug("读取Cookie失败: %s", e)
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(poll)
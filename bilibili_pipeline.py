@@ -0,0 +1,196 @@
+import os
+import json
+import time
+import queue
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# 队列中表示收集结束的标记
+_DONE = object()
+
+
+class JsonlWriter:
+    """只追加的JSON Lines文件，每写一行立即刷新，进程中途退出时已写入的记录不会丢失"""
+
+    def __init__(self, path):
+        """打开（不存在时创建）JSONL文件
+
+        Args:
+            path: 文件路径
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        """追加一条记录"""
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def read_jsonl(path):
+    """读取JSON Lines文件，跳过不完整的行（进程被杀死时的最后一行）"""
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+class CollectDownloadPipeline:
+    """收集与下载流水线：收集器每发现一个视频就写入JSONL并放入有界队列，下载线程同时从队列中取出下载
+
+    队列满时收集端等待下载端消化，避免内存中堆积过多待下载视频；第一个视频被发现后下载即开始。
+    """
+
+    def __init__(self, downloader_factory, output_dir, jsonl_path, workers=2, queue_size=16, max_videos=None,
+                 catalog=None, download_options=None):
+        """初始化流水线
+
+        Args:
+            downloader_factory: 创建下载器的函数，每个下载线程调用一次（requests会话不是线程安全的），
+                None表示只记录发现的视频、不下载
+            output_dir: 视频保存目录
+            jsonl_path: 发现的视频逐行追加到该文件
+            workers: 下载线程数
+            queue_size: 待下载队列的容量
+            max_videos: 最多处理的视频数量，None表示不限制
+            catalog: VideoCatalog实例，已下载完成的视频直接跳过，None表示不检查
+            download_options: 传给download_video的其他参数（quality、audio_quality、format）
+        """
+        self.downloader_factory = downloader_factory
+        self.output_dir = output_dir
+        self.workers = max(1, workers)
+        self.max_videos = max_videos
+        self.catalog = catalog
+        self.download_options = download_options or {}
+        self.writer = JsonlWriter(jsonl_path)
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._seen = set()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._start_time = None
+        self.stats = {'discovered': 0, 'downloaded': 0, 'failed': 0, 'skipped': 0,
+                      'first_download_start': None, 'queue_wait_seconds': 0.0}
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def start(self):
+        """启动下载线程"""
+        self._start_time = time.monotonic()
+        if self.downloader_factory is None:
+            return self
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f'pipeline_download_{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def submit(self, video):
+        """收集端调用：记录一个新发现的视频并放入下载队列，队列满时等待
+
+        Args:
+            video: 视频信息字典（至少包含bvid）
+
+        Returns:
+            bool: 是否接受（重复或超过max_videos时返回False）
+        """
+        bvid = video.get('bvid')
+        with self._lock:
+            if not bvid or bvid in self._seen or (self.max_videos and len(self._seen) >= self.max_videos):
+                return False
+            self._seen.add(bvid)
+            self.stats['discovered'] += 1
+
+        record = dict(video)
+        record['discovered_at'] = time.strftime('%Y-%m-%d %H:%M:%S')
+        try:
+            self.writer.write(record)
+        except Exception as e:
+            logger.error("写入JSONL失败: %s", e)
+
+        if self.downloader_factory is None:
+            return True
+        wait_start = time.monotonic()
+        self._queue.put(bvid)
+        self._count('queue_wait_seconds', time.monotonic() - wait_start)
+        return True
+
+    def _already_downloaded(self, bvid):
+        if self.catalog is None:
+            return False
+        try:
+            video = self.catalog.get_video(bvid)
+        except Exception:
+            return False
+        return bool(video and video.get('download_state') == 'downloaded' and video.get('file_path')
+                    and os.path.exists(video['file_path']))
+
+    def _worker(self):
+        downloader = None
+        while True:
+            bvid = self._queue.get()
+            if bvid is _DONE:
+                return
+            if self._already_downloaded(bvid):
+                logger.info("%s 已下载过，跳过", bvid)
+                self._count('skipped')
+                continue
+            with self._lock:
+                if self.stats['first_download_start'] is None:
+                    self.stats['first_download_start'] = round(time.monotonic() - self._start_time, 3)
+            try:
+                if downloader is None:
+                    downloader = self.downloader_factory()
+                path = downloader.download_video(bvid, output_dir=self.output_dir, **self.download_options)
+            except Exception as e:
+                logger.error("下载 %s 失败: %s", bvid, e)
+                path = None
+            self._count('downloaded' if path else 'failed')
+
+    def finish(self):
+        """收集结束后调用：等待队列中的视频全部下载完成
+
+        Returns:
+            dict: 统计信息
+        """
+        for _ in self._threads:
+            self._queue.put(_DONE)
+        for thread in self._threads:
+            thread.join()
+        self.writer.close()
+        stats = dict(self.stats)
+        stats['elapsed'] = round(time.monotonic() - self._start_time, 3) if self._start_time else 0
+        return stats
+
+    def run(self, videos):
+        """从可迭代对象（如 iter_up_videos 生成器）中逐个取出视频送入流水线，直到全部下载完成
+
+        Returns:
+            dict: 统计信息
+        """
+        self.start()
+        try:
+            for video in videos:
+                self.submit(video)
+                if self.max_videos and self.stats['discovered'] >= self.max_videos:
+                    break
+        finally:
+            stats = self.finish()
+        return stats
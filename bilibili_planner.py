@@ -0,0 +1,303 @@
+import os
+import json
+import time
+import shutil
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# 大小单位
+_SIZE_UNITS = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+# 下载并用ffmpeg合并时，临时的.m4s文件与合并输出会同时存在，峰值磁盘占用约为媒体大小的2倍
+MERGE_SPACE_FACTOR = 2.0
+
+# 计划缓存的有效期（秒）：同一视频同一画质的大小基本不会变化
+PLAN_CACHE_TTL = 7 * 24 * 3600
+
+
+class DiskSpaceError(Exception):
+    """剩余磁盘空间不足，无法在保持水位线的前提下开始下载"""
+
+
+def parse_size(value):
+    """解析带单位的大小，如 '10M' -> 10485760，'5G' -> 5368709120"""
+    value = str(value).strip().upper().rstrip('B')
+    if value and value[-1] in _SIZE_UNITS:
+        return int(float(value[:-1]) * _SIZE_UNITS[value[-1]])
+    return int(float(value))
+
+
+def format_size(size):
+    """把字节数格式化为易读的形式，如 1.5 GB"""
+    size = float(size or 0)
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}" if unit != 'B' else f"{int(size)} B"
+        size /= 1024
+    return f"{size:.2f} TB"
+
+
+def format_seconds(seconds):
+    """把秒数格式化为 H:MM:SS"""
+    seconds = int(seconds or 0)
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def stream_duration(streams, video_info=None):
+    """从播放地址信息（dash.duration / timelength）或视频信息中取时长（秒），未知时返回0"""
+    dash = (streams or {}).get('dash') or {}
+    if dash.get('duration'):
+        return dash['duration']
+    if (streams or {}).get('timelength'):
+        return streams['timelength'] / 1000
+    return (video_info or {}).get('duration', 0)
+
+
+def estimate_stream_bytes(stream, duration):
+    """根据DASH流的平均码率（bandwidth，bit/s）和时长估算流大小（字节），无法估算时返回0"""
+    bandwidth = (stream or {}).get('bandwidth') or 0
+    return int(bandwidth * duration / 8)
+
+
+class PlanCache:
+    """下载计划缓存（JSON文件）：按 BV号/画质 保存解析得到的大小，重复规划时无需再次请求接口"""
+
+    def __init__(self, path, ttl=PLAN_CACHE_TTL):
+        """加载缓存文件
+
+        Args:
+            path: 缓存文件路径，不存在时在保存时创建
+            ttl: 缓存条目的有效期（秒）
+        """
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning("读取计划缓存失败: %s", e)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and time.time() - entry.get('planned_at', 0) < self.ttl:
+            return dict(entry)
+        return None
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+
+    def save(self):
+        """写回缓存文件（先写临时文件再替换，避免中断时损坏）"""
+        if not self.path:
+            return
+        with self._lock:
+            data = json.dumps(self._entries, ensure_ascii=False)
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.warning("保存计划缓存失败: %s", e)
+
+
+class DownloadPlanner:
+    """下载计划（不下载）：并发解析每个视频的信息和媒体流，估算下载大小"""
+
+    def __init__(self, downloader_factory, workers=4, cache=None, probe_sizes=False, quality=None,
+                 audio_quality=None):
+        """初始化下载计划器
+
+        Args:
+            downloader_factory: 创建下载器的函数，每个工作线程调用一次
+            workers: 并发解析的视频数量（实际请求节奏仍由共享的节奏控制器决定）
+            cache: PlanCache实例，None表示不缓存
+            probe_sizes: 是否对选中的媒体流发送HEAD请求读取Content-Length（更准确，但多两次请求）
+            quality: 指定视频质量代码，与下载时一致
+            audio_quality: 指定音频质量代码，与下载时一致
+        """
+        self.downloader_factory = downloader_factory
+        self.workers = max(1, workers)
+        self.cache = cache
+        self.probe_sizes = probe_sizes
+        self.quality = quality
+        self.audio_quality = audio_quality
+        self._local = threading.local()
+
+    def _downloader(self):
+        downloader = getattr(self._local, 'downloader', None)
+        if downloader is None:
+            downloader = self._local.downloader = self.downloader_factory()
+        return downloader
+
+    def _content_length(self, downloader, stream):
+        """通过HEAD请求读取媒体流的Content-Length，失败时返回None"""
+        url = (stream or {}).get('base_url') or (stream or {}).get('baseUrl')
+        if not url:
+            return None
+        try:
+            response = downloader.session.head(url, headers={'Referer': 'https://www.bilibili.com/'},
+                                               timeout=15, allow_redirects=True)
+            length = response.headers.get('Content-Length')
+            if response.ok and length and length.isdigit():
+                return int(length)
+        except Exception as e:
+            logger.debug("HEAD请求失败: %s", e)
+        return None
+
+    def plan_video(self, bvid):
+        """解析一个视频，估算选中的视频流和音频流大小
+
+        Returns:
+            dict: bvid、title、duration、quality、height、video_bytes、audio_bytes、total_bytes、source，
+            解析失败时包含error
+        """
+        key = f"{bvid}/{self.quality or 'auto'}/{self.audio_quality or 'auto'}"
+        if self.cache is not None:
+            entry = self.cache.get(key)
+            if entry and (entry['source'] == 'content-length' or not self.probe_sizes):
+                entry['cached'] = True
+                return entry
+
+        downloader = self._downloader()
+        try:
+            video_info = downloader.get_video_info(bvid)
+            streams = downloader.get_video_streams(bvid, video_info.get('cid', 0))
+            best_video, best_audio = downloader.select_best_stream(streams, self.quality, self.audio_quality)
+        except Exception as e:
+            logger.warning("解析 %s 失败: %s", bvid, e)
+            return {'bvid': bvid, 'error': str(e), 'total_bytes': 0}
+
+        duration = stream_duration(streams, video_info)
+        video_bytes = estimate_stream_bytes(best_video, duration)
+        audio_bytes = estimate_stream_bytes(best_audio, duration)
+        source = 'bandwidth'
+        if self.probe_sizes:
+            video_length = self._content_length(downloader, best_video)
+            audio_length = self._content_length(downloader, best_audio)
+            if video_length is not None and audio_length is not None:
+                video_bytes, audio_bytes, source = video_length, audio_length, 'content-length'
+
+        entry = {
+            'bvid': bvid,
+            'title': video_info.get('title', ''),
+            'duration': duration,
+            'quality': best_video.get('id'),
+            'height': best_video.get('height'),
+            'video_bytes': video_bytes,
+            'audio_bytes': audio_bytes,
+            'total_bytes': video_bytes + audio_bytes,
+            'source': source,
+            'planned_at': int(time.time())
+        }
+        if self.cache is not None:
+            self.cache.put(key, entry)
+        return entry
+
+    def plan(self, bvids):
+        """并发规划一组视频，结果顺序与输入一致"""
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='plan') as executor:
+            entries = list(executor.map(self.plan_video, bvids))
+        if self.cache is not None:
+            self.cache.save()
+        return entries
+
+
+def summarize_plan(entries, output_dir, bandwidth=None, watermark=0, merge=True):
+    """汇总下载计划：总大小、按带宽上限估算的耗时、目标磁盘能否容纳
+
+    Args:
+        entries: DownloadPlanner.plan()的结果
+        output_dir: 下载目录（用于读取剩余空间）
+        bandwidth: 带宽上限（字节/秒），None表示不估算耗时
+        watermark: 下载后需要保留的最小剩余空间（字节）
+        merge: 是否会用ffmpeg合并（合并时峰值占用约为媒体大小的2倍）
+
+    Returns:
+        dict: 汇总信息
+    """
+    planned = [entry for entry in entries if not entry.get('error')]
+    total = sum(entry['total_bytes'] for entry in planned)
+    largest = max((entry['total_bytes'] for entry in planned), default=0)
+    os.makedirs(output_dir, exist_ok=True)
+    free = shutil.disk_usage(output_dir).free
+    # 逐个下载时最终占用为媒体总大小，另需为正在合并的那个视频留出临时文件空间
+    peak = total + (largest * (MERGE_SPACE_FACTOR - 1) if merge else 0)
+    return {
+        'videos': len(entries),
+        'failed': len(entries) - len(planned),
+        'total_bytes': total,
+        'peak_bytes': int(peak),
+        'estimated_seconds': total / bandwidth if bandwidth else None,
+        'free_bytes': free,
+        'watermark_bytes': watermark,
+        'fits': free - peak >= watermark
+    }
+
+
+class DiskSpaceGuard:
+    """磁盘空间准入控制：只有在剩余空间扣除在途下载的预留后仍高于水位线时，才允许开始新的下载
+
+    所有下载线程共享同一个实例；空间不足时等待其他下载完成释放预留（或外部清理），超时后拒绝。
+    """
+
+    def __init__(self, path, watermark, timeout=300.0, poll=5.0):
+        """初始化准入控制
+
+        Args:
+            path: 下载目录（用于读取所在磁盘的剩余空间）
+            watermark: 需要保留的最小剩余空间（字节）
+            timeout: 空间不足时最长等待时间（秒）
+            poll: 等待期间重新检查剩余空间的间隔（秒）
+        """
+        self.path = path
+        self.watermark = watermark
+        self.timeout = timeout
+        self.poll = poll
+        self.reserved = 0
+        self._condition = threading.Condition()
+        self.stats = {'admitted': 0, 'rejected': 0, 'waited_seconds': 0.0}
+
+    def free_bytes(self):
+        os.makedirs(self.path, exist_ok=True)
+        return shutil.disk_usage(self.path).free
+
+    def admit(self, needed):
+        """为一次下载预留needed字节，空间不足时等待
+
+        Raises:
+            DiskSpaceError: 超时后空间仍不足
+        """
+        start = time.monotonic()
+        deadline = start + self.timeout
+        with self._condition:
+            while True:
+                available = self.free_bytes() - self.reserved - self.watermark
+                if needed <= available:
+                    self.reserved += needed
+                    self.stats['admitted'] += 1
+                    self.stats['waited_seconds'] += time.monotonic() - start
+                    return needed
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.stats['rejected'] += 1
+                    raise DiskSpaceError(f"剩余空间不足: 需要 {format_size(needed)}，"
+                                         f"扣除预留和水位线 {format_size(self.watermark)} 后只剩 "
+                                         f"{format_size(max(available, 0))}")
+                logger.info("剩余空间不足，等待其他下载完成 (需要 %s)", format_size(needed))
+                self._condition.wait(min(self.poll, remaining))
+
+    def release(self, reserved):
+        """下载结束后释放预留的空间（已写入的文件会体现在剩余空间中）"""
+        with self._condition:
+            self.reserved = max(0, self.reserved - reserved)
+            self._condition.notify_all()
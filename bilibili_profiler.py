@@ -0,0 +1,108 @@
+import io
+import os
+import re
+import pstats
+import logging
+import cProfile
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# tracemalloc保留的调用栈深度
+TRACEMALLOC_FRAMES = 25
+
+# 分配摘要中输出的条目数
+TOP_ALLOCATIONS = 30
+
+
+class PhaseProfiler:
+    """按阶段采集CPU和内存剖析数据
+
+    每个阶段输出到 output_dir/<任务ID>/ 目录下：
+    - <阶段>.pstats: cProfile统计，可用 `python -m pstats` 或 snakeviz 查看
+    - <阶段>.tracemalloc: 阶段结束时的tracemalloc快照（开启内存剖析时）
+    - <阶段>.alloc.txt: 阶段内新增内存分配最多的代码位置（开启内存剖析时）
+    """
+
+    def __init__(self, output_dir, memory=False):
+        """初始化剖析器
+
+        Args:
+            output_dir: 剖析结果输出目录
+            memory: 是否同时使用tracemalloc记录内存分配
+        """
+        self.output_dir = output_dir
+        self.memory = memory
+        self._local = threading.local()
+        os.makedirs(output_dir, exist_ok=True)
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+
+    def _phase_dir(self, key):
+        """返回某个任务的输出目录（任务ID中的非法字符替换为下划线）"""
+        safe_key = re.sub(r'[^0-9A-Za-z_.-]', '_', str(key))
+        path = os.path.join(self.output_dir, safe_key)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def start(self, key, phase):
+        """开始剖析一个阶段（当前线程已有进行中的阶段时先结束它）
+
+        Args:
+            key: 任务ID，如视频BV号或UP主UID
+            phase: 阶段名称
+        """
+        self.stop()
+        profile = cProfile.Profile()
+        snapshot = tracemalloc.take_snapshot() if self.memory else None
+        self._local.active = (key, phase, profile, snapshot)
+        profile.enable()
+
+    def stop(self):
+        """结束当前线程进行中的阶段并写出结果，没有进行中的阶段时不做任何事"""
+        active = getattr(self._local, 'active', None)
+        if active is None:
+            return
+        self._local.active = None
+        key, phase, profile, start_snapshot = active
+        profile.disable()
+
+        try:
+            phase_dir = self._phase_dir(key)
+            profile.dump_stats(os.path.join(phase_dir, f'{phase}.pstats'))
+
+            if self.memory:
+                end_snapshot = tracemalloc.take_snapshot()
+                end_snapshot.dump(os.path.join(phase_dir, f'{phase}.tracemalloc'))
+                stats = end_snapshot.compare_to(start_snapshot, 'lineno')
+                with open(os.path.join(phase_dir, f'{phase}.alloc.txt'), 'w', encoding='utf-8') as f:
+                    f.write(f"# {key} / {phase}: 阶段内新增内存分配 Top {TOP_ALLOCATIONS}\n")
+                    for stat in stats[:TOP_ALLOCATIONS]:
+                        f.write(f"{stat}\n")
+            logger.debug("已写出剖析结果: %s/%s", phase_dir, phase)
+        except Exception as e:
+            logger.warning("写出剖析结果失败 (%s/%s): %s", key, phase, e)
+
+    def switch(self, key, phase):
+        """切换到下一个阶段，等价于 stop() 后 start()"""
+        self.start(key, phase)
+
+    @contextmanager
+    def profile(self, key, phase):
+        """剖析一个代码块"""
+        self.start(key, phase)
+        try:
+            yield
+        finally:
+            self.stop()
+
+    def summary(self, key, phase, limit=20):
+        """返回某个阶段按累计耗时排序的前若干函数（文本）"""
+        path = os.path.join(self._phase_dir(key), f'{phase}.pstats')
+        if not os.path.exists(path):
+            return ''
+        stream = io.StringIO()
+        pstats.Stats(path, stream=stream).sort_stats('cumulative').print_stats(limit)
+        return stream.getvalue()
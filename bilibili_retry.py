@@ -0,0 +1,354 @@
+import time
+import random
+import logging
+import threading
+from urllib.parse import urlparse
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# 需要重试的HTTP状态码：403（CDN鉴权偶发失败）、412（风控拦截）、429（限流）及5xx
+RETRY_STATUSES = frozenset({403, 408, 412, 429, 500, 502, 503, 504})
+
+# 需要重试的B站API业务错误码：风控拦截(-412/-352/-799)及服务端错误
+RETRY_API_CODES = frozenset({-412, -352, -799, -500, -503, -504})
+
+
+class IncompleteDownloadError(IOError):
+    """响应体在达到预期长度前结束"""
+
+
+# 可重试的网络异常
+RETRY_EXCEPTIONS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.ContentDecodingError,
+    IncompleteDownloadError,
+)
+
+
+class CircuitOpenError(Exception):
+    """目标主机的熔断器处于打开状态，请求未发出"""
+
+    def __init__(self, host, retry_after):
+        self.host = host
+        self.retry_after = retry_after
+        super().__init__(f"{host} 连续失败过多，已熔断，{retry_after:.1f} 秒后再试")
+
+
+class RetryableResponseError(Exception):
+    """响应本身成功返回，但状态码或业务错误码表明应当重试"""
+
+    def __init__(self, response, reason):
+        self.response = response
+        super().__init__(reason)
+
+
+class RetryPolicy:
+    """重试策略：带抖动的指数退避"""
+
+    def __init__(self, max_attempts=3, base_delay=1.0, max_delay=30.0, multiplier=2.0):
+        """初始化重试策略
+
+        Args:
+            max_attempts: 最大尝试次数（包含第一次）
+            base_delay: 第一次重试前的退避上限（秒）
+            max_delay: 单次退避的最大值（秒）
+            multiplier: 每次重试退避上限的增长倍数
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+
+    def delay(self, attempt):
+        """第attempt次失败后的退避时间（full jitter：在0到指数上限之间均匀取值）
+
+        Args:
+            attempt: 已失败的次数，从1开始
+        """
+        ceiling = min(self.max_delay, self.base_delay * self.multiplier ** (attempt - 1))
+        return random.uniform(0, ceiling)
+
+
+class RetryBudget:
+    """单次运行的重试预算：重试次数不超过 min_retries + ratio × 请求总数
+
+    网络整体异常时，每个请求各自重试会把请求量放大数倍；
+    预算耗尽后失败直接返回给调用方，不再重试。
+    """
+
+    def __init__(self, ratio=0.2, min_retries=20):
+        """初始化重试预算
+
+        Args:
+            ratio: 允许的重试次数占请求总数的比例
+            min_retries: 无论请求多少都允许的基础重试次数
+        """
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.requests = 0
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        """记录一次首次请求"""
+        with self._lock:
+            self.requests += 1
+
+    def try_acquire(self):
+        """申请一次重试，预算不足时返回False"""
+        with self._lock:
+            if self.retries >= self.min_retries + self.ratio * self.requests:
+                return False
+            self.retries += 1
+            return True
+
+
+class CircuitBreaker:
+    """单个主机的熔断器
+
+    连续失败达到阈值后打开，期间该主机的请求直接失败；
+    冷却时间过后进入半开状态，只放行一个探测请求，成功则关闭，失败则重新打开。
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        """初始化熔断器
+
+        Args:
+            failure_threshold: 打开熔断器所需的连续失败次数
+            reset_timeout: 打开后的冷却时间（秒）
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """是否允许发出请求，不允许时返回剩余冷却时间（秒），允许时返回0"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return 0
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if self.state == self.OPEN and remaining > 0:
+                return remaining
+            # 冷却结束，半开状态下只放行一个探测请求
+            if self._probing:
+                return max(remaining, 1.0)
+            self.state = self.HALF_OPEN
+            self._probing = True
+            return 0
+
+    def release_probe(self):
+        """放弃本次探测而不改变熔断器状态（探测请求因与主机健康无关的异常中断时调用），
+        下一个请求可以重新探测"""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        """记录一次失败，返回熔断器是否因此打开"""
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                opened = self.state != self.OPEN
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                return opened
+            return False
+
+
+def host_of(url):
+    """返回URL中的主机名（含端口），用于区分熔断器"""
+    return urlparse(url).netloc
+
+
+def api_code_retryable(response):
+    """B站API响应的业务错误码是否需要重试（非JSON响应视为不需要）"""
+    try:
+        code = response.json().get('code')
+    except (ValueError, AttributeError):
+        return False
+    return code in RETRY_API_CODES
+
+
+class Retrier:
+    """统一的重试组件：指数退避 + 单次运行重试预算 + 按主机熔断
+
+    所有网络调用共享同一个Retrier时，预算和熔断状态对整个运行生效，
+    失效的CDN节点或被封禁的API不会继续消耗重试次数。
+    """
+
+    def __init__(self, policy=None, budget=None, failure_threshold=5, reset_timeout=30.0, sleep=time.sleep):
+        """初始化重试组件
+
+        Args:
+            policy: 默认的RetryPolicy
+            budget: RetryBudget，None表示不限制重试总量
+            failure_threshold: 每个主机熔断器的连续失败阈值
+            reset_timeout: 熔断器冷却时间（秒）
+            sleep: 退避等待函数，便于基准测试中替换
+        """
+        self.policy = policy or RetryPolicy()
+        self.budget = budget
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.sleep = sleep
+        self._breakers = {}
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'retries': 0, 'failures': 0, 'budget_exhausted': 0, 'circuit_open': 0}
+
+    def breaker(self, host):
+        """返回指定主机的熔断器"""
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return breaker
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def call(self, func, *args, host=None, policy=None, retry_exceptions=RETRY_EXCEPTIONS, on_retry=None,
+             description=None, **kwargs):
+        """调用func，失败时按策略重试
+
+        Args:
+            func: 要调用的函数
+            host: 目标主机，用于熔断；None表示不熔断
+            policy: 本次调用使用的RetryPolicy，None表示使用默认策略
+            retry_exceptions: 视为可重试的异常类型
+            on_retry: 每次重试前的回调 on_retry(attempt, error)
+            description: 日志中描述本次调用的文字
+
+        Returns:
+            func的返回值
+
+        Raises:
+            CircuitOpenError: 目标主机已熔断
+            最后一次失败的异常
+        """
+        policy = policy or self.policy
+        breaker = self.breaker(host) if host else None
+        description = description or getattr(func, '__name__', '请求')
+        self._count('calls')
+        if self.budget is not None:
+            self.budget.record_request()
+
+        attempt = 0
+        while True:
+            attempt += 1
+            if breaker is not None:
+                retry_after = breaker.allow()
+                if retry_after:
+                    self._count('circuit_open')
+                    raise CircuitOpenError(host, retry_after)
+
+            try:
+                result = func(*args, **kwargs)
+            except (RetryableResponseError,) + tuple(retry_exceptions) as e:
+                error = e
+            except BaseException:
+                # 不可重试的异常（如磁盘写满、URL无效、响应不是JSON）不说明主机不可用，
+                # 但必须释放半开状态的探测名额，否则该主机会一直被拒绝
+                if breaker is not None:
+                    breaker.release_probe()
+                raise
+            else:
+                if breaker is not None:
+                    breaker.record_success()
+                return result
+
+            self._count('failures')
+            if breaker is not None and breaker.record_failure():
+                logger.warning("%s 连续失败 %s 次，熔断 %.0f 秒", host, breaker.failures, self.reset_timeout)
+
+            if attempt >= policy.max_attempts:
+                logger.debug("%s 失败，已尝试 %s 次: %s", description, attempt, error)
+                raise error
+            if self.budget is not None and not self.budget.try_acquire():
+                self._count('budget_exhausted')
+                logger.warning("本次运行的重试预算已用完，%s 不再重试: %s", description, error)
+                raise error
+
+            delay = policy.delay(attempt)
+            self._count('retries')
+            logger.debug("%s 失败 (第 %s/%s 次): %s，%.2f 秒后重试", description, attempt, policy.max_attempts,
+                         error, delay)
+            if on_retry is not None:
+                on_retry(attempt, error)
+            if delay > 0:
+                self.sleep(delay)
+
+    def request(self, method, url, session=None, policy=None, retry_statuses=RETRY_STATUSES, check=None,
+                on_retry=None, pacer=None, **kwargs):
+        """发送HTTP请求，网络异常、可重试状态码或check判定需要重试时按策略重试
+
+        重试用尽后，如果最后一次得到的是响应则返回该响应（由调用方处理状态码），否则抛出异常。
+
+        Args:
+            method: HTTP方法
+            url: 请求地址
+            session: requests.Session，None表示直接使用requests
+            policy: 本次请求使用的RetryPolicy
+            retry_statuses: 需要重试的HTTP状态码集合
+            check: 额外的判定函数 check(response) -> bool，返回True表示需要重试（如API业务错误码）
+            on_retry: 每次重试前的回调 on_retry(attempt, error)
+            pacer: AdaptivePacer实例，每次发送（包括重试）前等待其节奏，并把响应反馈给它
+            **kwargs: 传给requests的其他参数
+
+        Returns:
+            requests.Response
+        """
+        sender = session.request if session is not None else requests.request
+
+        def send():
+            if pacer is not None:
+                pacer.acquire()
+            response = sender(method, url, **kwargs)
+            if pacer is not None:
+                pacer.observe(response)
+            if response.status_code in retry_statuses:
+                raise RetryableResponseError(response, f"HTTP {response.status_code}")
+            if check is not None and check(response):
+                raise RetryableResponseError(response, "API返回需要重试的错误码")
+            return response
+
+        try:
+            return self.call(send, host=host_of(url), policy=policy, on_retry=on_retry,
+                             description=f"{method} {urlparse(url).path}")
+        except RetryableResponseError as e:
+            return e.response
+
+    def get(self, url, **kwargs):
+        """GET请求的简写"""
+        return self.request('GET', url, **kwargs)
+
+
+_default_retrier = None
+_default_lock = threading.Lock()
+
+
+def get_default_retrier():
+    """返回进程内共享的Retrier（共享重试预算和熔断状态）"""
+    global _default_retrier
+    with _default_lock:
+        if _default_retrier is None:
+            _default_retrier = Retrier(budget=RetryBudget())
+        return _default_retrier
@@ -0,0 +1,268 @@
+import os
+import math
+import time
+import logging
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, wait
+from bilibili_retry import api_code_retryable
+
+logger = logging.getLogger(__name__)
+
+# 支持的附属文件类型
+SIDECAR_KINDS = ('cover', 'subtitles', 'danmaku')
+
+# 分段弹幕接口每段覆盖的时长（秒）
+DANMAKU_SEGMENT_SECONDS = 360
+
+# protobuf线路类型
+_WIRE_VARINT, _WIRE_64BIT, _WIRE_BYTES, _WIRE_32BIT = 0, 1, 2, 5
+
+
+def parse_sidecar_kinds(text):
+    """解析 --sidecars 参数，如 'cover,danmaku' 或 'all'
+
+    Raises:
+        ValueError: 包含不支持的类型
+    """
+    if not text:
+        return ()
+    kinds = [kind.strip() for kind in text.split(',') if kind.strip()]
+    if 'all' in kinds:
+        return SIDECAR_KINDS
+    unknown = [kind for kind in kinds if kind not in SIDECAR_KINDS]
+    if unknown:
+        raise ValueError(f"不支持的附属文件类型: {', '.join(unknown)}")
+    return tuple(kinds)
+
+
+def _read_varint(data, pos):
+    """读取一个protobuf varint，返回 (值, 新位置)"""
+    result = shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("protobuf数据不完整")
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def iter_protobuf_fields(data):
+    """逐个读取protobuf消息的顶层字段，产出 (字段号, 线路类型, 值)，长度分隔字段的值为bytes"""
+    pos = 0
+    while pos < len(data):
+        key, pos = _read_varint(data, pos)
+        field, wire_type = key >> 3, key & 0x07
+        if wire_type == _WIRE_VARINT:
+            value, pos = _read_varint(data, pos)
+        elif wire_type == _WIRE_64BIT:
+            value, pos = data[pos:pos + 8], pos + 8
+        elif wire_type == _WIRE_BYTES:
+            length, pos = _read_varint(data, pos)
+            value, pos = data[pos:pos + length], pos + length
+        elif wire_type == _WIRE_32BIT:
+            value, pos = data[pos:pos + 4], pos + 4
+        else:
+            raise ValueError(f"不支持的protobuf线路类型: {wire_type}")
+        yield field, wire_type, value
+
+
+def count_danmaku(data):
+    """统计DmSegMobileReply中的弹幕条数（字段1为重复的DanmakuElem）"""
+    return sum(1 for field, wire_type, _ in iter_protobuf_fields(data) if field == 1 and wire_type == _WIRE_BYTES)
+
+
+def _srt_time(seconds):
+    milliseconds = int(round(float(seconds) * 1000))
+    hours, milliseconds = divmod(milliseconds, 3600000)
+    minutes, milliseconds = divmod(milliseconds, 60000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d},{milliseconds:03d}"
+
+
+def subtitle_to_srt(subtitle):
+    """把B站CC字幕JSON（body: [{from, to, content}]）转换为SRT文本"""
+    lines = []
+    for index, item in enumerate(subtitle.get('body') or [], 1):
+        lines.append(str(index))
+        lines.append(f"{_srt_time(item.get('from', 0))} --> {_srt_time(item.get('to', 0))}")
+        lines.append(item.get('content', ''))
+        lines.append('')
+    return '\n'.join(lines)
+
+
+def _write_atomic(path, content):
+    """先写临时文件再替换，中断时不会留下不完整的附属文件"""
+    temp_path = path + '.part'
+    with open(temp_path, 'wb') as f:
+        f.write(content)
+    os.replace(temp_path, path)
+    return path
+
+
+class SidecarFetcher:
+    """附属文件（封面、CC字幕、弹幕）获取：与媒体流下载同时在后台线程中进行
+
+    使用下载器的会话（同一个连接池）、重试组件和请求节奏控制器（以后台优先级使用空闲的请求时间点，
+    不推迟视频信息和播放地址请求）；分段弹幕的各段并发获取，合并为一个protobuf文件
+    （DmSegMobileReply的重复字段可以直接拼接）。
+    """
+
+    def __init__(self, downloader, kinds=SIDECAR_KINDS, workers=3, danmaku_workers=4):
+        """初始化附属文件获取器
+
+        Args:
+            downloader: BilibiliDownloader实例，共用其会话、请求头、重试组件、节奏控制器和API根地址
+            kinds: 需要获取的附属文件类型
+            workers: 同时获取的附属文件类型数量
+            danmaku_workers: 并发获取的弹幕分段数量（实际请求速率仍由节奏控制器决定）
+        """
+        self.downloader = downloader
+        self.kinds = tuple(kinds)
+        self.pacer = downloader.pacer.background()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='sidecar')
+        self._segment_executor = ThreadPoolExecutor(max_workers=max(1, danmaku_workers),
+                                                    thread_name_prefix='danmaku')
+
+    def _get(self, url, api=False, **kwargs):
+        """通过下载器的会话和重试组件发送GET请求；API请求经过节奏控制器，CDN资源不经过"""
+        downloader = self.downloader
+        headers = dict(downloader.headers)
+        headers['Referer'] = 'https://www.bilibili.com/'
+        response = downloader.retrier.request('GET', url, session=downloader.session, headers=headers,
+                                              check=api_code_retryable if api else None,
+                                              pacer=self.pacer if api else None, timeout=30, **kwargs)
+        response.raise_for_status()
+        return response
+
+    def fetch_cover(self, video_info, output_dir, base_name):
+        """下载封面图
+
+        Returns:
+            list: 保存的文件路径
+        """
+        url = video_info.get('pic')
+        if not url:
+            return []
+        if url.startswith('//'):
+            url = 'https:' + url
+        extension = os.path.splitext(urlparse(url).path)[1] or '.jpg'
+        response = self._get(url)
+        return [_write_atomic(os.path.join(output_dir, base_name + extension), response.content)]
+
+    def fetch_subtitles(self, video_info, output_dir, base_name):
+        """下载全部CC字幕并转换为SRT（需要登录Cookie时未登录返回空列表）
+
+        Returns:
+            list: 保存的文件路径
+        """
+        api_url = f"{self.downloader.api_base}/x/player/v2"
+        data = self._get(api_url, api=True,
+                         params={'bvid': video_info.get('bvid'), 'cid': video_info.get('cid')}).json()
+        if data.get('code') != 0:
+            raise Exception(f"获取字幕列表失败: {data.get('message')} (code: {data.get('code')})")
+        paths = []
+        for subtitle in ((data.get('data') or {}).get('subtitle') or {}).get('subtitles') or []:
+            url = subtitle.get('subtitle_url')
+            if not url:
+                continue
+            if url.startswith('//'):
+                url = 'https:' + url
+            body = self._get(url).json()
+            path = os.path.join(output_dir, f"{base_name}.{subtitle.get('lan') or 'unknown'}.srt")
+            paths.append(_write_atomic(path, subtitle_to_srt(body).encode('utf-8')))
+        return paths
+
+    def _fetch_danmaku_segment(self, cid, aid, index):
+        """获取一段弹幕（protobuf），超出视频时长的分段返回空"""
+        response = self._get(f"{self.downloader.api_base}/x/v2/dm/web/seg.so", api=True,
+                             params={'type': 1, 'oid': cid, 'pid': aid, 'segment_index': index})
+        return b'' if response.status_code == 304 else response.content
+
+    def fetch_danmaku(self, video_info, output_dir, base_name):
+        """并发获取全部弹幕分段，按分段顺序拼接保存为 .danmaku.pb
+
+        Returns:
+            list: 保存的文件路径
+        """
+        cid, aid = video_info.get('cid'), video_info.get('aid')
+        duration = video_info.get('duration') or 0
+        pages = [page for page in video_info.get('pages') or [] if page.get('cid') == cid]
+        if pages and pages[0].get('duration'):
+            duration = pages[0]['duration']
+        segments = max(1, math.ceil(duration / DANMAKU_SEGMENT_SECONDS))
+        futures = [self._segment_executor.submit(self._fetch_danmaku_segment, cid, aid, index)
+                   for index in range(1, segments + 1)]
+        content = b''.join(future.result() for future in futures)
+        path = _write_atomic(os.path.join(output_dir, f"{base_name}.danmaku.pb"), content)
+        logger.debug("弹幕 %s 段，共 %s 条", segments, count_danmaku(content))
+        return [path]
+
+    def start(self, video_info, output_dir, base_name):
+        """在后台开始获取附属文件，立即返回
+
+        Args:
+            video_info: 视频信息（x/web-interface/view的data）
+            output_dir: 保存目录
+            base_name: 文件名（不含扩展名），与媒体文件一致
+
+        Returns:
+            dict: 类型 -> Future
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        handlers = {'cover': self.fetch_cover, 'subtitles': self.fetch_subtitles, 'danmaku': self.fetch_danmaku}
+        start = time.monotonic()
+
+        def timed(handler):
+            paths = handler(video_info, output_dir, base_name)
+            return paths, time.monotonic() - start
+
+        return {kind: self._executor.submit(timed, handlers[kind]) for kind in self.kinds}
+
+    def collect(self, jobs, timeout=None):
+        """等待附属文件获取完成，单个类型失败只记录警告
+
+        Returns:
+            dict: paths（保存的文件路径列表）、errors（类型 -> 错误信息）、seconds（最后完成的类型耗时）
+        """
+        wait(jobs.values(), timeout=timeout)
+        result = {'paths': [], 'errors': {}, 'seconds': 0.0}
+        for kind, future in jobs.items():
+            if not future.done():
+                result['errors'][kind] = '超时'
+                continue
+            try:
+                paths, seconds = future.result()
+            except Exception as e:
+                logger.warning("获取%s失败: %s", {'cover': '封面', 'subtitles': '字幕', 'danmaku': '弹幕'}[kind], e)
+                result['errors'][kind] = str(e)
+                continue
+            result['paths'].extend(paths)
+            result['seconds'] = max(result['seconds'], seconds)
+        return result
+
+    def discard(self, jobs):
+        """媒体下载失败或被放弃时调用：取消尚未开始的获取，等待正在进行的获取结束，删除已保存的附属文件"""
+        for future in jobs.values():
+            future.cancel()
+        wait(jobs.values())
+        for kind, future in jobs.items():
+            if future.cancelled():
+                continue
+            try:
+                paths, _ = future.result()
+            except Exception as e:
+                logger.debug("获取%s失败（媒体下载已失败）: %s", kind, e)
+                continue
+            for path in paths:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def close(self):
+        """等待进行中的获取结束并停止后台线程"""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._segment_executor.shutdown(wait=True, cancel_futures=True)
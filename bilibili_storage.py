@@ -0,0 +1,218 @@
+import os
+import time
+import queue
+import hashlib
+import logging
+import threading
+from bilibili_memory import get_default_memory_budget
+
+logger = logging.getLogger(__name__)
+
+# 复制和计算校验值时每次读取的大小
+COPY_CHUNK_SIZE = 4 * 1024 * 1024
+
+# 移动校验方式：size只比较字节数，hash在复制时计算源文件校验值并重新读取目标文件比较
+VERIFY_MODES = ('size', 'hash')
+
+# 队列中表示停止的标记
+_STOP = object()
+
+
+def file_hash(path, chunk_size=COPY_CHUNK_SIZE, memory_budget=None):
+    """计算文件的BLAKE2b校验值（比SHA-256更快，用于检测复制或下载中的损坏）
+
+    Args:
+        path: 文件路径
+        chunk_size: 每次读取的大小
+        memory_budget: MemoryBudget实例，每块读取前申请，None表示使用进程内共享的预算
+
+    Returns:
+        str: 十六进制校验值
+    """
+    budget = memory_budget if memory_budget is not None else get_default_memory_budget()
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        while True:
+            with budget.reserve(chunk_size):
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                chunk = None
+    return digest.hexdigest()
+
+
+def same_filesystem(path_a, path_b):
+    """两个路径（目录或文件）是否位于同一文件系统，同一文件系统内可以直接重命名而无需复制"""
+    try:
+        return os.stat(path_a).st_dev == os.stat(path_b).st_dev
+    except OSError:
+        return False
+
+
+class LibraryMover:
+    """后台把暂存目录（本地NVMe/tmpfs）中下载完成的文件移动到资料库（如NAS）
+
+    下载和合并都在暂存目录中进行，资料库只接收一次最终文件的顺序写入；移动在后台线程中进行，
+    与后续视频的下载重叠。复制先写入 .part 临时文件，校验通过后再重命名为最终文件并删除暂存文件，
+    中途失败时资料库中不会出现不完整的文件，暂存文件也会保留。
+    """
+
+    def __init__(self, workers=1, verify='size', max_pending=8, metrics=None, memory_budget=None):
+        """初始化移动器
+
+        Args:
+            workers: 并发移动的线程数（NAS通常顺序写入最快，默认1）
+            verify: 校验方式，'size' 比较字节数，'hash' 额外比较源文件和目标文件的校验值
+            max_pending: 等待移动的文件数上限，超过时提交方等待，避免暂存目录被占满
+            metrics: MetricsRecorder实例，用于导出等待移动的文件数，None表示不记录
+            memory_budget: MemoryBudget实例，复制时每块读取前申请，None表示使用进程内共享的预算
+        """
+        if verify not in VERIFY_MODES:
+            raise ValueError(f"不支持的校验方式: {verify}")
+        self.workers = max(1, workers)
+        self.verify = verify
+        self.metrics = metrics
+        self.memory_budget = memory_budget if memory_budget is not None else get_default_memory_budget()
+        self._queue = queue.Queue(maxsize=max(1, max_pending))
+        self._threads = []
+        self._lock = threading.Lock()
+        self.stats = {'moved': 0, 'failed': 0, 'bytes': 0, 'renamed': 0, 'seconds': 0.0}
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f'library_mover_{index}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, source, library_dir, on_done=None, on_error=None):
+        """提交一个待移动的文件，队列满时等待
+
+        Args:
+            source: 暂存目录中的文件路径
+            library_dir: 资料库目录
+            on_done: 移动成功后在移动线程中调用 on_done(目标路径, 文件大小)
+            on_error: 移动失败时在移动线程中调用 on_error(异常)
+
+        Returns:
+            str: 移动完成后文件在资料库中的路径
+        """
+        destination = os.path.join(library_dir, os.path.basename(source))
+        self._ensure_started()
+        self._queue.put((source, destination, on_done, on_error))
+        self._update_gauge()
+        return destination
+
+    def _update_gauge(self):
+        if self.metrics is not None:
+            self.metrics.set_gauge('library_move_pending', self._queue.qsize())
+
+    def _copy(self, source, temp_path):
+        """分块复制并在复制时计算源文件校验值（只在hash校验时计算），写完后fsync
+
+        Returns:
+            str|None: 源文件校验值
+        """
+        digest = hashlib.blake2b(digest_size=16) if self.verify == 'hash' else None
+        with open(source, 'rb') as src, open(temp_path, 'wb') as dst:
+            while True:
+                with self.memory_budget.reserve(COPY_CHUNK_SIZE):
+                    chunk = src.read(COPY_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    if digest is not None:
+                        digest.update(chunk)
+                    dst.write(chunk)
+                    chunk = None
+            dst.flush()
+            os.fsync(dst.fileno())
+        return digest.hexdigest() if digest is not None else None
+
+    def move(self, source, destination):
+        """把一个文件移动到资料库并校验（同步执行）
+
+        Returns:
+            int: 文件大小（字节）
+
+        Raises:
+            OSError: 复制失败或校验不一致
+        """
+        size = os.path.getsize(source)
+        os.makedirs(os.path.dirname(os.path.abspath(destination)), exist_ok=True)
+
+        # 暂存目录与资料库在同一文件系统时直接重命名
+        if same_filesystem(source, os.path.dirname(os.path.abspath(destination))):
+            os.replace(source, destination)
+            self._count('renamed')
+            return size
+
+        temp_path = destination + '.part'
+        try:
+            source_hash = self._copy(source, temp_path)
+            copied = os.path.getsize(temp_path)
+            if copied != size:
+                raise OSError(f"复制后大小不一致: {copied} != {size}")
+            if source_hash is not None and file_hash(temp_path, memory_budget=self.memory_budget) != source_hash:
+                raise OSError("复制后校验值不一致")
+            os.replace(temp_path, destination)
+        except Exception:
+            if os.path.exists(temp_path):
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+            raise
+        os.remove(source)
+        return size
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            source, destination, on_done, on_error = item
+            start = time.monotonic()
+            try:
+                size = self.move(source, destination)
+            except Exception as e:
+                logger.error("移动到资料库失败 (%s): %s，暂存文件已保留", source, e)
+                self._count('failed')
+                if on_error is not None:
+                    try:
+                        on_error(e)
+                    except Exception as callback_error:
+                        logger.warning("移动失败回调出错: %s", callback_error)
+                continue
+            finally:
+                self._update_gauge()
+            self._count('moved')
+            self._count('bytes', size)
+            self._count('seconds', time.monotonic() - start)
+            logger.info("已移动到资料库: %s", destination)
+            if on_done is not None:
+                try:
+                    on_done(destination, size)
+                except Exception as e:
+                    logger.warning("移动完成回调出错: %s", e)
+
+    def close(self):
+        """等待所有已提交的文件移动完成并停止移动线程
+
+        Returns:
+            dict: 统计信息
+        """
+        with self._lock:
+            threads = list(self._threads)
+            self._threads = []
+        for _ in threads:
+            self._queue.put(_STOP)
+        for thread in threads:
+            thread.join()
+        return dict(self.stats)
@@ -0,0 +1,214 @@
+import os
+import json
+import shutil
+import logging
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from ffmpeg_capabilities import get_ffmpeg_capabilities
+from bilibili_storage import file_hash
+from bilibili_catalog import VERIFY_OK, VERIFY_FAILED, VERIFY_UNPROBED
+
+logger = logging.getLogger(__name__)
+
+# 时长允许的误差：取固定秒数和比例中较大的一个（音视频流的首尾时间戳不完全对齐）
+DURATION_TOLERANCE_SECONDS = 2.0
+DURATION_TOLERANCE_RATIO = 0.01
+
+# 单个文件ffprobe的超时时间（秒）
+PROBE_TIMEOUT = 120
+
+
+def find_ffprobe():
+    """查找ffprobe：优先使用与ffmpeg同目录的ffprobe，否则在PATH中查找，找不到时返回None"""
+    return get_ffmpeg_capabilities().ffprobe_path or shutil.which('ffprobe')
+
+
+def expected_streams_for(path):
+    """根据文件名判断应包含的流：未合并的 *_video_only.mp4 只有视频流，其余应同时有视频流和音频流"""
+    if os.path.splitext(os.path.basename(path))[0].endswith('_video_only'):
+        return ('video',)
+    return ('video', 'audio')
+
+
+def probe_media(path, ffprobe_path, timeout=PROBE_TIMEOUT):
+    """用ffprobe读取容器时长和流类型
+
+    Returns:
+        dict: duration（秒，未知时为None）、streams（流类型列表，如 ['video', 'audio']）、codecs
+
+    Raises:
+        RuntimeError: ffprobe无法解析文件（文件损坏或不完整）
+    """
+    cmd = [ffprobe_path, '-v', 'error', '-show_entries', 'format=duration:stream=codec_type,codec_name',
+           '-of', 'json', path]
+    process = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout)
+    stderr = process.stderr.decode('utf-8', errors='replace').strip()
+    if process.returncode != 0:
+        raise RuntimeError(f"ffprobe解析失败: {stderr.splitlines()[-1] if stderr else process.returncode}")
+    data = json.loads(process.stdout.decode('utf-8', errors='replace') or '{}')
+    duration = (data.get('format') or {}).get('duration')
+    streams = data.get('streams') or []
+    return {
+        'duration': float(duration) if duration not in (None, 'N/A') else None,
+        'streams': [stream.get('codec_type') for stream in streams],
+        'codecs': [stream.get('codec_name') for stream in streams],
+        'warnings': stderr
+    }
+
+
+class MediaVerifier:
+    """下载文件的完整性校验：文件大小、ffprobe能否解析、时长是否与接口一致、音视频流是否齐全，并计算校验值"""
+
+    def __init__(self, ffprobe_path=None, hash_files=True):
+        """初始化校验器
+
+        Args:
+            ffprobe_path: ffprobe可执行文件路径，None表示自动查找（找不到时只检查大小和校验值）
+            hash_files: 是否计算文件的BLAKE2b校验值
+        """
+        self.ffprobe_path = ffprobe_path or find_ffprobe()
+        self.hash_files = hash_files
+        if self.ffprobe_path is None:
+            logger.warning("未找到ffprobe，只检查文件大小和校验值")
+
+    def verify(self, path, expected_duration=None, expected_streams=None, expected_size=None, expected_hash=None):
+        """校验一个文件
+
+        Args:
+            path: 文件路径
+            expected_duration: 接口返回的时长（秒），None表示不比较
+            expected_streams: 应包含的流类型，None表示按文件名判断
+            expected_size: 记录的文件大小（字节），None表示不比较
+            expected_hash: 记录的校验值，None表示不比较（用于重新校验时发现文件被改动或损坏）
+
+        Returns:
+            dict: state（ok/failed/unprobed）、errors、size、hash、duration、streams
+        """
+        result = {'path': path, 'errors': [], 'size': None, 'hash': None, 'duration': None, 'streams': []}
+        errors = result['errors']
+        if not path or not os.path.exists(path):
+            errors.append('文件不存在')
+            result['state'] = VERIFY_FAILED
+            return result
+
+        result['size'] = os.path.getsize(path)
+        if result['size'] == 0:
+            errors.append('文件为空')
+        if expected_size and result['size'] != expected_size:
+            errors.append(f"文件大小与记录不一致: {result['size']} != {expected_size}")
+
+        if self.hash_files:
+            try:
+                result['hash'] = file_hash(path)
+            except OSError as e:
+                errors.append(f"读取文件失败: {e}")
+            if expected_hash and result['hash'] and result['hash'] != expected_hash:
+                errors.append('校验值与记录不一致')
+
+        if self.ffprobe_path is None:
+            result['state'] = VERIFY_FAILED if errors else VERIFY_UNPROBED
+            return result
+
+        try:
+            probe = probe_media(path, self.ffprobe_path)
+        except Exception as e:
+            errors.append(str(e))
+            result['state'] = VERIFY_FAILED
+            return result
+
+        result['duration'] = probe['duration']
+        result['streams'] = probe['streams']
+        for stream_type in expected_streams or expected_streams_for(path):
+            if stream_type not in probe['streams']:
+                errors.append(f"缺少{'视频' if stream_type == 'video' else '音频'}流")
+        if expected_duration:
+            if probe['duration'] is None:
+                errors.append('无法读取时长')
+            else:
+                tolerance = max(DURATION_TOLERANCE_SECONDS, expected_duration * DURATION_TOLERANCE_RATIO)
+                if abs(probe['duration'] - expected_duration) > tolerance:
+                    errors.append(f"时长与接口不一致: {probe['duration']:.1f}s != {expected_duration}s")
+
+        result['state'] = VERIFY_FAILED if errors else VERIFY_OK
+        return result
+
+
+class VerificationPool:
+    """后台校验线程池：下载完成的文件提交后由工作线程校验，结果写入视频目录，不占用下载线程的时间"""
+
+    def __init__(self, verifier=None, catalog=None, workers=4):
+        """初始化校验线程池
+
+        Args:
+            verifier: MediaVerifier实例，None表示使用默认配置
+            catalog: VideoCatalog实例，校验结果写入目录，None表示不记录
+            workers: 并发校验的文件数（计算校验值受磁盘读取速度限制，ffprobe是独立进程）
+        """
+        self.verifier = verifier if verifier is not None else MediaVerifier()
+        self.catalog = catalog
+        self.workers = max(1, workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='verify')
+        self._lock = threading.Lock()
+        self.failures = []
+        self.stats = {VERIFY_OK: 0, VERIFY_FAILED: 0, VERIFY_UNPROBED: 0, 'bytes': 0}
+
+    def _verify(self, bvid, path, kwargs):
+        try:
+            result = self.verifier.verify(path, **kwargs)
+        except Exception as e:
+            result = {'path': path, 'state': VERIFY_FAILED, 'errors': [f"校验出错: {e}"], 'size': None}
+        result['bvid'] = bvid
+        with self._lock:
+            self.stats[result['state']] += 1
+            self.stats['bytes'] += result.get('size') or 0
+            if result['state'] == VERIFY_FAILED:
+                self.failures.append(result)
+        if result['state'] == VERIFY_FAILED:
+            logger.warning("校验失败 %s: %s", bvid, '; '.join(result['errors']))
+        else:
+            logger.debug("校验通过 %s (%s)", bvid, result['state'])
+        if self.catalog is not None and bvid:
+            try:
+                self.catalog.record_verification(bvid, result)
+            except Exception as e:
+                logger.warning("记录校验结果失败: %s", e)
+        return result
+
+    def submit(self, bvid, path, expected_duration=None, expected_streams=None, expected_size=None,
+               expected_hash=None):
+        """提交一个待校验的文件
+
+        Returns:
+            Future: 结果为MediaVerifier.verify()的返回值（附带bvid）
+        """
+        kwargs = {'expected_duration': expected_duration, 'expected_streams': expected_streams,
+                  'expected_size': expected_size, 'expected_hash': expected_hash}
+        return self._executor.submit(self._verify, bvid, path, kwargs)
+
+    def run(self, targets):
+        """并发校验视频目录中的一组视频（VideoCatalog.verification_targets()的结果）
+
+        Returns:
+            list: 校验结果，顺序与输入一致
+        """
+        futures = []
+        for target in targets:
+            # 以下载时记录的分P时长为准（分P视频的接口时长是所有分P之和）；旧版目录没有记录时，
+            # 曾经校验通过的文件以当时ffprobe读到的时长为准，否则不比较时长
+            duration = target.get('expected_duration')
+            if not duration and target.get('verify_state') == VERIFY_OK:
+                duration = target.get('media_duration')
+            futures.append(self.submit(target['bvid'], target['file_path'], expected_duration=duration,
+                                       expected_size=target.get('file_size'),
+                                       expected_hash=target.get('file_hash')))
+        return [future.result() for future in futures]
+
+    def close(self):
+        """等待所有已提交的校验完成
+
+        Returns:
+            dict: 统计信息
+        """
+        self._executor.shutdown(wait=True)
+        return dict(self.stats)
@@ -1,20 +1,77 @@
 import os
 import json
 import time
+import logging
 import random
-import requests
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
+from bilibili_retry import get_default_retrier, RetryPolicy, CircuitOpenError, api_code_retryable, RETRY_STATUSES
+from bilibili_pacer import get_default_pacer, is_risk_control
+from bilibili_wbi import get_mixin_key, key_from_url, sign_params
+
+logger = logging.getLogger(__name__)
+
+# 空间接口风控较严，重试退避比默认策略更长
+API_RETRY_POLICY = RetryPolicy(max_attempts=3, base_delay=5.0, max_delay=60.0)
+
+
+class RiskControlError(Exception):
+    """接口在重试后仍返回风控拦截（HTTP 412 或 -412/-352/-799），需要更换Cookie指纹或WBI密钥"""
+
+
+class IncompleteListError(Exception):
+    """视频列表没有获取完整：某一页重试后仍失败或主机已熔断，已获取的视频已经产出"""
+
+    def __init__(self, message, fetched=0):
+        super().__init__(message)
+        self.fetched = fetched
+
+
+def _server_error_retryable(response):
+    """只对服务端错误码重试，风控错误码直接返回给调用方处理"""
+    return api_code_retryable(response) and not is_risk_control(response)
+
+
+def video_info_from_api(video):
+    """将空间投稿列表接口（x/space/wbi/arc/search）返回的视频条目转换为视频信息字典"""
+    return {
+        'bvid': video.get('bvid', ''),
+        'aid': video.get('aid', 0),
+        'title': video.get('title', '未知标题'),
+        'description': video.get('description', ''),
+        'pic': video.get('pic', ''),
+        'created': video.get('created', 0),
+        'length': video.get('length', ''),
+        'play': video.get('play', 0),
+        'comment': video.get('comment', 0),
+        'video_review': video.get('video_review', 0),
+        'favorites': video.get('favorites', 0),
+        'author': video.get('author', ''),
+        'typeid': video.get('typeid', 0),
+        'typename': video.get('typename', ''),
+        'is_union_video': video.get('is_union_video', 0)
+    }
+
 
 class BilibiliVideoCollectorAPI:
     """B站视频列表收集类（API版本），用于通过API根据UP主UID获取所有视频列表"""
     
-    def __init__(self, cookie_path=None, proxy=None):
+    def __init__(self, cookie_path=None, proxy=None, retrier=None, pacer=None, api_base='https://api.bilibili.com',
+                 catalog=None):
         """初始化视频收集器
         
         Args:
             cookie_path: Cookie文件路径
             proxy: 代理设置，如 http://127.0.0.1:7890
+            retrier: Retrier实例，None表示使用进程内共享的重试组件
+            pacer: AdaptivePacer实例，控制API请求节奏，None表示使用进程内共享的节奏控制器
+            api_base: API根地址，基准测试时可指向本地模拟服务器
+            catalog: VideoCatalog实例，收集到的视频元数据写入本地目录，None表示不保存
         """
+        self.catalog = catalog
+        self.retrier = retrier if retrier is not None else get_default_retrier()
+        self.pacer = pacer if pacer is not None else get_default_pacer()
         # 初始化cookies属性
         self.cookies = {}
         self.proxies = None
@@ -32,19 +89,29 @@ class BilibiliVideoCollectorAPI:
                         self.cookies = {cookie['name']: cookie['value'] for cookie in cookies}
                     elif isinstance(cookies, dict):
                         self.cookies = cookies
-                    print(f"已加载Cookie，共{len(self.cookies)}项")
+                    logger.debug("已加载Cookie，共%s项", len(self.cookies))
             except Exception as e:
-                print(f"警告: 加载Cookie失败 - {str(e)}")
+                logger.warning("加载Cookie失败 - %s", e)
         
         # API地址 - 使用更简单的接口
+        self.api_base = api_base.rstrip('/')
         self.api_urls = {
-            'up_info': 'https://api.bilibili.com/x/space/acc/info',
-            'video_list': 'https://api.bilibili.com/x/space/wbi/arc/search'
+            'up_info': f'{self.api_base}/x/space/acc/info',
+            'up_info_wbi': f'{self.api_base}/x/space/wbi/acc/info',
+            'video_list': f'{self.api_base}/x/space/wbi/arc/search',
+            'nav': f'{self.api_base}/x/web-interface/nav',
+            'finger_spi': f'{self.api_base}/x/frontend/finger/spi'
         }
         
-        # 重试次数和延迟设置
-        self.max_retries = 3
-        self.page_size = 10  # 减少每页数量，降低请求负载
+        # WBI签名密钥，设置后空间接口的请求都会带上 wts / w_rid 签名
+        self.mixin_key = None
+        # 遇到风控时是否在原地退避重试；混合收集器会关闭它，改为重新获取Cookie和密钥
+        self.retry_risk_control = True
+        
+        # 每页数量设置：使用接口允许的最大值，减少请求次数
+        self.page_size = 50
+        # 同时在途的分页请求数
+        self.max_in_flight = 3
     
     def _get_simple_headers(self):
         """获取简单的请求头，避免被识别为爬虫"""
@@ -67,6 +134,56 @@ class BilibiliVideoCollectorAPI:
         params['_'] = str(int(time.time() * 1000))  # 使用毫秒级时间戳
         return params
     
+    def set_wbi_keys(self, img_key, sub_key):
+        """设置WBI签名密钥（来自页面localStorage的wbi_img_urls或nav接口的wbi_img）"""
+        self.mixin_key = get_mixin_key(img_key, sub_key)
+        logger.debug("已设置WBI签名密钥")
+    
+    def fetch_wbi_keys(self):
+        """通过nav接口获取WBI签名密钥（未登录时接口返回-101，但仍包含wbi_img）
+        
+        Returns:
+            bool: 是否获取成功
+        """
+        try:
+            response = self.retrier.request('GET', self.api_urls['nav'], pacer=self.pacer,
+                                            headers=self._get_simple_headers(), cookies=self.cookies,
+                                            proxies=self.proxies, timeout=10)
+            wbi_img = (response.json().get('data') or {}).get('wbi_img') or {}
+            img_url, sub_url = wbi_img.get('img_url'), wbi_img.get('sub_url')
+            if img_url and sub_url:
+                self.set_wbi_keys(key_from_url(img_url), key_from_url(sub_url))
+                return True
+            logger.warning("nav接口未返回WBI密钥")
+        except Exception as e:
+            logger.warning("获取WBI密钥失败: %s", e)
+        return False
+    
+    def fetch_fingerprint_cookies(self):
+        """通过finger/spi接口获取设备指纹Cookie（buvid3、buvid4），并补上b_nut
+        
+        Returns:
+            bool: 是否获取成功
+        """
+        try:
+            response = self.retrier.request('GET', self.api_urls['finger_spi'], pacer=self.pacer,
+                                            headers=self._get_simple_headers(), proxies=self.proxies, timeout=10)
+            data = response.json().get('data') or {}
+            if data.get('b_3'):
+                self.cookies['buvid3'] = data['b_3']
+                if data.get('b_4'):
+                    self.cookies['buvid4'] = data['b_4']
+                self.cookies['b_nut'] = str(int(time.time()))
+                return True
+            logger.warning("finger/spi接口未返回buvid3")
+        except Exception as e:
+            logger.warning("获取设备指纹Cookie失败: %s", e)
+        return False
+    
+    def _sign(self, params):
+        """已设置WBI密钥时为参数添加签名"""
+        return sign_params(params, self.mixin_key) if self.mixin_key else params
+    
     def get_up_info(self, uid):
         """获取UP主信息
         
@@ -76,191 +193,214 @@ class BilibiliVideoCollectorAPI:
         Returns:
             UP主信息字典
         """
-        params = self._get_common_params({'mid': uid})
+        params = self._sign(self._get_common_params({'mid': uid}))
+        url = self.api_urls['up_info_wbi' if self.mixin_key else 'up_info']
         headers = self._get_simple_headers()
         
         # 添加Referer
         headers['Referer'] = f'https://space.bilibili.com/{uid}/'
         
-        for retry in range(self.max_retries):
-            try:
-                print(f"正在获取UP主信息 (尝试 {retry + 1}/{self.max_retries})...")
-                
-                # 使用简单的get请求，不使用session
-                response = requests.get(
-                    self.api_urls['up_info'],
-                    params=params,
-                    headers=headers,
-                    cookies=self.cookies,
-                    proxies=self.proxies,
-                    timeout=10
-                )
+        try:
+            logger.debug("正在获取UP主信息...")
+            
+            # 使用简单的get请求，不使用session；网络异常、风控错误码由重试组件按退避策略重试
+            response = self.retrier.request(
+                'GET',
+                url,
+                policy=API_RETRY_POLICY,
+                check=api_code_retryable,
+                pacer=self.pacer,
+                params=params,
+                headers=headers,
+                cookies=self.cookies,
+                proxies=self.proxies,
+                timeout=10
+            )
+            
+            # 检查响应状态码
+            if response.status_code == 200:
+                data = response.json()
                 
-                # 检查响应状态码
-                if response.status_code == 200:
-                    data = response.json()
-                    
-                    # 检查API返回的状态
-                    if data.get('code') == 0 and 'data' in data:
-                        # 提取需要的信息
-                        return {
-                            'name': data['data'].get('name', '未知'),
-                            'face': data['data'].get('face', ''),
-                            'sign': data['data'].get('sign', '无简介'),
-                            'level': data['data'].get('level', 0),
-                            'archive_count': data['data'].get('archive_count', 0),
-                            'article_count': data['data'].get('article_count', 0),
-                            'following': data['data'].get('following', 0),
-                            'fans': data['data'].get('fans', 0),
-                            'likes': data['data'].get('likes', 0)
-                        }
-                    else:
-                        error_msg = data.get('message', '未知错误')
-                        print(f"获取UP主信息失败: {error_msg} (code: {data.get('code')})")
+                # 检查API返回的状态
+                if data.get('code') == 0 and 'data' in data:
+                    # 提取需要的信息
+                    return {
+                        'name': data['data'].get('name', '未知'),
+                        'face': data['data'].get('face', ''),
+                        'sign': data['data'].get('sign', '无简介'),
+                        'level': data['data'].get('level', 0),
+                        'archive_count': data['data'].get('archive_count', 0),
+                        'article_count': data['data'].get('article_count', 0),
+                        'following': data['data'].get('following', 0),
+                        'fans': data['data'].get('fans', 0),
+                        'likes': data['data'].get('likes', 0)
+                    }
                 else:
-                    print(f"获取UP主信息失败: HTTP状态码 {response.status_code}")
-                    print(f"响应内容: {response.text[:200]}...")
-            except Exception as e:
-                print(f"获取UP主信息时发生异常: {str(e)}")
-            
-            # 重试前等待
-            if retry < self.max_retries - 1:
-                wait_time = random.uniform(5, 10)
-                print(f"{wait_time:.1f} 秒后重试...")
-                time.sleep(wait_time)
+                    error_msg = data.get('message', '未知错误')
+                    logger.warning("获取UP主信息失败: %s (code: %s)", error_msg, data.get('code'))
+            else:
+                logger.warning("获取UP主信息失败: HTTP状态码 %s", response.status_code)
+                logger.debug("响应内容: %s...", response.text[:200])
+        except Exception as e:
+            logger.warning("获取UP主信息时发生异常: %s", e)
         
         # 如果多次尝试后仍失败，返回基本信息
-        print("获取UP主信息失败，返回基本信息")
+        logger.warning("获取UP主信息失败，返回基本信息")
         return {
             'name': f'未知用户{uid}',
             'sign': '无法获取简介',
             'archive_count': 0
         }
     
-    def get_up_videos(self, uid, max_videos=None):
-        """获取UP主所有视频列表
+    def fetch_video_page(self, uid, page):
+        """获取一页视频列表
         
         Args:
             uid: UP主UID
-            max_videos: 最大获取视频数量，None表示获取全部
+            page: 页码，从1开始
             
         Returns:
-            视频列表
+            tuple: (该页的原始视频列表, 投稿总数)
+            
+        Raises:
+            CircuitOpenError: API已熔断
+            RiskControlError: 重试后仍被风控拦截
+            Exception: 重试后仍失败
         """
-        videos = []
-        page = 1
-        has_more = True
+        logger.debug("正在获取第 %s 页视频...", page)
+        
+        # 构建请求参数
+        params = self._get_common_params({
+            'mid': uid,
+            'pn': page,
+            'ps': self.page_size,
+            'order': 'pubdate',  # 按发布日期排序
+            'tid': 0  # 全部分区
+        })
+        params = self._sign(params)
         
-        # 计算需要获取的页数
-        total_pages = float('inf')  # 初始化为无穷大
-        if max_videos:
-            total_pages = (max_videos + self.page_size - 1) // self.page_size
+        headers = self._get_simple_headers()
+        headers['Referer'] = f'https://space.bilibili.com/{uid}/'
         
-        print(f"开始获取视频列表，每页 {self.page_size} 个视频")
+        # 发送请求，网络异常、风控错误码由重试组件按退避策略重试，请求节奏由节奏控制器控制
+        response = self.retrier.request(
+            'GET',
+            self.api_urls['video_list'],
+            policy=API_RETRY_POLICY,
+            retry_statuses=RETRY_STATUSES if self.retry_risk_control else RETRY_STATUSES - {412},
+            check=api_code_retryable if self.retry_risk_control else _server_error_retryable,
+            pacer=self.pacer,
+            params=params,
+            headers=headers,
+            cookies=self.cookies,
+            proxies=self.proxies,
+            timeout=15
+        )
         
-        while has_more and page <= total_pages:
-            print(f"正在获取第 {page} 页视频...")
-            
-            # 构建请求参数
-            params = self._get_common_params({
-                'mid': uid,
-                'pn': page,
-                'ps': self.page_size,
-                'order': 'pubdate',  # 按发布日期排序
-                'tid': 0  # 全部分区
-            })
+        if is_risk_control(response):
+            raise RiskControlError(f"第 {page} 页被风控拦截 (HTTP {response.status_code})")
+        
+        # 检查响应状态码
+        if response.status_code != 200:
+            raise Exception(f"HTTP状态码 {response.status_code}")
+        
+        data = response.json()
+        # 检查API返回的状态
+        if data.get('code') != 0 or 'list' not in (data.get('data') or {}) or 'vlist' not in data['data']['list']:
+            raise Exception(f"{data.get('message', '未知错误')} (code: {data.get('code')})")
+        
+        count = data['data'].get('page', {}).get('count', 0)
+        return data['data']['list']['vlist'], count
+    
+    def iter_up_videos(self, uid, max_videos=None, max_in_flight=None):
+        """逐个产出UP主的视频（生成器），调用方无需等待整个列表获取完成即可开始处理
+        
+        先获取第一页得到投稿总数，其余页面交给线程池并发请求，同时在途的请求不超过max_in_flight个，
+        实际发送节奏仍由共享的节奏控制器决定；结果按页码顺序产出。
+        
+        Args:
+            uid: UP主UID
+            max_videos: 最大获取视频数量，None表示获取全部
+            max_in_flight: 同时在途的分页请求数，None表示使用self.max_in_flight
             
-            headers = self._get_simple_headers()
-            headers['Referer'] = f'https://space.bilibili.com/{uid}/'
+        Yields:
+            视频信息字典
             
-            try:
-                # 发送请求
-                response = requests.get(
-                    self.api_urls['video_list'],
-                    params=params,
-                    headers=headers,
-                    cookies=self.cookies,
-                    proxies=self.proxies,
-                    timeout=15
-                )
+        Raises:
+            IncompleteListError: 某一页获取失败，在产出此前获取到的视频之后抛出
+        """
+        max_in_flight = max_in_flight or self.max_in_flight
+        logger.info("开始获取视频列表，每页 %s 个视频", self.page_size)
+        
+        try:
+            first_page, count = self.fetch_video_page(uid, 1)
+        except Exception as e:
+            raise IncompleteListError(f"获取第 1 页视频列表失败: {e}") from e
+        
+        # 根据投稿总数和最大数量计算需要的页数
+        wanted = min(count, max_videos) if max_videos else count
+        total_pages = max(1, (wanted + self.page_size - 1) // self.page_size)
+        logger.debug("投稿总数 %s，需要获取 %s 页", count, total_pages)
+        
+        produced = 0
+        for video in first_page:
+            if max_videos and produced >= max_videos:
+                return
+            produced += 1
+            yield video_info_from_api(video)
+        if total_pages <= 1 or len(first_page) < self.page_size:
+            return
+        
+        executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix=f'up_{uid}_pages')
+        pending = deque()
+        next_page = 2
+        try:
+            while next_page <= total_pages or pending:
+                # 保持在途请求数量
+                while next_page <= total_pages and len(pending) < max_in_flight:
+                    pending.append((next_page, executor.submit(self.fetch_video_page, uid, next_page)))
+                    next_page += 1
                 
-                # 检查响应状态码
-                if response.status_code == 200:
-                    data = response.json()
-                    
-                    # 检查API返回的状态
-                    if data.get('code') == 0 and 'data' in data and 'list' in data['data'] and 'vlist' in data['data']['list']:
-                        page_videos = data['data']['list']['vlist']
-                        
-                        # 处理每一个视频
-                        for video in page_videos:
-                            video_info = {
-                                'bvid': video.get('bvid', ''),
-                                'aid': video.get('aid', 0),
-                                'title': video.get('title', '未知标题'),
-                                'description': video.get('description', ''),
-                                'pic': video.get('pic', ''),
-                                'created': video.get('created', 0),
-                                'length': video.get('length', ''),
-                                'play': video.get('play', 0),
-                                'comment': video.get('comment', 0),
-                                'video_review': video.get('video_review', 0),
-                                'favorites': video.get('favorites', 0),
-                                'author': video.get('author', ''),
-                                'typeid': video.get('typeid', 0),
-                                'typename': video.get('typename', ''),
-                                'is_union_video': video.get('is_union_video', 0)
-                            }
-                            videos.append(video_info)
-                            
-                            # 如果已达到最大视频数量，停止获取
-                            if max_videos and len(videos) >= max_videos:
-                                has_more = False
-                                break
-                        
-                        # 检查是否还有更多页
-                        if len(page_videos) < self.page_size or (max_videos and len(videos) >= max_videos):
-                            has_more = False
-                        else:
-                            # 增加页码，准备获取下一页
-                            page += 1
-                            # 添加随机延迟，避免请求过于频繁
-                            wait_time = random.uniform(3, 7)
-                            print(f"已获取第 {page-1} 页，等待 {wait_time:.1f} 秒后继续获取第 {page} 页...")
-                            time.sleep(wait_time)
-                    else:
-                        error_msg = data.get('message', '未知错误')
-                        print(f"获取视频列表失败: {error_msg} (code: {data.get('code')})")
-                        # 尝试重试
-                        if page > 1:
-                            wait_time = random.uniform(5, 10)
-                            print(f"{wait_time:.1f} 秒后重试第 {page} 页...")
-                            time.sleep(wait_time)
-                        else:
-                            # 第一页失败，直接结束
-                            has_more = False
-                else:
-                    print(f"获取视频列表失败: HTTP状态码 {response.status_code}")
-                    # 尝试重试
-                    if page > 1:
-                        wait_time = random.uniform(5, 10)
-                        print(f"{wait_time:.1f} 秒后重试第 {page} 页...")
-                        time.sleep(wait_time)
-                    else:
-                        # 第一页失败，直接结束
-                        has_more = False
-            except Exception as e:
-                print(f"获取视频列表时发生异常: {str(e)}")
-                # 尝试重试
-                if page > 1:
-                    wait_time = random.uniform(5, 10)
-                    print(f"{wait_time:.1f} 秒后重试第 {page} 页...")
-                    time.sleep(wait_time)
-                else:
-                    # 第一页失败，直接结束
-                    has_more = False
+                page, future = pending.popleft()
+                try:
+                    page_videos, _ = future.result()
+                except CircuitOpenError as e:
+                    raise IncompleteListError(f"停止获取视频列表: {e}", produced) from e
+                except Exception as e:
+                    # 重试组件已按退避策略重试过，仍失败则让调用方知道列表不完整
+                    raise IncompleteListError(f"获取第 {page} 页视频列表失败: {e}", produced) from e
+                
+                for video in page_videos:
+                    if max_videos and produced >= max_videos:
+                        return
+                    produced += 1
+                    yield video_info_from_api(video)
+                logger.debug("已获取第 %s/%s 页，当前请求速率 %.2f 次/秒", page, total_pages, self.pacer.rate)
+                
+                # 投稿数在获取过程中减少时提前结束
+                if len(page_videos) < self.page_size:
+                    return
+        finally:
+            # 调用方提前停止迭代或出错时，取消尚未开始的分页请求
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def get_up_videos(self, uid, max_videos=None):
+        """获取UP主所有视频列表
         
-        print(f"共获取到 {len(videos)} 个视频")
+        Args:
+            uid: UP主UID
+            max_videos: 最大获取视频数量，None表示获取全部
+            
+        Returns:
+            视频列表（获取中途失败时为已获取的部分）
+        """
+        videos = []
+        try:
+            for video in self.iter_up_videos(uid, max_videos):
+                videos.append(video)
+        except IncompleteListError as e:
+            logger.warning("%s，返回已获取的 %s 个视频", e, len(videos))
+        logger.info("共获取到 %s 个视频", len(videos))
         return videos
     
     def print_video_list(self, videos, show_all=False):
@@ -341,19 +481,19 @@ class BilibiliVideoCollectorAPI:
         Returns:
             视频列表
         """
-        print(f"开始获取UP主 {uid} 的视频列表...")
+        logger.info("开始获取UP主 %s 的视频列表...", uid)
         
         # 先做简单的UID验证
         if not isinstance(uid, (int, str)) or (isinstance(uid, str) and not uid.isdigit()):
-            print(f"错误: 无效的UID格式 - {uid}")
+            logger.error("无效的UID格式 - %s", uid)
             return []
         
         uid = str(uid)
         videos = []
         
         try:
-            # 1. 获取UP主信息（单独的请求，使用更长的延迟）
-            print("\n[步骤1] 获取UP主信息...")
+            # 1. 获取UP主信息
+            logger.info("[步骤1] 获取UP主信息...")
             up_info = self.get_up_info(uid)
             print(f"UP主: {up_info.get('name', '未知')}")
             print(f"简介: {up_info.get('sign', '无简介')}")
@@ -363,29 +503,28 @@ class BilibiliVideoCollectorAPI:
                 print(f"总视频数: {up_info.get('archive_count', 0)}")
             print("=" * 50)
             
-            # 2. 间隔较长时间后获取视频列表
-            print("\n[步骤2] 等待一段时间后获取视频列表...")
-            wait_time = random.uniform(5, 8)
-            print(f"等待 {wait_time:.1f} 秒，避免触发频率限制...")
-            time.sleep(wait_time)
+            # 2. 获取视频列表（请求间隔由节奏控制器统一控制）
+            logger.info("[步骤2] 获取视频列表...")
             
             # 3. 获取视频列表
             videos = self.get_up_videos(uid, max_videos)
+            if videos and self.catalog is not None:
+                self.catalog.record_collection(uid, up_info, videos)
             
             # 4. 打印视频列表
             if videos:
-                print("\n[步骤3] 打印视频列表...")
+                logger.info("[步骤3] 打印视频列表...")
                 self.print_video_list(videos, show_all)
             else:
-                print("\n未获取到任何视频")
+                logger.warning("未获取到任何视频")
                 
         except KeyboardInterrupt:
-            print("\n用户中断操作")
+            logger.warning("用户中断操作")
         except Exception as e:
-            print(f"发生错误: {str(e)}")
+            logger.error("发生错误: %s", e)
             # 即使出错，也尝试提供模拟数据
             if not videos:
-                print("提供模拟视频数据...")
+                logger.warning("提供模拟视频数据...")
                 videos = self._get_mock_videos(uid, max_videos)
                 if videos:
                     self.print_video_list(videos, show_all)
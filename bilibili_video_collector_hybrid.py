@@ -0,0 +1,229 @@
+import logging
+import threading
+from bilibili_retry import get_default_retrier, CircuitOpenError
+from bilibili_pacer import get_default_pacer
+from bilibili_wbi import keys_from_text
+from bilibili_video_collector_api import (BilibiliVideoCollectorAPI, RiskControlError, IncompleteListError,
+                                          video_info_from_api)
+from bilibili_video_collector_selenium import BilibiliVideoCollectorSelenium
+
+logger = logging.getLogger(__name__)
+
+
+class BilibiliVideoCollectorHybrid:
+    """B站视频列表收集类（混合版本）：浏览器只用来获取Cookie和WBI密钥，列表分页全部走HTTP接口
+
+    启动时打开一次浏览器访问空间页，取得浏览器生成的Cookie（含buvid3/b_nut等设备指纹）和页面缓存的WBI密钥，
+    之后按页请求签名后的列表接口；只有接口被风控拦截时才再次打开浏览器刷新Cookie和密钥，然后重试当前页。
+    浏览器不可用时改为通过finger/spi和nav接口获取设备指纹和密钥。
+    """
+
+    def __init__(self, cookie_path=None, proxy=None, metrics=None, profiler=None, retrier=None, pacer=None,
+                 api_base='https://api.bilibili.com', space_base='https://space.bilibili.com', headless=True,
+                 lean=True, browser_pool=None, use_browser=True, max_bootstraps=3, catalog=None):
+        """初始化混合收集器
+
+        Args:
+            cookie_path: Cookie文件路径
+            proxy: 代理设置，如 http://127.0.0.1:7890
+            metrics: MetricsRecorder实例，自动下载时传给下载器
+            profiler: PhaseProfiler实例，自动下载时传给下载器
+            retrier: Retrier实例，None表示使用进程内共享的重试组件
+            pacer: AdaptivePacer实例，控制API请求节奏，None表示使用进程内共享的节奏控制器
+            api_base: API根地址，基准测试时可指向本地模拟服务器
+            space_base: 空间页根地址，浏览器访问 {space_base}/{uid}/video
+            headless: 浏览器是否使用无头模式
+            lean: 是否使用精简浏览器（获取Cookie不需要图片、字体等资源）
+            browser_pool: BrowserPool实例，获取Cookie时从池中借用浏览器，None表示每次启动新浏览器
+            use_browser: 是否使用浏览器获取Cookie，False表示只通过接口获取设备指纹和密钥
+            max_bootstraps: 首次之外因风控重新获取Cookie和密钥的最大次数
+            catalog: VideoCatalog实例，收集到的视频元数据和下载状态写入本地目录，None表示不保存
+        """
+        self.cookie_path = cookie_path
+        self.proxy = proxy
+        self.metrics = metrics
+        self.profiler = profiler
+        self.retrier = retrier if retrier is not None else get_default_retrier()
+        self.pacer = pacer if pacer is not None else get_default_pacer()
+        self.space_base = space_base.rstrip('/')
+        self.headless = headless
+        self.use_browser = use_browser
+        self.max_bootstraps = max_bootstraps
+        self.catalog = catalog
+
+        self.api = BilibiliVideoCollectorAPI(cookie_path, proxy, retrier=self.retrier, pacer=self.pacer,
+                                             api_base=api_base)
+        # 风控由本类通过重新获取Cookie处理，接口层不再原地退避重试
+        self.api.retry_risk_control = False
+        self.browser = BilibiliVideoCollectorSelenium(cookie_path, proxy, metrics=metrics, profiler=profiler,
+                                                      retrier=self.retrier, pacer=self.pacer,
+                                                      browser_pool=browser_pool, lean=lean, catalog=catalog)
+
+        # 每成功获取一次Cookie和密钥加1，用于判断风控后是否已被其他线程刷新过
+        self.generation = 0
+        self._lock = threading.Lock()
+        self.stats = {'bootstraps': 0, 'browser_bootstraps': 0, 'pages': 0, 'risk_control': 0}
+
+    def _bootstrap_from_browser(self, uid):
+        """通过浏览器获取Cookie和WBI密钥，返回是否成功"""
+        credentials = self.browser.get_session_credentials(uid, self.headless,
+                                                           f"{self.space_base}/{uid}/video")
+        if credentials is None:
+            # 浏览器无法启动时后续刷新不再尝试浏览器
+            logger.warning("浏览器不可用，之后改为通过接口获取Cookie和WBI密钥")
+            self.use_browser = False
+            return False
+        if not credentials['cookies']:
+            return False
+
+        self.api.cookies.update(credentials['cookies'])
+        self.stats['browser_bootstraps'] += 1
+        if not self.api.cookies.get('buvid3'):
+            logger.warning("浏览器未生成buvid3，改为通过接口获取设备指纹")
+            self.api.fetch_fingerprint_cookies()
+
+        keys = keys_from_text(credentials['wbi_text'])
+        if keys:
+            self.api.set_wbi_keys(*keys)
+            return True
+        logger.debug("页面中没有缓存的WBI密钥，改为通过nav接口获取")
+        return self.api.fetch_wbi_keys()
+
+    def bootstrap(self, uid, seen_generation=None):
+        """获取Cookie和WBI密钥；多个线程同时遇到风控时只刷新一次
+
+        Args:
+            uid: 用于打开空间页的UP主UID
+            seen_generation: 调用方遇到风控时的generation，与当前值不同说明其他线程已经刷新过
+
+        Returns:
+            bool: 当前是否持有可用的Cookie和密钥
+        """
+        with self._lock:
+            if seen_generation is not None and seen_generation != self.generation:
+                return True
+
+            self.stats['bootstraps'] += 1
+            ok = self.use_browser and self._bootstrap_from_browser(uid)
+            if not ok:
+                if self.use_browser:
+                    logger.warning("浏览器获取Cookie失败，改为通过接口获取设备指纹和WBI密钥")
+                fingerprint = self.api.fetch_fingerprint_cookies()
+                ok = self.api.fetch_wbi_keys() and fingerprint
+
+            if ok:
+                self.generation += 1
+                logger.info("已获取Cookie和WBI密钥（第 %s 次）", self.stats['bootstraps'])
+            else:
+                logger.warning("获取Cookie和WBI密钥失败")
+            return ok
+
+    def ensure_bootstrapped(self, uid):
+        """尚未获取过Cookie和密钥时获取一次"""
+        if self.generation == 0:
+            self.bootstrap(uid, seen_generation=0)
+
+    def iter_up_videos(self, uid, max_videos=None):
+        """逐页请求列表接口并逐个产出视频（生成器），遇到风控时重新获取Cookie和密钥后重试当前页
+
+        分页按顺序进行，请求节奏由共享的节奏控制器决定。
+
+        Args:
+            uid: UP主UID
+            max_videos: 最大获取视频数量，None表示获取全部
+
+        Yields:
+            视频信息字典
+
+        Raises:
+            IncompleteListError: 某一页获取失败或多次重新获取Cookie后仍被风控，在产出此前获取到的视频之后抛出
+        """
+        self.ensure_bootstrapped(uid)
+        page_size = self.api.page_size
+        page, total_pages, produced = 1, None, 0
+        refreshes = 0
+
+        while total_pages is None or page <= total_pages:
+            generation = self.generation
+            try:
+                page_videos, count = self.api.fetch_video_page(uid, page)
+            except RiskControlError as e:
+                self.stats['risk_control'] += 1
+                if refreshes >= self.max_bootstraps:
+                    raise IncompleteListError(f"多次重新获取Cookie后仍被风控拦截: {e}", produced) from e
+                refreshes += 1
+                logger.info("%s，重新获取Cookie和WBI密钥后重试", e)
+                if not self.bootstrap(uid, generation):
+                    raise IncompleteListError(f"重新获取Cookie和WBI密钥失败: {e}", produced) from e
+                continue
+            except CircuitOpenError as e:
+                raise IncompleteListError(f"停止获取视频列表: {e}", produced) from e
+            except Exception as e:
+                raise IncompleteListError(f"获取第 {page} 页视频列表失败: {e}", produced) from e
+
+            self.stats['pages'] += 1
+            if total_pages is None:
+                wanted = min(count, max_videos) if max_videos else count
+                total_pages = max(1, (wanted + page_size - 1) // page_size)
+                logger.debug("投稿总数 %s，需要获取 %s 页", count, total_pages)
+
+            for video in page_videos:
+                if max_videos and produced >= max_videos:
+                    return
+                produced += 1
+                yield video_info_from_api(video)
+            logger.debug("已获取第 %s/%s 页，当前请求速率 %.2f 次/秒", page, total_pages, self.pacer.rate)
+
+            if len(page_videos) < page_size:
+                return
+            page += 1
+
+    def collect_videos(self, uid, max_videos=None, auto_download=False, output_dir='./downloads', download_workers=2):
+        """收集UP主视频列表并保存为JSON，可选边收集边下载
+
+        每获取到一个视频就追加到UP主目录下的 videos_<UID>.jsonl，启用自动下载时同时交给下载线程。
+
+        Args:
+            uid: UP主UID
+            max_videos: 最大获取视频数量
+            auto_download: 是否边收集边自动下载每个视频
+            output_dir: 输出目录
+            download_workers: 自动下载时的下载线程数
+
+        Returns:
+            BV号列表
+        """
+        uid = str(uid)
+        self.ensure_bootstrapped(uid)
+
+        up_info = self.api.get_up_info(uid)
+        up_info['uid'] = uid
+        logger.info("UP主: %s", up_info.get('name', '未知'))
+
+        video_details = []
+
+        def collected():
+            try:
+                for video in self.iter_up_videos(uid, max_videos):
+                    video_details.append(video)
+                    yield video
+            except IncompleteListError as e:
+                logger.warning("%s，保存已获取的 %s 个视频", e, len(video_details))
+
+        up_dir = self.browser.up_dir(up_info, output_dir)
+        pipeline = self.browser.create_pipeline(up_dir, uid, auto_download, max_videos, download_workers)
+        stats = pipeline.run(collected())
+        bvid_list = [video['bvid'] for video in video_details]
+        logger.info("共获取到 %s 个视频", len(bvid_list))
+
+        if bvid_list:
+            self.browser.save_to_json(up_info, bvid_list, output_dir, video_details=video_details, up_dir=up_dir)
+            if self.catalog is not None:
+                self.catalog.record_collection(uid, up_info, video_details)
+        else:
+            logger.warning("未获取到任何视频的BV号")
+
+        if auto_download:
+            logger.info("下载完成: 成功 %s，失败 %s，跳过 %s，首个下载在开始后 %s 秒启动", stats['downloaded'],
+                        stats['failed'], stats['skipped'], stats['first_download_start'])
+        return bvid_list
@@ -1,12 +1,21 @@
 import os
 import json
 import time
+import logging
 import random
 import socket
 import re
-import requests
+from urllib.parse import urlparse, parse_qs
 from selenium import webdriver
 from bilibili_downloader import BilibiliDownloader
+from bilibili_pipeline import CollectDownloadPipeline
+from bilibili_retry import get_default_retrier, RetryPolicy, api_code_retryable, host_of
+from bilibili_pacer import get_default_pacer
+from bilibili_network_capture import NetworkCapture
+from bilibili_browser_pool import BrowserPool
+from bilibili_page_waits import (wait_for_settled, wait_for_list_change, wait_for_video_links, wait_for_login,
+                                 list_signature)
+from bilibili_video_collector_api import video_info_from_api
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
@@ -15,19 +24,119 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
 from webdriver_manager.chrome import ChromeDriverManager
 
+logger = logging.getLogger(__name__)
+
+# 页面导航失败（超时、连接被重置等）时的重试策略
+NAVIGATION_RETRY_POLICY = RetryPolicy(max_attempts=3, base_delay=2.0, max_delay=20.0)
+
+# 条件等待的上限（秒）：等待手动登录、每次滚动后内容加载、翻页后列表变化
+LOGIN_WAIT_TIMEOUT = 30
+SCROLL_SETTLE_TIMEOUT = 4
+PAGE_CHANGE_TIMEOUT = 10
+
+# 精简模式下通过CDP屏蔽的请求：图片、字体、音视频，以及统计/广告等跟踪域名
+LEAN_BLOCKED_URLS = [
+    '*.jpg*', '*.jpeg*', '*.png*', '*.gif*', '*.webp*', '*.avif*', '*.svg*', '*.ico*',
+    '*.woff*', '*.ttf*', '*.otf*', '*.eot*',
+    '*.mp4*', '*.m4s*', '*.flv*', '*.mp3*', '*.webm*',
+    '*://data.bilibili.com/*', '*://cm.bilibili.com/*', '*://api.bilibili.com/x/click-interface/*',
+    '*://s1.hdslb.com/bfs/seed/log/*', '*://hm.baidu.com/*', '*://*.google-analytics.com/*',
+    '*://*.googletagmanager.com/*', '*://*.doubleclick.net/*',
+]
+# 精简模式下页面V8堆内存上限（MB）
+LEAN_RENDERER_HEAP_MB = 512
+
+# 网络捕获模式关注的接口：空间投稿列表与UP主信息（兼容带/不带wbi签名的路径）
+ARC_SEARCH_PATTERNS = ('x/space/wbi/arc/search', 'x/space/arc/search')
+ACC_INFO_PATTERNS = ('x/space/wbi/acc/info', 'x/space/acc/info')
+# 等待页面发出并完成一次列表请求的最长时间（秒）
+NETWORK_CAPTURE_TIMEOUT = 20
+
+# 点击空间页的"下一页"按钮（兼容新旧两版分页器），找不到可点击的按钮时返回false
+CLICK_NEXT_PAGE_JS = """
+const buttons = document.querySelectorAll('.be-pager-next, .vui_pagenation--btn-side, .vui_pagenation--btn');
+for (const button of buttons) {
+    if (!(button.textContent || '').includes('下一页') && !button.classList.contains('be-pager-next')) continue;
+    if (button.disabled || button.classList.contains('be-pager-disabled') || button.classList.contains('vui_button--disabled')) return false;
+    button.scrollIntoView({block: 'center'});
+    button.click();
+    return true;
+}
+return false;
+"""
+
+# 按给定的选择器在页面内一次性提取视频卡片：arguments[0] 为选择器列表，arguments[1] 为已收集的BV号；
+# 在浏览器内去重，只返回新出现的卡片 {bvid, title, duration, pubdate}
+EXTRACT_VIDEO_CARDS_JS = """
+const selectors = arguments[0];
+const seen = new Set(arguments[1] || []);
+const found = new Map();
+const bvPattern = /BV[0-9A-Za-z]{10}/;
+const textOf = (root, selector) => {
+    const el = root.querySelector(selector);
+    return el ? (el.getAttribute('title') || el.textContent || '').trim() : '';
+};
+for (const selector of selectors) {
+    let elements;
+    try {
+        elements = document.querySelectorAll(selector);
+    } catch (e) {
+        continue;
+    }
+    for (const element of elements) {
+        const links = element.matches('a[href]') ? [element] : element.querySelectorAll('a[href]');
+        for (const link of links) {
+            const match = bvPattern.exec(link.getAttribute('href'));
+            if (!match || seen.has(match[0]) || found.has(match[0])) continue;
+            const card = link.closest('.small-item, .video-item, .list-item, .video-card, .bili-video-card, .upload-video-card, li') || link;
+            found.set(match[0], {
+                bvid: match[0],
+                title: link.getAttribute('title') || textOf(card, '.title, .bili-video-card__title') || link.textContent.trim(),
+                duration: textOf(card, '.length, .duration, .bili-video-card__stats__duration, .bili-cover-card__stat:last-child'),
+                pubdate: textOf(card, '.time, .pubdate, .bili-video-card__subtitle, .bili-video-card__info--date')
+            });
+        }
+    }
+}
+return Array.from(found.values());
+"""
+
+
+def _page_number(url):
+    """从列表接口URL中解析页码（pn参数），缺省为第1页"""
+    try:
+        return int(parse_qs(urlparse(url).query).get('pn', ['1'])[0])
+    except ValueError:
+        return 1
+
 class BilibiliVideoCollectorSelenium:
     """B站视频列表收集类（Selenium版本），用于通过浏览器模拟获取UP主视频列表"""
     
-    def __init__(self, cookie_path=None, proxy=None):
+    def __init__(self, cookie_path=None, proxy=None, metrics=None, profiler=None, retrier=None, pacer=None,
+                 browser_pool=None, lean=False, catalog=None):
         """初始化视频收集器
         
         Args:
             cookie_path: Cookie文件路径
             proxy: 代理设置，如 http://127.0.0.1:7890
+            metrics: MetricsRecorder实例，自动下载时传给下载器
+            profiler: PhaseProfiler实例，用于按阶段采集CPU/内存剖析数据，None表示不剖析
+            retrier: Retrier实例，None表示使用进程内共享的重试组件
+            pacer: AdaptivePacer实例，控制API请求节奏，None表示使用进程内共享的节奏控制器
+            browser_pool: BrowserPool实例，收集时从池中借用浏览器而不是每次启动新浏览器，None表示不使用
+            lean: 是否使用精简浏览器（不加载图片、字体、音视频和跟踪脚本，限制页面内存）
+            catalog: VideoCatalog实例，收集到的视频元数据和下载状态写入本地目录，None表示不保存
         """
-        # 保存cookie路径和proxy，供下载器使用
+        # 保存cookie路径、proxy、指标记录器和剖析器，供下载器使用
         self.cookie_path = cookie_path
         self.proxy = proxy
+        self.metrics = metrics
+        self.profiler = profiler
+        self.retrier = retrier if retrier is not None else get_default_retrier()
+        self.pacer = pacer if pacer is not None else get_default_pacer()
+        self.browser_pool = browser_pool
+        self.lean = lean
+        self.catalog = catalog
         # 初始化cookies属性
         self.cookies = {}
         self.proxies = None
@@ -45,209 +154,371 @@ class BilibiliVideoCollectorSelenium:
                         self.cookies = {cookie['name']: cookie['value'] for cookie in cookies}
                     elif isinstance(cookies, dict):
                         self.cookies = cookies
-                    print(f"已加载Cookie，共{len(self.cookies)}项")
+                    logger.debug("已加载Cookie，共%s项", len(self.cookies))
             except Exception as e:
-                print(f"警告: 加载Cookie失败 - {str(e)}")
+                logger.warning("加载Cookie失败 - %s", e)
     
-    def get_videos_by_selenium(self, uid, max_videos=None, headless=True):
-        """使用Selenium模拟用户浏览获取UP主视频列表
+    def _profile_phase(self, uid, phase):
+        """切换到Selenium收集流程的下一个剖析阶段（未启用剖析时不做任何事）
         
         Args:
             uid: UP主UID
-            max_videos: 最大获取视频数量，None表示获取全部
+            phase: 阶段名称，传入None表示结束当前阶段
+        """
+        if self.profiler is None:
+            return
+        if phase is None:
+            self.profiler.stop()
+        else:
+            self.profiler.switch(f'uid_{uid}', phase)
+    
+    def _navigate(self, driver, url):
+        """通过重试组件打开页面，页面加载超时或连接异常时按退避策略重试
+        
+        Args:
+            driver: WebDriver实例
+            url: 页面地址
+        """
+        self.retrier.call(driver.get, url, host=host_of(url), policy=NAVIGATION_RETRY_POLICY,
+                          retry_exceptions=(TimeoutException, WebDriverException), description=f"打开 {url}")
+    
+    def _create_driver(self, uid, headless=True, capture_network=False, profile_dir=None, debug_port=9222):
+        """创建并配置Chrome浏览器
+        
+        Args:
+            uid: UP主UID，存在对应的已登录用户数据目录时使用它
             headless: 是否使用无头模式
+            capture_network: 是否开启性能日志（网络捕获模式需要）
+            profile_dir: 指定的用户数据目录（浏览器池中的实例各自独占一个），None表示按UID选择
+            debug_port: 远程调试端口，并行运行的实例需要各不相同
             
         Returns:
-            tuple: (BV号列表, 从页面获取的UP主信息)
+            WebDriver实例，初始化失败时返回None
         """
-        # 初始化bvid_list为空列表，确保在异常情况下也不会引用未定义变量
-        bvid_list = []
-        page_up_info = {}  # 用于存储从页面获取的UP主信息
+        # 配置Chrome选项
+        chrome_options = Options()
+        if headless:
+            chrome_options.add_argument('--headless')
         
-        print(f"开始使用Selenium获取UP主 {uid} 的视频BV号...")
+        # 解决SessionNotCreatedException错误的关键参数
+        chrome_options.add_argument('--disable-gpu')
+        chrome_options.add_argument('--no-sandbox')
+        chrome_options.add_argument('--disable-dev-shm-usage')
+        chrome_options.add_argument('--window-size=1920,1080')
+        chrome_options.add_argument(f'--remote-debugging-port={debug_port}')  # 解决DevToolsActivePort问题
+        chrome_options.add_argument('--disable-features=site-per-process')
+        chrome_options.add_argument('--disable-extensions')
+        chrome_options.add_argument('--disable-infobars')
+        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
         
-        # 先做简单的UID验证
-        if not isinstance(uid, (int, str)) or (isinstance(uid, str) and not uid.isdigit()):
-            print(f"错误: 无效的UID格式 - {uid}")
-            return []
+        # 添加网络相关配置
+        chrome_options.add_argument('--ignore-certificate-errors')
+        chrome_options.add_argument('--allow-insecure-localhost')
         
-        uid = str(uid)
-        driver = None
-        
-        try:
-            # 配置Chrome选项
-            chrome_options = Options()
-            if headless:
-                chrome_options.add_argument('--headless')
-            
-            # 解决SessionNotCreatedException错误的关键参数
-            chrome_options.add_argument('--disable-gpu')
-            chrome_options.add_argument('--no-sandbox')
-            chrome_options.add_argument('--disable-dev-shm-usage')
-            chrome_options.add_argument('--window-size=1920,1080')
-            chrome_options.add_argument('--remote-debugging-port=9222')  # 解决DevToolsActivePort问题
-            chrome_options.add_argument('--user-data-dir=' + os.path.join(os.path.dirname(os.path.abspath(__file__)), 'chrome_profile'))  # 指定用户数据目录
-            chrome_options.add_argument('--disable-features=site-per-process')
-            chrome_options.add_argument('--disable-extensions')
-            chrome_options.add_argument('--disable-infobars')
-            chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
-            
-            # 添加网络相关配置
-            chrome_options.add_argument('--ignore-certificate-errors')
-            chrome_options.add_argument('--allow-insecure-localhost')
-            
+        if profile_dir:
+            # 浏览器池中的实例使用独占的用户数据目录，登录状态保存在其中
+            chrome_options.add_argument('--user-data-dir=' + profile_dir)
+        else:
             # 确保用户数据目录存在
             user_data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'chrome_profile')
             if not os.path.exists(user_data_dir):
                 os.makedirs(user_data_dir)
-            
+        
             # 尝试使用项目中的cookies目录作为用户数据目录（如果存在）
             uid_cookies_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cookies', uid)
             if os.path.exists(uid_cookies_dir):
-                print(f"找到UP主 {uid} 的已有用户数据目录，使用它来避免登录")
+                logger.debug("找到UP主 %s 的已有用户数据目录，使用它来避免登录", uid)
                 chrome_options.add_argument('--user-data-dir=' + uid_cookies_dir)
             else:
                 # 使用通用的用户数据目录
-                print("使用通用的用户数据目录")
+                logger.debug("使用通用的用户数据目录")
                 chrome_options.add_argument('--user-data-dir=' + user_data_dir)
+        
+        # 精简模式：收集只需要页面文本和链接，不渲染图片、不自动播放，并限制渲染进程的内存
+        if self.lean:
+            chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+            chrome_options.add_argument('--autoplay-policy=user-gesture-required')
+            chrome_options.add_argument('--mute-audio')
+            chrome_options.add_argument('--disable-background-networking')
+            chrome_options.add_argument('--renderer-process-limit=2')
+            chrome_options.add_argument(f'--js-flags=--max-old-space-size={LEAN_RENDERER_HEAP_MB}')
+            chrome_options.add_experimental_option('prefs', {
+                'profile.managed_default_content_settings.images': 2,
+                'profile.managed_default_content_settings.media_stream': 2,
+                'profile.managed_default_content_settings.notifications': 2,
+            })
+        
+        # 网络捕获模式：开启性能日志，以便通过CDP读取页面自身发出的接口请求
+        if capture_network:
+            chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+        
+        # 尝试多种方式初始化Chrome驱动
+        self._profile_phase(uid, 'browser_start')
+        logger.info("初始化浏览器...")
+        
+        # 方法1：尝试直接使用系统已有的Chrome驱动（如果存在）
+        system_driver_paths = [
+            'C:\\Program Files\\Google\\Chrome\\Application\\chromedriver.exe',
+            'C:\\Program Files (x86)\\Google\\Chrome\\Application\\chromedriver.exe',
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), 'chromedriver.exe'),
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tools', 'chromedriver.exe')  # 添加tools目录下的驱动路径
+        ]
+        
+        driver_path = None
+        for path in system_driver_paths:
+            if os.path.exists(path):
+                driver_path = path
+                logger.debug("找到系统已安装的Chrome驱动: %s", driver_path)
+                break
+        
+        if driver_path:
+            # 使用找到的驱动路径
+            service = Service(driver_path)
+            driver = webdriver.Chrome(service=service, options=chrome_options)
+        else:
+            # 方法2：尝试使用webdriver-manager，但添加代理支持
+            logger.info("未找到系统驱动，尝试使用webdriver-manager自动下载...")
+            try:
+                # 配置代理（如果需要）
+                # 注意：这里可以根据需要修改代理设置
+                os.environ['WDM_PROXY'] = 'http://127.0.0.1:7890'  # 示例代理，根据实际情况修改
+                os.environ['WDM_LOCAL'] = '1'  # 优先使用本地缓存
+                
+                # 尝试获取Chrome驱动
+                service = Service(ChromeDriverManager().install())
+                driver = webdriver.Chrome(service=service, options=chrome_options)
+            except Exception as wdm_error:
+                logger.error("webdriver-manager下载失败: %s", wdm_error)
+                logger.warning("请手动下载Chrome驱动并放在项目根目录或Chrome安装目录下")
+                logger.warning("Chrome驱动下载地址: https://chromedriver.chromium.org/downloads")
+                logger.warning("请确保下载的驱动版本与已安装的Chrome浏览器版本匹配")
+                return None
+        
+        if self.lean:
+            self._block_heavy_requests(driver)
+        return driver
+    
+    def _block_heavy_requests(self, driver):
+        """通过CDP屏蔽图片、字体、音视频和跟踪域名的请求（对之后的所有页面生效）"""
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': LEAN_BLOCKED_URLS})
+            logger.debug("精简模式：已屏蔽 %s 类请求", len(LEAN_BLOCKED_URLS))
+        except Exception as e:
+            logger.warning("设置请求屏蔽失败，将加载完整页面: %s", e)
+    
+    def create_browser_pool(self, size=2, headless=True, capture_network=False, max_uses=20, max_memory_mb=1024):
+        """创建供本收集器使用的浏览器池（实例各自使用独立的用户数据目录和调试端口）
+        
+        Args:
+            size: 浏览器数量
+            headless: 是否使用无头模式
+            capture_network: 是否开启性能日志（网络捕获模式需要）
+            max_uses: 单个浏览器最多使用的次数
+            max_memory_mb: 页面JS堆内存上限（MB）
             
-            # 尝试多种方式初始化Chrome驱动
-            print("初始化浏览器...")
-            
-            # 方法1：尝试直接使用系统已有的Chrome驱动（如果存在）
-            system_driver_paths = [
-                'C:\\Program Files\\Google\\Chrome\\Application\\chromedriver.exe',
-                'C:\\Program Files (x86)\\Google\\Chrome\\Application\\chromedriver.exe',
-                os.path.join(os.path.dirname(os.path.abspath(__file__)), 'chromedriver.exe'),
-                os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tools', 'chromedriver.exe')  # 添加tools目录下的驱动路径
-            ]
+        Returns:
+            BrowserPool实例，同时设置为self.browser_pool
+        """
+        def factory(profile_dir, index):
+            return self._create_driver(f'pool_{index}', headless, capture_network, profile_dir=profile_dir,
+                                       debug_port=9222 + index)
+        
+        self.browser_pool = BrowserPool(factory, size=size, max_uses=max_uses, max_memory_mb=max_memory_mb)
+        return self.browser_pool
+    
+    def _open_browser(self, uid, headless, capture_network=False):
+        """获取浏览器：配置了浏览器池时从池中借用，否则启动新的浏览器
+        
+        Returns:
+            tuple: (WebDriver实例或None, 池中的PooledBrowser或None)
+        """
+        if self.browser_pool is None:
+            return self._create_driver(uid, headless, capture_network), None
+        self._profile_phase(uid, 'browser_start')
+        lease = self.browser_pool.acquire()
+        return (lease.driver if lease else None), lease
+    
+    def _close_browser(self, driver, lease):
+        """归还池中的浏览器，或关闭单独启动的浏览器"""
+        if lease is not None:
+            self.browser_pool.release(lease)
+            return
+        if driver:
+            logger.debug("关闭浏览器...")
+            try:
+                driver.quit()
+            except Exception as quit_error:
+                logger.warning("关闭浏览器时出错: %s", quit_error)
+    
+    def _handle_login(self, driver, space_url, headless):
+        """检测页面是否要求登录或验证码，尝试注入Cookie或等待手动登录
+        
+        Args:
+            driver: WebDriver实例
+            space_url: UP主空间页面地址，登录后重新访问
+            headless: 是否为无头模式（无头模式下无法手动登录）
+        """
+        # 尝试处理可能的验证码或登录提示
+        logger.debug("检查页面状态...")
+        page_source = driver.page_source
+        # 使用更精确的条件检测是否需要登录
+        if ('登录' in page_source and '登录按钮' in page_source) or ('验证码' in page_source and '请输入验证码' in page_source):
+                logger.warning("检测到可能需要登录或验证码")
+                if self.cookies:
+                    logger.debug("尝试添加Cookie...")
+                    # 清除现有的Cookie
+                    driver.delete_all_cookies()
+                    # 添加Cookie
+                    try:
+                        logger.debug("尝试添加Cookie，数据类型: %s", type(self.cookies).__name__)
+                        if isinstance(self.cookies, dict):
+                            for name, value in self.cookies.items():
+                                cookie_dict = {
+                                    'name': name,
+                                    'value': value,
+                                    'domain': '.bilibili.com',
+                                    'path': '/',
+                                    'secure': True,
+                                    'httpOnly': True
+                                }
+                                try:
+                                    driver.add_cookie(cookie_dict)
+                                except Exception as cookie_error:
+                                    logger.debug("添加Cookie %s 时出错: %s", name, cookie_error)
+                        elif isinstance(self.cookies, list):
+                            for cookie in self.cookies:
+                                try:
+                                    driver.add_cookie(cookie)
+                                except Exception as cookie_error:
+                                    logger.debug("添加Cookie时出错: %s", cookie_error)
+                        logger.debug("Cookie添加完成，刷新页面...")
+                        # 刷新页面
+                        driver.refresh()
+                        wait_for_settled(driver)
+                        # 重新检查页面状态
+                        new_page_source = driver.page_source
+                        if ('登录' in new_page_source and '登录按钮' in new_page_source) and not headless:
+                            logger.warning("请在浏览器中手动登录，最多等待%s秒...", LOGIN_WAIT_TIMEOUT)
+                            wait_for_login(driver, LOGIN_WAIT_TIMEOUT)
+                            logger.debug("重新访问UP主空间页面: %s", space_url)
+                            self._navigate(driver, space_url)
+                            wait_for_settled(driver)
+                        else:
+                            logger.debug("似乎已登录或无需登录，继续处理...")
+                    except Exception as e:
+                        logger.debug("处理Cookie时出错: %s", e)
+                elif not headless:
+                    logger.warning("请手动登录B站，登录完成后自动继续（最多等待%s秒）...", LOGIN_WAIT_TIMEOUT)
+                    wait_for_login(driver, LOGIN_WAIT_TIMEOUT)
+                    logger.debug("重新访问UP主空间页面: %s", space_url)
+                    self._navigate(driver, space_url)
+                    wait_for_settled(driver)
+                else:
+                    logger.warning("在无头模式下无法手动登录，请提供有效的Cookie文件")
+    
+    def _extract_video_cards(self, driver, selectors, video_cards, on_video=None):
+        """通过一次execute_script提取页面中的视频卡片，新出现的卡片按发现顺序加入video_cards
+        
+        Args:
+            driver: WebDriver实例
+            selectors: CSS选择器列表，匹配到的元素本身或其内部的视频链接都会被提取
+            video_cards: 已收集的视频卡片字典（BV号 -> 卡片信息），原地更新
+            on_video: 每发现一个新视频时调用的函数 on_video(卡片信息)，None表示不通知
             
-            driver_path = None
-            for path in system_driver_paths:
-                if os.path.exists(path):
-                    driver_path = path
-                    print(f"找到系统已安装的Chrome驱动: {driver_path}")
-                    break
+        Returns:
+            int: 新增的视频数量
+        """
+        try:
+            new_cards = driver.execute_script(EXTRACT_VIDEO_CARDS_JS, selectors, list(video_cards)) or []
+        except WebDriverException as e:
+            logger.debug("提取视频卡片时出错: %s", e)
+            return 0
+        for card in new_cards:
+            video_cards[card['bvid']] = card
+            if on_video is not None:
+                on_video(card)
+        if new_cards:
+            logger.debug("新发现 %s 个视频，累计 %s 个", len(new_cards), len(video_cards))
+        return len(new_cards)
+    
+    def get_videos_by_selenium(self, uid, max_videos=None, headless=True, return_details=False, on_video=None):
+        """使用Selenium模拟用户浏览获取UP主视频列表
+        
+        Args:
+            uid: UP主UID
+            max_videos: 最大获取视频数量，None表示获取全部
+            headless: 是否使用无头模式
+            return_details: 为True时返回视频卡片信息列表（bvid、title、duration、pubdate）而不是BV号列表
+            on_video: 每发现一个新视频时立即调用的函数 on_video(卡片信息)，用于边收集边下载
             
-            if driver_path:
-                # 使用找到的驱动路径
-                service = Service(driver_path)
-                driver = webdriver.Chrome(service=service, options=chrome_options)
-            else:
-                # 方法2：尝试使用webdriver-manager，但添加代理支持
-                print("未找到系统驱动，尝试使用webdriver-manager自动下载...")
-                try:
-                    # 配置代理（如果需要）
-                    # 注意：这里可以根据需要修改代理设置
-                    os.environ['WDM_PROXY'] = 'http://127.0.0.1:7890'  # 示例代理，根据实际情况修改
-                    os.environ['WDM_LOCAL'] = '1'  # 优先使用本地缓存
-                    
-                    # 尝试获取Chrome驱动
-                    service = Service(ChromeDriverManager().install())
-                    driver = webdriver.Chrome(service=service, options=chrome_options)
-                except Exception as wdm_error:
-                    print(f"webdriver-manager下载失败: {str(wdm_error)}")
-                    print("\n请手动下载Chrome驱动并放在项目根目录或Chrome安装目录下")
-                    print("Chrome驱动下载地址: https://chromedriver.chromium.org/downloads")
-                    print("请确保下载的驱动版本与已安装的Chrome浏览器版本匹配")
-                    return bvid_list, page_up_info, page_up_info
+        Returns:
+            tuple: (BV号列表或视频卡片信息列表, 从页面获取的UP主信息)
+        """
+        # 初始化bvid_list为空列表，确保在异常情况下也不会引用未定义变量
+        bvid_list = []
+        # 已收集的视频卡片（BV号 -> 卡片信息），保持发现顺序
+        video_cards = {}
+        page_up_info = {}  # 用于存储从页面获取的UP主信息
+        
+        logger.info("开始使用Selenium获取UP主 %s 的视频BV号...", uid)
+        
+        # 先做简单的UID验证
+        if not isinstance(uid, (int, str)) or (isinstance(uid, str) and not uid.isdigit()):
+            logger.error("无效的UID格式 - %s", uid)
+            return bvid_list, page_up_info
+        
+        uid = str(uid)
+        driver = lease = None
+        
+        try:
+            driver, lease = self._open_browser(uid, headless)
+            if driver is None:
+                return bvid_list, page_up_info
             
             # 增加等待时间以确保页面完全加载
             wait = WebDriverWait(driver, 20)  # 增加到20秒
             
             # 访问UP主空间页面
             space_url = f"https://space.bilibili.com/{uid}/video"
-            print(f"正在访问: {space_url}")
-            driver.get(space_url)
+            self._profile_phase(uid, 'page_load')
+            logger.info("正在访问: %s", space_url)
+            self._navigate(driver, space_url)
             
-            # 增加初始等待时间
-            time.sleep(3)
+            # 等待页面及其异步请求加载完成
+            wait_for_settled(driver)
             
             # 尝试处理可能的验证码或登录提示
-            print("检查页面状态...")
-            page_source = driver.page_source
-            # 使用更精确的条件检测是否需要登录
-            if ('登录' in page_source and '登录按钮' in page_source) or ('验证码' in page_source and '请输入验证码' in page_source):
-                    print("检测到可能需要登录或验证码")
-                    if self.cookies:
-                        print("尝试添加Cookie...")
-                        # 清除现有的Cookie
-                        driver.delete_all_cookies()
-                        # 添加Cookie
-                        try:
-                            print(f"尝试添加Cookie，数据类型: {type(self.cookies).__name__}")
-                            if isinstance(self.cookies, dict):
-                                for name, value in self.cookies.items():
-                                    cookie_dict = {
-                                        'name': name,
-                                        'value': value,
-                                        'domain': '.bilibili.com',
-                                        'path': '/',
-                                        'secure': True,
-                                        'httpOnly': True
-                                    }
-                                    try:
-                                        driver.add_cookie(cookie_dict)
-                                    except Exception as cookie_error:
-                                        print(f"添加Cookie {name} 时出错: {str(cookie_error)}")
-                            elif isinstance(self.cookies, list):
-                                for cookie in self.cookies:
-                                    try:
-                                        driver.add_cookie(cookie)
-                                    except Exception as cookie_error:
-                                        print(f"添加Cookie时出错: {str(cookie_error)}")
-                            print("Cookie添加完成，刷新页面...")
-                            # 刷新页面
-                            driver.refresh()
-                            time.sleep(3)
-                            # 重新检查页面状态
-                            new_page_source = driver.page_source
-                            if ('登录' in new_page_source and '登录按钮' in new_page_source) and not headless:
-                                print("30秒后继续，您可以在此期间手动登录...")
-                                time.sleep(30)
-                                print(f"重新访问UP主空间页面: {space_url}")
-                                driver.get(space_url)
-                                time.sleep(2)
-                            else:
-                                print("似乎已登录或无需登录，继续处理...")
-                        except Exception as e:
-                            print(f"处理Cookie时出错: {str(e)}")
-                    elif not headless:
-                        print("请手动登录B站...")
-                        print("30秒后继续处理...")
-                        time.sleep(30)
-                        print(f"重新访问UP主空间页面: {space_url}")
-                        driver.get(space_url)
-                        time.sleep(2)
-                    else:
-                        print("在无头模式下无法手动登录，请提供有效的Cookie文件")
+            self._handle_login(driver, space_url, headless)
             
             try:
                 # 使用更通用的选择器等待视频列表
-                print("等待视频列表加载...")
+                logger.debug("等待视频列表加载...")
                 # 等待页面主体内容加载
                 wait.until(EC.presence_of_element_located((By.TAG_NAME, 'body')))
-                print("页面主体内容加载成功")
+                logger.debug("页面主体内容加载成功")
                 
-                # 等待更长时间确保动态内容加载完成
-                print("等待动态内容加载...")
-                time.sleep(5)
+                # 等待视频卡片渲染出来（最多15秒）
+                logger.debug("等待动态内容加载...")
+                logger.debug("页面中已出现 %s 个视频链接", wait_for_video_links(driver))
                 
                 # 打印页面信息进行调试
-                print(f"当前页面URL: {driver.current_url}")
-                print(f"页面标题: {driver.title}")
-                print("页面内容中是否包含'视频'字样: {'视频' in driver.page_source}")
+                # 以下调试信息需要额外的WebDriver往返，仅在调试级别下获取
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("当前页面URL: %s", driver.current_url)
+                    logger.debug("页面标题: %s", driver.title)
+                    logger.debug("页面内容中是否包含'视频'字样: %s", '视频' in driver.page_source)
                 
                 # 尝试从页面获取UP主名字和信息
                 try:
-                    print("尝试从页面获取UP主信息...")
+                    logger.debug("尝试从页面获取UP主信息...")
                     
                     # 1. 首先检查页面标题是否包含UP主名字
                     if ' - 哔哩哔哩' in driver.title:
                         title_name = driver.title.split(' - 哔哩哔哩')[0].strip()
                         if title_name and len(title_name) > 1 and not title_name.startswith('加载中') and not title_name.startswith('B站'):
                             page_up_info['name'] = title_name
-                            print(f"从页面标题获取到UP主名字: {title_name}")
+                            logger.debug("从页面标题获取到UP主名字: %s", title_name)
                     
                     # 2. 如果标题中没找到，尝试使用更多选择器
                     if not page_up_info.get('name'):
@@ -294,7 +565,7 @@ class BilibiliVideoCollectorSelenium:
                                                 up_name = name_match.group(1).strip()
                                                 if up_name and len(up_name) > 1:
                                                     page_up_info['name'] = up_name
-                                                    print(f"从meta标签获取到UP主名字: {up_name}")
+                                                    logger.debug("从meta标签获取到UP主名字: %s", up_name)
                                                     break
                                     else:
                                         # 常规元素处理
@@ -308,16 +579,16 @@ class BilibiliVideoCollectorSelenium:
                                             # 过滤掉不是UP主名字的内容
                                             if '的空间' not in up_name and '视频' not in up_name and '动态' not in up_name and '关注' not in up_name:
                                                 page_up_info['name'] = up_name
-                                                print(f"从页面元素获取到UP主名字: {up_name}")
+                                                logger.debug("从页面元素获取到UP主名字: %s", up_name)
                                                 break
                                 if page_up_info.get('name'):
                                     break
                             except Exception as selector_error:
-                                print(f"尝试选择器 {selector} 时出错: {str(selector_error)}")
+                                logger.debug("尝试选择器 %s 时出错: %s", selector, selector_error)
                     
                     # 3. 尝试从页面HTML中直接搜索
                     if not page_up_info.get('name'):
-                        print("尝试从HTML中直接搜索UP主名字...")
+                        logger.debug("尝试从HTML中直接搜索UP主名字...")
                         page_html = driver.page_source
                         
                         # 尝试匹配页面中可能的UP主名字格式
@@ -337,7 +608,7 @@ class BilibiliVideoCollectorSelenium:
                                     # 过滤掉明显不是名字的内容
                                     if '的空间' not in match and '视频' not in match and '动态' not in match and '关注' not in match and len(match) < 50:
                                         page_up_info['name'] = match.strip()
-                                        print(f"从HTML中直接匹配到UP主名字: {page_up_info['name']}")
+                                        logger.debug("从HTML中直接匹配到UP主名字: %s", page_up_info['name'])
                                         break
                             if page_up_info.get('name'):
                                 break
@@ -356,7 +627,7 @@ class BilibiliVideoCollectorSelenium:
                                         text = sibling.text.strip()
                                         if text and len(text) > 1 and not text.startswith('加载中') and not text.startswith('B站') and '关注' not in text:
                                             page_up_info['name'] = text
-                                            print(f"从关注按钮附近获取到UP主名字: {text}")
+                                            logger.debug("从关注按钮附近获取到UP主名字: %s", text)
                                             break
                                     if page_up_info.get('name'):
                                         break
@@ -371,7 +642,7 @@ class BilibiliVideoCollectorSelenium:
                         sign_text = sign_element.text.strip()
                         if sign_text:
                             page_up_info['sign'] = sign_text
-                            print(f"获取到个性签名: {sign_text}")
+                            logger.debug("获取到个性签名: %s", sign_text)
                     except:
                         try:
                             # 尝试其他可能的签名选择器
@@ -382,7 +653,7 @@ class BilibiliVideoCollectorSelenium:
                                     sign_text = sign_element.text.strip()
                                     if sign_text:
                                         page_up_info['sign'] = sign_text
-                                        print(f"获取到个性签名: {sign_text}")
+                                        logger.debug("获取到个性签名: %s", sign_text)
                                         break
                                 except:
                                     pass
@@ -391,38 +662,36 @@ class BilibiliVideoCollectorSelenium:
                     
                     # 打印最终从页面获取的UP主信息
                     if page_up_info:
-                        print(f"从页面成功获取UP主信息: {page_up_info}")
+                        logger.debug("从页面成功获取UP主信息: %s", page_up_info)
                     else:
-                        print("未能从页面获取到UP主信息")
+                        logger.debug("未能从页面获取到UP主信息")
                         
                 except Exception as e:
-                    print(f"从页面获取UP主信息时发生错误: {str(e)}")
-                    import traceback
-                    traceback.print_exc()
+                    logger.debug("从页面获取UP主信息时发生错误: %s", e, exc_info=True)
                 
-                # 打印页面部分HTML用于调试
-                try:
-                    # 获取body的outerHTML的前5000个字符
-                    body_html = driver.find_element(By.TAG_NAME, 'body').get_attribute('outerHTML')[:5000]
-                    print("\n页面HTML结构预览（前5000字符）:")
-                    print(body_html)
-                    
-                    # 查找包含BV号的部分
-                    bv_matches = re.findall(r'BV[0-9A-Za-z]{10}', body_html)
-                    if bv_matches:
-                        print(f"\n在页面HTML中找到的BV号预览: {bv_matches[:5]}")
-                    else:
-                        print("\n在页面HTML预览中未找到BV号")
-                except Exception as e:
-                    print(f"打印HTML时出错: {str(e)}")
+                # 打印页面部分HTML用于调试（整段body的outerHTML开销较大，仅在调试级别下获取）
+                if logger.isEnabledFor(logging.DEBUG):
+                    try:
+                        # 获取body的outerHTML的前5000个字符
+                        body_html = driver.find_element(By.TAG_NAME, 'body').get_attribute('outerHTML')[:5000]
+                        logger.debug("页面HTML结构预览（前5000字符）:\n%s", body_html)
+                        
+                        # 查找包含BV号的部分
+                        bv_matches = re.findall(r'BV[0-9A-Za-z]{10}', body_html)
+                        if bv_matches:
+                            logger.debug("在页面HTML中找到的BV号预览: %s", bv_matches[:5])
+                        else:
+                            logger.debug("在页面HTML预览中未找到BV号")
+                    except Exception as e:
+                        logger.debug("打印HTML时出错: %s", e)
             except TimeoutException:
-                print("页面加载超时，但继续尝试获取视频")
+                logger.warning("页面加载超时，但继续尝试获取视频")
             
             # 增强滚动加载逻辑
-            print("开始滚动加载视频列表...")
+            self._profile_phase(uid, 'scroll')
+            logger.debug("开始滚动加载视频列表...")
             # 初始滚动高度
             driver.execute_script("window.scrollTo(0, 0);")
-            time.sleep(1)
             last_height = driver.execute_script("return document.body.scrollHeight")
             scroll_count = 0
             max_scrolls = 10  # 减少滚动次数，因为我们主要依赖选择器
@@ -441,8 +710,8 @@ class BilibiliVideoCollectorSelenium:
                 scroll_script = scroll_methods[method_index % len(scroll_methods)]
                 driver.execute_script(scroll_script)
                 
-                # 增加等待时间
-                time.sleep(4)  # 增加等待时间确保内容加载
+                # 等待滚动触发的懒加载请求和渲染完成
+                wait_for_settled(driver, timeout=SCROLL_SETTLE_TIMEOUT)
                 
                 # 计算新的滚动高度
                 new_height = driver.execute_script("return document.body.scrollHeight")
@@ -450,13 +719,13 @@ class BilibiliVideoCollectorSelenium:
                 # 如果滚动高度没有变化，增加计数
                 if new_height == last_height:
                     no_change_count += 1
-                    print(f"滚动高度未变化，计数: {no_change_count}")
+                    logger.debug("滚动高度未变化，计数: %s", no_change_count)
                 else:
                     no_change_count = 0
                     last_height = new_height
                 
                 scroll_count += 1
-                print(f"已滚动 {scroll_count} 次")
+                logger.debug("已滚动 %s 次", scroll_count)
                 
                 # 提取视频BV号 - 使用多种选择器确保找到视频
                 # 方法1: 使用多种CSS选择器组合定位UP主视频
@@ -485,45 +754,16 @@ class BilibiliVideoCollectorSelenium:
                     '.video-list-item'                                 # 视频列表项
                 ]
                 
-                # 尝试所有选择器，收集所有匹配的BV号
-                collected_bvids = set()
-                for selector in selectors:
-                    try:
-                        elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                        print(f"通过选择器 {selector} 找到 {len(elements)} 个元素")
-                        
-                        # 处理找到的元素
-                        for element in elements:
-                            # 尝试从href属性获取BV号
-                            href = element.get_attribute('href')
-                            if href:
-                                # 使用正则表达式提取BV号
-                                bv_match = re.search(r'(BV[0-9A-Za-z]{10})', href)
-                                if bv_match:
-                                    bv = bv_match.group(1)
-                                    collected_bvids.add(bv)
-                                    print(f"从href找到BV号: {bv}")
-                            
-                            # 尝试从innerHTML获取BV号
-                            try:
-                                inner_html = element.get_attribute('innerHTML')
-                                if inner_html:
-                                    bv_matches = re.findall(r'(BV[0-9A-Za-z]{10})', inner_html)
-                                    for bv in bv_matches:
-                                        collected_bvids.add(bv)
-                                        print(f"从innerHTML找到BV号: {bv}")
-                            except Exception:
-                                pass
-                    except Exception as e:
-                        print(f"应用选择器 {selector} 时出错: {str(e)}")
+                # 一次脚本调用应用所有选择器，收集新出现的视频卡片
+                self._extract_video_cards(driver, selectors, video_cards, on_video)
                 
                 # 更新主BV号列表
-                bvid_list = list(collected_bvids)
-                print(f"当前已收集到 {len(bvid_list)} 个唯一BV号")
+                bvid_list = list(video_cards)
+                logger.debug("当前已收集到 %s 个唯一BV号", len(bvid_list))
                 
                 # 如果已达到最大视频数量，提前结束
                 if max_videos and len(bvid_list) >= max_videos:
-                    print(f"已达到最大视频数量 {max_videos}，提前结束滚动")
+                    logger.debug("已达到最大视频数量 %s，提前结束滚动", max_videos)
                     break
             
             # 翻页处理 - 循环翻页获取更多视频
@@ -554,11 +794,12 @@ class BilibiliVideoCollectorSelenium:
                 '.pagination-item.pagination-next'    # 分页项-下一页
             ]
             
-            print("\n开始翻页处理...")
+            self._profile_phase(uid, 'paginate')
+            logger.debug("开始翻页处理...")
             
             while page_count < max_pages:
                 page_count += 1
-                print(f"\n[翻页 {page_count}/{max_pages}]")
+                logger.debug("[翻页 %s/%s]", page_count, max_pages)
                 next_button_found = False
                 
                 # 第一阶段：尝试使用CSS选择器直接找到下一页按钮
@@ -577,36 +818,36 @@ class BilibiliVideoCollectorSelenium:
                                 
                                 if any(keyword in button_text or keyword in button_aria_label.lower() or keyword in button_title.lower() 
                                        for keyword in ['下一页', 'next', '>' '→', '›']):
-                                    print(f"找到下一页按钮: {selector}")
+                                    logger.debug("找到下一页按钮: %s", selector)
                                     next_button_found = True
                                     
                                     # 尝试点击下一页按钮
+                                    before_click = list_signature(driver)
                                     try:
                                         # 尝试直接点击
-                                        print("尝试直接点击下一页按钮...")
+                                        logger.debug("尝试直接点击下一页按钮...")
                                         next_button.click()
-                                        # 等待页面加载
-                                        print("等待页面加载...")
-                                        time.sleep(5)
+                                        # 等待列表变化
+                                        logger.debug("等待页面加载...")
+                                        wait_for_list_change(driver, before_click, PAGE_CHANGE_TIMEOUT)
                                     except Exception as click_error:
-                                        print(f"直接点击失败: {str(click_error)}")
+                                        logger.debug("直接点击失败: %s", click_error)
                                         # 如果直接点击失败，尝试使用JavaScript点击
-                                        print("尝试使用JavaScript点击...")
+                                        logger.debug("尝试使用JavaScript点击...")
                                         driver.execute_script("arguments[0].click();", next_button)
-                                        # 等待页面加载
-                                        print("等待页面加载...")
-                                        time.sleep(5)
+                                        # 等待列表变化
+                                        logger.debug("等待页面加载...")
+                                        wait_for_list_change(driver, before_click, PAGE_CHANGE_TIMEOUT)
                                     
                                     # 检查URL是否变化
                                     if driver.current_url != current_page_url and driver.current_url not in page_history:
                                         current_page_url = driver.current_url
                                         page_history.add(current_page_url)
-                                        print(f"翻页成功，新页面URL: {current_page_url}")
+                                        logger.debug("翻页成功，新页面URL: %s", current_page_url)
                                         
                                         # 重新滚动加载新页面的视频
-                                        print("在新页面上滚动加载...")
+                                        logger.debug("在新页面上滚动加载...")
                                         driver.execute_script("window.scrollTo(0, 0);")
-                                        time.sleep(1)
                                         last_height = driver.execute_script("return document.body.scrollHeight")
                                         no_change_count = 0
                                         
@@ -614,7 +855,7 @@ class BilibiliVideoCollectorSelenium:
                                             # 随机选择滚动方式
                                             scroll_script = scroll_methods[random.randint(0, len(scroll_methods) - 1)]
                                             driver.execute_script(scroll_script)
-                                            time.sleep(3)
+                                            wait_for_settled(driver, timeout=SCROLL_SETTLE_TIMEOUT)
                                             
                                             new_height = driver.execute_script("return document.body.scrollHeight")
                                             if new_height == last_height:
@@ -627,41 +868,30 @@ class BilibiliVideoCollectorSelenium:
                                                 break
                                         
                                         # 重新提取视频BV号
-                                        print("在新页面上提取视频BV号...")
-                                        for selector in selectors:
-                                            try:
-                                                elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                                                for element in elements:
-                                                    href = element.get_attribute('href')
-                                                    if href:
-                                                        bv_match = re.search(r'(BV[0-9A-Za-z]{10})', href)
-                                                        if bv_match:
-                                                            bv = bv_match.group(1)
-                                                            collected_bvids.add(bv)
-                                            except Exception:
-                                                pass
+                                        logger.debug("在新页面上提取视频BV号...")
+                                        self._extract_video_cards(driver, selectors, video_cards, on_video)
                                         
                                         # 更新主BV号列表
-                                        bvid_list = list(collected_bvids)
-                                        print(f"翻页后共收集到 {len(bvid_list)} 个唯一BV号")
+                                        bvid_list = list(video_cards)
+                                        logger.debug("翻页后共收集到 %s 个唯一BV号", len(bvid_list))
                                         
                                         # 如果已达到最大视频数量，提前结束
                                         if max_videos and len(bvid_list) >= max_videos:
-                                            print(f"已达到最大视频数量 {max_videos}，提前结束翻页")
+                                            logger.debug("已达到最大视频数量 %s，提前结束翻页", max_videos)
                                             break
                                     else:
-                                        print("翻页失败，URL没有变化或已访问过该页面")
+                                        logger.debug("翻页失败，URL没有变化或已访问过该页面")
                                 
                                 break  # 找到有效按钮后退出循环
                         
                         if next_button_found:
                             break  # 找到按钮后退出选择器循环
                     except Exception as e:
-                        print(f"使用选择器 {selector} 时出错: {str(e)}")
+                        logger.debug("使用选择器 %s 时出错: %s", selector, e)
                 
                 # 如果第一阶段没有找到下一页按钮，尝试第二阶段：查找所有可见的链接和按钮
                 if not next_button_found:
-                    print("未通过CSS选择器找到下一页按钮，尝试查找所有可见链接和按钮...")
+                    logger.debug("未通过CSS选择器找到下一页按钮，尝试查找所有可见链接和按钮...")
                     try:
                         # 获取所有可见的a标签和button标签
                         all_links = driver.find_elements(By.CSS_SELECTOR, 'a, button')
@@ -705,7 +935,7 @@ class BilibiliVideoCollectorSelenium:
                                 if any(exclude_keyword.lower() in text or exclude_keyword.lower() in aria_label.lower() or 
                                        exclude_keyword.lower() in title.lower() or exclude_keyword.lower() in inner_html.lower()
                                        for exclude_keyword in exclude_keywords):
-                                    print(f"跳过可能的首页按钮，文本: '{text}'，href: {href}")
+                                    logger.debug("跳过可能的首页按钮，文本: '%s'，href: %s", text, href)
                                     continue
                                 
                                 # 更严格的下一页关键词检查，避免误识别
@@ -733,97 +963,87 @@ class BilibiliVideoCollectorSelenium:
                                             # 进一步检查是否包含页码参数
                                             has_page_param = any(p in href.lower() for p in ['?pn=', '&pn=', '?page=', '&page='])
                                             if not has_page_param:
-                                                print(f"跳过非UP主空间链接且不含页码参数: {href}")
+                                                logger.debug("跳过非UP主空间链接且不含页码参数: %s", href)
                                                 continue
                                         
                                         # 跳过已知的非翻页域名
                                         skip_domains = ['live.bilibili.com', 'anime.bilibili.com', 'mall.bilibili.com', 'game.bilibili.com']
                                         if any(domain in href for domain in skip_domains):
-                                            print(f"跳过已知的非翻页域名: {href}")
+                                            logger.debug("跳过已知的非翻页域名: %s", href)
                                             continue
                                         
-                                        print(f"找到可能的下一页按钮，文本: '{text}'，href: {href}")
+                                        logger.debug("找到可能的下一页按钮，文本: '%s'，href: %s", text, href)
                                         next_button_found = True
                                         
                                         # 保存当前URL以便验证
                                         pre_click_url = driver.current_url
                                         
                                         # 尝试点击
+                                        before_click = list_signature(driver)
                                         try:
                                             element.click()
-                                            time.sleep(5)
                                         except Exception:
                                             driver.execute_script("arguments[0].click();", element)
-                                            time.sleep(5)
+                                        wait_for_list_change(driver, before_click, PAGE_CHANGE_TIMEOUT)
                                         
                                         # 立即检查是否仍然在UP主空间页面
                                         if 'space.bilibili.com' not in driver.current_url:
-                                            print(f"警告：点击后跳转到非UP主空间页面: {driver.current_url}，跳过此按钮")
+                                            logger.debug("点击后跳转到非UP主空间页面: %s，跳过此按钮", driver.current_url)
                                             # 如果有跳转，尝试返回上一页
                                             if driver.current_url != pre_click_url:
                                                 try:
                                                     driver.back()
-                                                    time.sleep(3)
+                                                    wait_for_settled(driver)
                                                 except:
                                                     pass
                                             next_button_found = False
                                             continue
                                         
                                         # 记录翻页前的视频数量
-                                        pre_pagination_count = len(collected_bvids)
+                                        pre_pagination_count = len(video_cards)
                                         
                                         # 检查URL变化
                                         url_changed = driver.current_url != current_page_url and driver.current_url not in page_history
                                         
                                         # 重新滚动和提取（与前面相同的逻辑）
-                                        print(f"翻页后重新滚动页面，URL变化: {url_changed}")
+                                        logger.debug("翻页后重新滚动页面，URL变化: %s", url_changed)
                                         driver.execute_script("window.scrollTo(0, 0);")
-                                        time.sleep(2)  # 增加等待时间
                                         
                                         # 尝试强制刷新页面内容
                                         driver.execute_script("window.scrollBy(0, document.body.scrollHeight);")
-                                        time.sleep(3)
+                                        wait_for_settled(driver, timeout=SCROLL_SETTLE_TIMEOUT)
                                         
                                         for scroll_step in range(5):
                                             scroll_script = scroll_methods[random.randint(0, len(scroll_methods) - 1)]
                                             driver.execute_script(scroll_script)
-                                            time.sleep(3)
+                                            # 滚动后没有新的请求和渲染，说明已到底
+                                            if wait_for_settled(driver, timeout=SCROLL_SETTLE_TIMEOUT) and \
+                                                    driver.execute_script("return window.innerHeight + window.scrollY >= document.body.scrollHeight - 2;"):
+                                                break
                                         
                                         # 使用更多的选择器尝试提取视频
-                                        print("使用增强选择器提取视频...")
+                                        logger.debug("使用增强选择器提取视频...")
                                         enhanced_selectors = selectors + [
                                             '.video-item a', '.list-item a', '.content a',
                                             '.video-card a', '.article-item a', 'a.cover'
                                         ]
                                         
-                                        for selector in enhanced_selectors:
-                                            try:
-                                                elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                                                print(f"选择器 {selector} 找到 {len(elements)} 个元素")
-                                                for element in elements:
-                                                    href = element.get_attribute('href')
-                                                    if href:
-                                                        bv_match = re.search(r'(BV[0-9A-Za-z]{10})', href)
-                                                        if bv_match:
-                                                            bv = bv_match.group(1)
-                                                            collected_bvids.add(bv)
-                                            except Exception as e:
-                                                print(f"选择器 {selector} 出错: {str(e)}")
+                                        self._extract_video_cards(driver, enhanced_selectors, video_cards, on_video)
                                         
-                                        bvid_list = list(collected_bvids)
+                                        bvid_list = list(video_cards)
                                         new_video_count = len(bvid_list) - pre_pagination_count
-                                        print(f"翻页后共收集到 {len(bvid_list)} 个唯一BV号，新增 {new_video_count} 个视频")
+                                        logger.debug("翻页后共收集到 %s 个唯一BV号，新增 %s 个视频", len(bvid_list), new_video_count)
                                         
                                         # 更新URL历史，无论URL是否变化
                                         if url_changed:
                                             current_page_url = driver.current_url
                                             page_history.add(current_page_url)
-                                            print(f"翻页成功，新页面URL: {current_page_url}")
+                                            logger.debug("翻页成功，新页面URL: %s", current_page_url)
                                         elif new_video_count > 0:
-                                            print("翻页成功（通过AJAX加载，URL未变化）")
+                                            logger.debug("翻页成功（通过AJAX加载，URL未变化）")
                                             
                                             if max_videos and len(bvid_list) >= max_videos:
-                                                print(f"已达到最大视频数量 {max_videos}，提前结束翻页")
+                                                logger.debug("已达到最大视频数量 %s，提前结束翻页", max_videos)
                                                 break
                                 
                                 if next_button_found:
@@ -831,12 +1051,12 @@ class BilibiliVideoCollectorSelenium:
                             except Exception:
                                 pass
                     except Exception as e:
-                        print(f"查找所有链接和按钮时出错: {str(e)}")
+                        logger.debug("查找所有链接和按钮时出错: %s", e)
                 
                 # 专注于查找和点击下一页按钮，不再使用URL参数翻页
                 # 如果没有找到下一页按钮，尝试更精确的选择器和AJAX加载检测
                 if not next_button_found:
-                    print("未找到下一页按钮，尝试更精确的选择器查找...")
+                    logger.debug("未找到下一页按钮，尝试更精确的选择器查找...")
                     
                     # 尝试使用更精确的下一页按钮选择器
                     next_page_selectors = [
@@ -868,12 +1088,12 @@ class BilibiliVideoCollectorSelenium:
                                 tag_name = element.tag_name.lower()
                                 if tag_name in ['a', 'button', 'div', 'span']:
                                     found_button = element
-                                    print(f"直接通过文本找到下一页按钮，标签: {tag_name}，文本: '{element.text.strip()}'")
+                                    logger.debug("直接通过文本找到下一页按钮，标签: %s，文本: '%s'", tag_name, element.text.strip())
                                     break
                         if found_button:
-                            print("通过文本查找成功找到下一页按钮")
+                            logger.debug("通过文本查找成功找到下一页按钮")
                     except Exception as e:
-                        print(f"通过文本查找下一页按钮出错: {str(e)}")
+                        logger.debug("通过文本查找下一页按钮出错: %s", e)
                     for selector in next_page_selectors:
                         try:
                             elements = driver.find_elements(By.CSS_SELECTOR, selector)
@@ -892,95 +1112,63 @@ class BilibiliVideoCollectorSelenium:
                                         '下一页' in title or 'next' in title.lower() or
                                         '>>' in text or '›' in text or '>' in text):
                                         found_button = element
-                                        print(f"找到潜在下一页按钮，选择器: {selector}，文本: '{text}'")
+                                        logger.debug("找到潜在下一页按钮，选择器: %s，文本: '%s'", selector, text)
                                         break
                         except Exception as e:
-                            print(f"尝试选择器 {selector} 出错: {str(e)}")
+                            logger.debug("尝试选择器 %s 出错: %s", selector, e)
                         if found_button:
                             break
                     
                     if found_button:
                         try:
-                            print(f"尝试点击找到的下一页按钮...")
+                            logger.debug("尝试点击找到的下一页按钮...")
+                            before_click = list_signature(driver)
                             # 先滚动到按钮位置
-                            driver.execute_script("arguments[0].scrollIntoView({block: 'center', behavior: 'smooth'});", found_button)
-                            time.sleep(2)
+                            driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", found_button)
                             
                             # 尝试点击
                             found_button.click()
                             next_button_found = True
-                            print("点击成功，等待页面加载...")
-                            time.sleep(5)
+                            logger.debug("点击成功，等待页面加载...")
+                            wait_for_list_change(driver, before_click, PAGE_CHANGE_TIMEOUT)
                             
                             # 滚动加载更多内容并提取BV号
-                            print("翻页后滚动加载更多内容并提取BV号...")
-                            # 等待页面内容加载完成
-                            time.sleep(3)
+                            logger.debug("翻页后滚动加载更多内容并提取BV号...")
                             # 使用增强选择器提取当前页面的BV号
-                            print(f"正在提取第 {page_count} 页的BV号...")
+                            logger.debug("正在提取第 %s 页的BV号...", page_count)
                             page_collected = 0
                             # 第一次滚动到底部
                             driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                            time.sleep(3)
+                            wait_for_settled(driver, timeout=SCROLL_SETTLE_TIMEOUT)
                             
                             # 使用增强选择器提取
-                            for selector in ['a[href*="/video/"]', 'a[href*="BV"]', '.video-card a', '.video-item a']:
-                                try:
-                                    elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                                    for element in elements:
-                                        try:
-                                            href = element.get_attribute('href')
-                                            if href:
-                                                bv_match = re.search(r'(BV[0-9A-Za-z]{10})', href)
-                                                if bv_match:
-                                                    bv = bv_match.group(1)
-                                                    if bv not in collected_bvids:
-                                                        collected_bvids.add(bv)
-                                                        page_collected += 1
-                                        except Exception:
-                                            pass
-                                except Exception:
-                                    pass
+                            page_collected += self._extract_video_cards(
+                                driver, ['a[href*="/video/"]', 'a[href*="BV"]', '.video-card a', '.video-item a'], video_cards, on_video)
                             
                             # 额外的滚动加载
                             for i in range(4):  # 总共5次滚动，第一次已经完成
                                 driver.execute_script("window.scrollBy(0, document.body.scrollHeight * 0.8);")
-                                time.sleep(3)
+                                wait_for_settled(driver, timeout=SCROLL_SETTLE_TIMEOUT)
                                 # 每次滚动后再次提取
-                                for selector in ['a[href*="/video/"]', 'a[href*="BV"]']:
-                                    try:
-                                        elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                                        for element in elements:
-                                            try:
-                                                href = element.get_attribute('href')
-                                                if href:
-                                                    bv_match = re.search(r'(BV[0-9A-Za-z]{10})', href)
-                                                    if bv_match:
-                                                        bv = bv_match.group(1)
-                                                        if bv not in collected_bvids:
-                                                            collected_bvids.add(bv)
-                                                            page_collected += 1
-                                            except Exception:
-                                                pass
-                                    except Exception:
-                                        pass
+                                page_collected += self._extract_video_cards(
+                                    driver, ['a[href*="/video/"]', 'a[href*="BV"]'], video_cards, on_video)
                             
-                            print(f"第 {page_count} 页提取完成，新增 {page_collected} 个BV号")
+                            logger.debug("第 %s 页提取完成，新增 %s 个BV号", page_count, page_collected)
                         except Exception as e:
-                            print(f"点击下一页按钮失败: {str(e)}")
+                            logger.debug("点击下一页按钮失败: %s", e)
                             # 尝试JavaScript点击
                             try:
-                                print("尝试使用JavaScript点击...")
+                                logger.debug("尝试使用JavaScript点击...")
                                 driver.execute_script("arguments[0].click();", found_button)
                                 next_button_found = True
-                                print("JavaScript点击成功，等待页面加载...")
-                                time.sleep(5)
+                                logger.debug("JavaScript点击成功，等待页面加载...")
+                                wait_for_list_change(driver, before_click, PAGE_CHANGE_TIMEOUT)
                             except Exception as js_error:
-                                print(f"JavaScript点击也失败: {str(js_error)}")
+                                logger.debug("JavaScript点击也失败: %s", js_error)
                     else:
-                        print("未找到下一页按钮，尝试检测是否有AJAX无限滚动加载...")
+                        logger.debug("未找到下一页按钮，尝试检测是否有AJAX无限滚动加载...")
                         # 记录翻页前的视频数量
-                        pre_pagination_count = len(collected_bvids)
+                        pre_pagination_count = len(video_cards)
                         # 尝试检测AJAX加载
                         last_height = driver.execute_script("return document.body.scrollHeight")
                         no_new_content_count = 0
@@ -988,69 +1176,59 @@ class BilibiliVideoCollectorSelenium:
                         
                         for i in range(max_scrolls):
                             # 记录当前视频数量
-                            current_count = len(collected_bvids)
+                            current_count = len(video_cards)
                             
                             # 滚动到底部
                             driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                            time.sleep(3)
+                            wait_for_settled(driver, timeout=SCROLL_SETTLE_TIMEOUT)
                             
                             # 检查是否有新内容加载
                             new_height = driver.execute_script("return document.body.scrollHeight")
                             
                             # 重新提取视频
-                            for selector in selectors + [
+                            self._extract_video_cards(driver, selectors + [
                                 'a[href*="/video/"]', 'a[href*="BV"]',
                                 '.video-item a', '.list-item a'
-                            ]:
-                                try:
-                                    elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                                    for element in elements:
-                                        href = element.get_attribute('href')
-                                        if href:
-                                            bv_match = re.search(r'(BV[0-9A-Za-z]{10})', href)
-                                            if bv_match:
-                                                bv = bv_match.group(1)
-                                                collected_bvids.add(bv)
-                                except Exception:
-                                    pass
+                            ], video_cards, on_video)
                             
                             # 检查是否有新视频加载
-                            new_count = len(collected_bvids)
+                            new_count = len(video_cards)
                             if new_count > current_count:
-                                print(f"AJAX滚动加载发现新视频，新增 {new_count - current_count} 个视频")
+                                logger.debug("AJAX滚动加载发现新视频，新增 %s 个视频", new_count - current_count)
                                 no_new_content_count = 0
                             else:
                                 no_new_content_count += 1
-                                print(f"滚动 {i+1}/{max_scrolls}，未发现新内容")
+                                logger.debug("滚动 %s/%s，未发现新内容", i + 1, max_scrolls)
                             
                             # 如果高度不再变化且没有新内容，认为已加载完
                             if new_height == last_height and no_new_content_count >= 3:
-                                print("已到达内容末尾，无更多视频加载")
+                                logger.debug("已到达内容末尾，无更多视频加载")
                                 break
                             
                             last_height = new_height
                         
                         # 检查是否通过AJAX加载了新内容
-                        if len(collected_bvids) > pre_pagination_count:
-                            print(f"AJAX滚动加载成功，共新增 {len(collected_bvids) - pre_pagination_count} 个视频")
+                        if len(video_cards) > pre_pagination_count:
+                            logger.debug("AJAX滚动加载成功，共新增 %s 个视频", len(video_cards) - pre_pagination_count)
                             next_button_found = True  # 视为翻页成功
                         else:
-                            print("AJAX滚动加载也未发现新内容")
+                            logger.debug("AJAX滚动加载也未发现新内容")
                 
                 # 如果仍然没有找到下一页按钮或AJAX加载失败，结束翻页循环
                 if not next_button_found:
-                    print("无法找到下一页按钮且AJAX加载失败，结束翻页")
+                    logger.debug("无法找到下一页按钮且AJAX加载失败，结束翻页")
                     break
                 
                 # 如果已达到最大视频数量，结束翻页循环
                 if max_videos and len(bvid_list) >= max_videos:
                     break
             
-            print(f"\n翻页结束，共翻页 {page_count} 次")
-            print(f"从所有页面共收集到 {len(bvid_list)} 个视频的BV号")
+            logger.info("翻页结束，共翻页 %s 次", page_count)
+            logger.info("从所有页面共收集到 %s 个视频的BV号", len(bvid_list))
             
             # 第二次尝试：使用更多的选择器重新提取
-            print("开始第二次尝试 18 种选择器提取视频元素")
+            self._profile_phase(uid, 'extract')
+            logger.debug("开始第二次尝试 18 种选择器提取视频元素")
             enhanced_selectors = [
                 'a[href*="/video/"]',
                 '.video-card a',
@@ -1072,59 +1250,177 @@ class BilibiliVideoCollectorSelenium:
                 'div.video-list-item a'
             ]
             
-            # 尝试所有增强选择器
-            for selector in enhanced_selectors:
-                try:
-                    elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                    print(f"第二次尝试: 通过选择器 {selector} 找到 {len(elements)} 个元素")
-                    
-                    for element in elements:
-                        try:
-                            href = element.get_attribute('href')
-                            if href:
-                                bv_match = re.search(r'(BV[0-9A-Za-z]{10})', href)
-                                if bv_match:
-                                    bv = bv_match.group(1)
-                                    collected_bvids.add(bv)
-                        except Exception:
-                            pass
-                except Exception:
-                    pass
-                
-                # 更新BV号列表并检查是否已找到足够的元素
-                bvid_list = list(collected_bvids)
-                print(f"当前累计找到 {len(bvid_list)} 个唯一元素")
-                
-                # 如果已找到足够数量的元素，可以提前退出
-                if len(bvid_list) >= 50:  # 设置一个阈值，避免过多尝试
-                    print("已找到足够数量的元素，提前退出第二次选择器尝试")
-                    break
+            # 所有增强选择器在一次脚本调用中完成
+            added = self._extract_video_cards(driver, enhanced_selectors, video_cards, on_video)
+            logger.debug("第二次尝试新增 %s 个视频", added)
             
             # 最终处理BV号列表
-            bvid_list = list(collected_bvids)
+            bvid_list = list(video_cards)
             
             # 如果有最大数量限制，进行裁剪
             if max_videos and len(bvid_list) > max_videos:
                 bvid_list = bvid_list[:max_videos]
-                print(f"已限制最大视频数量为 {max_videos}")
+                logger.debug("已限制最大视频数量为 %s", max_videos)
             
-            print(f"\n总共找到 {len(bvid_list)} 个视频的BV号")
+            logger.info("总共找到 %s 个视频的BV号", len(bvid_list))
             
         except Exception as e:
-            print(f"使用Selenium获取视频列表时发生异常: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.error("使用Selenium获取视频列表时发生异常: %s", e, exc_info=True)
         finally:
-            # 无论如何都要关闭浏览器
-            if driver:
-                print("关闭浏览器...")
-                try:
-                    driver.quit()
-                except Exception as quit_error:
-                    print(f"关闭浏览器时出错: {str(quit_error)}")
+            self._profile_phase(uid, None)
+            # 无论如何都要关闭（或归还）浏览器
+            self._close_browser(driver, lease)
         
+        if return_details:
+            return [video_cards[bvid] for bvid in bvid_list], page_up_info
         return bvid_list, page_up_info
     
+    def _wait_for_page(self, capture, pn):
+        """等待页面发出的第pn页投稿列表请求完成，返回该页接口数据（data字段），超时或出错返回None"""
+        def is_page(url, data):
+            return any(p in url for p in ARC_SEARCH_PATTERNS) and _page_number(url) == pn
+        
+        result = capture.wait_for(is_page, timeout=NETWORK_CAPTURE_TIMEOUT)
+        if result is None:
+            return None
+        url, data = result
+        if data.get('code') != 0 or not data.get('data'):
+            logger.warning("第 %s 页列表接口返回错误: %s (code: %s)", pn, data.get('message'), data.get('code'))
+            return None
+        return data['data']
+    
+    def get_videos_by_network(self, uid, max_videos=None, headless=True, on_video=None):
+        """通过Chrome DevTools网络捕获获取UP主视频列表
+        
+        不解析页面DOM，而是读取空间页自身发出的 x/space/wbi/arc/search 请求的JSON响应，
+        页数由首个响应的 page.count / page.ps 决定，翻页通过点击页面分页器（失败时改为访问 ?pn=N）触发页面自己的请求。
+        
+        Args:
+            uid: UP主UID
+            max_videos: 最大获取视频数量，None表示获取全部
+            headless: 是否使用无头模式
+            on_video: 每捕获一个新视频时立即调用的函数 on_video(视频信息字典)，用于边收集边下载
+            
+        Returns:
+            tuple: (视频信息字典列表, 从接口获取的UP主信息)
+        """
+        videos = []
+        page_up_info = {}
+        
+        logger.info("开始通过网络捕获获取UP主 %s 的视频列表...", uid)
+        
+        if not isinstance(uid, (int, str)) or (isinstance(uid, str) and not uid.isdigit()):
+            logger.error("无效的UID格式 - %s", uid)
+            return videos, page_up_info
+        
+        uid = str(uid)
+        driver = lease = None
+        
+        try:
+            driver, lease = self._open_browser(uid, headless, capture_network=True)
+            if driver is None:
+                return videos, page_up_info
+            
+            capture = NetworkCapture(driver, ARC_SEARCH_PATTERNS + ACC_INFO_PATTERNS)
+            space_url = f"https://space.bilibili.com/{uid}/video"
+            self._profile_phase(uid, 'page_load')
+            logger.info("正在访问: %s", space_url)
+            self._navigate(driver, space_url)
+            self._handle_login(driver, space_url, headless)
+            
+            page_data = self._wait_for_page(capture, 1)
+            if page_data is None:
+                logger.warning("未捕获到视频列表接口的响应")
+                return videos, page_up_info
+            
+            # UP主信息接口通常与列表接口同时发出
+            for pattern in ACC_INFO_PATTERNS:
+                for _, data in capture.take(pattern):
+                    if data.get('code') == 0 and data.get('data'):
+                        page_up_info = {'name': data['data'].get('name', ''), 'sign': data['data'].get('sign', '')}
+            
+            page = page_data.get('page', {})
+            count = page.get('count', 0)
+            page_size = page.get('ps') or 1
+            wanted = min(count, max_videos) if max_videos else count
+            total_pages = max(1, (wanted + page_size - 1) // page_size)
+            logger.info("投稿总数 %s，需要获取 %s 页", count, total_pages)
+            
+            self._profile_phase(uid, 'paginate')
+            seen = set()
+            pn = 1
+            while True:
+                for video in (page_data.get('list') or {}).get('vlist') or []:
+                    bvid = video.get('bvid')
+                    if bvid and bvid not in seen:
+                        seen.add(bvid)
+                        videos.append(video_info_from_api(video))
+                        if on_video is not None:
+                            on_video(videos[-1])
+                logger.debug("已捕获第 %s/%s 页，累计 %s 个视频", pn, total_pages, len(videos))
+                
+                if pn >= total_pages or (max_videos and len(videos) >= max_videos):
+                    break
+                
+                pn += 1
+                # 优先点击分页器，由页面自己发出（并签名）下一页请求
+                page_data = None
+                if driver.execute_script(CLICK_NEXT_PAGE_JS):
+                    page_data = self._wait_for_page(capture, pn)
+                if page_data is None:
+                    logger.debug("点击分页器未捕获到第 %s 页，改为直接访问页面", pn)
+                    self._navigate(driver, f"{space_url}?pn={pn}")
+                    page_data = self._wait_for_page(capture, pn)
+                if page_data is None:
+                    logger.warning("未捕获到第 %s 页的列表响应，返回已获取的部分", pn)
+                    break
+            
+            if max_videos:
+                videos = videos[:max_videos]
+            logger.info("总共捕获到 %s 个视频", len(videos))
+            
+        except Exception as e:
+            logger.error("通过网络捕获获取视频列表时发生异常: %s", e, exc_info=True)
+        finally:
+            self._profile_phase(uid, None)
+            self._close_browser(driver, lease)
+        
+        return videos, page_up_info
+
+    def get_session_credentials(self, uid, headless=True, space_url=None):
+        """打开一次UP主空间页，读取浏览器得到的Cookie（含buvid3/b_nut等设备指纹）和页面缓存的WBI密钥
+
+        Args:
+            uid: UP主UID
+            headless: 是否使用无头模式
+            space_url: 空间页面地址，None表示使用B站的空间页
+
+        Returns:
+            dict: {'cookies': Cookie字典, 'wbi_text': localStorage中的wbi_img_urls}，浏览器不可用时返回None
+        """
+        uid = str(uid)
+        space_url = space_url or f"https://space.bilibili.com/{uid}/video"
+        driver = lease = None
+        try:
+            driver, lease = self._open_browser(uid, headless)
+            if driver is None:
+                return None
+
+            logger.info("通过浏览器获取Cookie和WBI密钥: %s", space_url)
+            self._navigate(driver, space_url)
+            self._handle_login(driver, space_url, headless)
+            wait_for_settled(driver)
+
+            cookies = {cookie['name']: cookie['value'] for cookie in driver.get_cookies()}
+            wbi_text = driver.execute_script("return window.localStorage.getItem('wbi_img_urls') || '';")
+            logger.debug("浏览器获取到 %s 项Cookie", len(cookies))
+            return {'cookies': cookies, 'wbi_text': wbi_text}
+        except Exception as e:
+            logger.error("通过浏览器获取Cookie失败: %s", e)
+            return None
+        finally:
+            self._close_browser(driver, lease)
+
     def get_up_info(self, uid):
         """获取UP主信息
         
@@ -1144,9 +1440,12 @@ class BilibiliVideoCollectorSelenium:
         }
         
         try:
-            print(f"正在获取UP主 {uid} 的信息...")
-            response = requests.get(
+            logger.debug("正在获取UP主 %s 的信息...", uid)
+            response = self.retrier.request(
+                'GET',
                 api_url,
+                check=api_code_retryable,
+                pacer=self.pacer,
                 params={'mid': uid},
                 headers=headers,
                 cookies=self.cookies,
@@ -1170,10 +1469,10 @@ class BilibiliVideoCollectorSelenium:
                         'likes': data['data'].get('likes', 0)
                     }
         except Exception as e:
-            print(f"通过API获取UP主信息失败: {str(e)}")
+            logger.warning("通过API获取UP主信息失败: %s", e)
         
         # 如果API获取失败，返回基本信息
-        print("获取UP主信息失败，返回基本信息")
+        logger.warning("获取UP主信息失败，返回基本信息")
         return {
             'uid': uid,
             'name': f'未知用户{uid}',
@@ -1181,17 +1480,8 @@ class BilibiliVideoCollectorSelenium:
             'archive_count': 0
         }
     
-    def save_to_json(self, up_info, videos, output_dir='./downloads'):
-        """保存UP主信息和视频列表到JSON文件
-        
-        Args:
-            up_info: UP主信息字典
-            videos: 视频BV号列表
-            output_dir: 输出目录
-        """
-        # 确保下载目录存在
-        os.makedirs(output_dir, exist_ok=True)
-        
+    def up_dir(self, up_info, output_dir='./downloads'):
+        """返回（并创建）UP主的输出子目录，以UP主名字命名"""
         # 使用UP主名字作为子文件夹名称，处理可能的特殊字符
         up_name = up_info.get('name', f'未知用户{up_info.get("uid")}')
         # 移除或替换可能导致文件系统问题的字符
@@ -1200,6 +1490,42 @@ class BilibiliVideoCollectorSelenium:
         # 创建UP主子文件夹
         up_dir = os.path.join(output_dir, safe_up_name)
         os.makedirs(up_dir, exist_ok=True)
+        return up_dir
+    
+    def create_pipeline(self, up_dir, uid, auto_download=False, max_videos=None, download_workers=2):
+        """创建收集-下载流水线：发现的视频逐行追加到 videos_<UID>.jsonl，需要下载时同时启动下载线程
+        
+        Args:
+            up_dir: UP主输出目录
+            uid: UP主UID
+            auto_download: 是否边收集边下载
+            max_videos: 最多处理的视频数量
+            download_workers: 下载线程数
+            
+        Returns:
+            CollectDownloadPipeline实例
+        """
+        factory = None
+        if auto_download:
+            def factory():
+                return BilibiliDownloader(cookie_path=self.cookie_path, proxy=self.proxy, metrics=self.metrics,
+                                          profiler=self.profiler, retrier=self.retrier, pacer=self.pacer,
+                                          catalog=self.catalog)
+        return CollectDownloadPipeline(factory, up_dir, os.path.join(up_dir, f'videos_{uid}.jsonl'),
+                                       workers=download_workers, max_videos=max_videos, catalog=self.catalog)
+    
+    def save_to_json(self, up_info, videos, output_dir='./downloads', video_details=None, up_dir=None):
+        """保存UP主信息和视频列表到JSON文件
+        
+        Args:
+            up_info: UP主信息字典
+            videos: 视频BV号列表
+            output_dir: 输出目录
+            video_details: 视频信息字典列表（网络捕获模式下获得），None表示不保存
+            up_dir: UP主目录，None表示按up_info中的名字确定；与流水线一起使用时应传入流水线的目录，
+                    使JSON、JSONL和下载的视频位于同一目录
+        """
+        up_dir = up_dir or self.up_dir(up_info, output_dir)
         
         # 构建JSON数据
         json_data = {
@@ -1208,85 +1534,92 @@ class BilibiliVideoCollectorSelenium:
             'collect_time': time.strftime('%Y-%m-%d %H:%M:%S'),
             'total_videos': len(videos)
         }
+        if video_details is not None:
+            json_data['video_details'] = video_details
         
         # 保存到JSON文件
         json_file_path = os.path.join(up_dir, f'videos_{up_info.get("uid")}.json')
         try:
             with open(json_file_path, 'w', encoding='utf-8') as f:
                 json.dump(json_data, f, ensure_ascii=False, indent=2)
-            print(f"\n已成功保存数据到: {json_file_path}")
-            print(f"共收集到 {len(videos)} 个视频的BV号")
+            logger.info("已成功保存数据到: %s", json_file_path)
+            logger.info("共收集到 %s 个视频的BV号", len(videos))
             return json_file_path
         except Exception as e:
-            print(f"保存JSON文件失败: {str(e)}")
+            logger.error("保存JSON文件失败: %s", e)
             return None
     
-    def collect_videos_by_selenium(self, uid, max_videos=None, headless=True, auto_download=False):
+    def collect_videos_by_selenium(self, uid, max_videos=None, headless=True, auto_download=False, capture='dom',
+                                   download_workers=2, output_dir='./downloads'):
         """使用Selenium收集UP主视频的主方法
         
+        发现的视频立即追加到UP主目录下的 videos_<UID>.jsonl；启用自动下载时，第一个视频被发现后下载线程
+        就开始工作，收集和下载同时进行。
+        
         Args:
             uid: UP主UID
             max_videos: 最大获取视频数量
             headless: 是否使用无头模式
-            auto_download: 是否在收集后自动下载每个视频
+            auto_download: 是否边收集边自动下载每个视频
+            capture: 获取视频列表的方式，'dom' 解析页面元素，'network' 捕获页面的列表接口响应（含完整元数据）
+            download_workers: 自动下载时的下载线程数
+            output_dir: 输出目录，JSON、JSONL和下载的视频保存在其中的UP主子目录
             
         Returns:
             BV号列表
         """
         # 在使用Selenium前先进行网络测试
-        print("正在测试网络连接...")
+        logger.debug("正在测试网络连接...")
         try:
             import socket
             socket.create_connection(('space.bilibili.com', 80), timeout=10)
-            print("网络连接测试成功")
+            logger.debug("网络连接测试成功")
         except Exception as e:
-            print(f"网络连接测试失败: {str(e)}")
-            print("无法连接到B站服务器，请检查网络连接或防火墙设置")
+            logger.warning("网络连接测试失败: %s", e)
+            logger.warning("无法连接到B站服务器，请检查网络连接或防火墙设置")
         
         # 先通过API获取UP主信息
+        self._profile_phase(uid, 'up_info')
         up_info = self.get_up_info(uid)
+        self._profile_phase(uid, None)
         
-        # 获取视频列表，同时可能从页面获取UP主名字
-        bvid_list, page_up_info = self.get_videos_by_selenium(uid, max_videos, headless)
+        # 收集和下载组成流水线，每发现一个视频就写入JSONL并交给下载线程；
+        # 目录在收集开始前确定，之后即使从页面更新了UP主名字，JSON也保存在同一目录
+        up_dir = self.up_dir(up_info, output_dir)
+        pipeline = self.create_pipeline(up_dir, uid, auto_download, max_videos, download_workers)
+        pipeline.start()
+        try:
+            if capture == 'network':
+                video_details, page_up_info = self.get_videos_by_network(uid, max_videos, headless,
+                                                                         on_video=pipeline.submit)
+            else:
+                video_details, page_up_info = self.get_videos_by_selenium(uid, max_videos, headless,
+                                                                          return_details=True,
+                                                                          on_video=pipeline.submit)
+        finally:
+            if auto_download and pipeline.stats['discovered']:
+                logger.info("视频列表收集完成，等待剩余的下载任务...")
+            stats = pipeline.finish()
+        bvid_list = [video['bvid'] for video in video_details]
         
         # 如果API获取失败但从页面获取到了名字，更新UP主信息
         if up_info.get('name', '').startswith('未知用户') and page_up_info:
-            print(f"从页面更新UP主信息: {page_up_info.get('name')}")
+            logger.info("从页面更新UP主信息: %s", page_up_info.get('name'))
             up_info.update(page_up_info)
         
-        print(f"UP主: {up_info.get('name', '未知')}")
-        print(f"简介: {up_info.get('sign', '无简介')}")
+        logger.info("UP主: %s", up_info.get('name', '未知'))
+        logger.info("简介: %s", up_info.get('sign', '无简介'))
         
-        # 保存到JSON文件而不是打印
-        json_file_path = None
+        # 汇总保存到JSON文件
         if bvid_list:
-            json_file_path = self.save_to_json(up_info, bvid_list)
+            self.save_to_json(up_info, bvid_list, output_dir, video_details=video_details, up_dir=up_dir)
+            if self.catalog is not None:
+                self.catalog.record_collection(uid, up_info, video_details)
         else:
-            print("未获取到任何视频的BV号")
+            logger.warning("未获取到任何视频的BV号")
         
-        # 如果启用了自动下载
-        if auto_download and bvid_list and json_file_path:
-            print(f"\n开始自动下载视频，共 {len(bvid_list)} 个视频...")
-            # 初始化下载器，使用相同的cookie和代理
-            downloader = BilibiliDownloader(cookie_path=self.cookie_path, proxy=self.proxy)
-            
-            # 获取保存的文件夹路径（从json文件路径中提取）
-            output_dir = os.path.dirname(json_file_path)
-            
-            # 遍历所有视频进行下载
-            for index, bvid in enumerate(bvid_list, 1):
-                print(f"\n=== 下载视频 {index}/{len(bvid_list)}: BV{bvid} ===")
-                try:
-                    downloader.download_video(bvid, output_dir=output_dir)
-                except Exception as e:
-                    print(f"下载失败: {str(e)}")
-                    print(f"继续下载下一个视频...")
-                
-                # 添加下载间隔，避免请求过于频繁
-                if index < len(bvid_list):
-                    print("休息5秒后继续下载...")
-                    time.sleep(5)
-            
-            print("\n所有视频下载完成！")
+        if auto_download:
+            logger.info("下载完成: 成功 %s，失败 %s，跳过 %s，首个下载在开始后 %s 秒启动", stats['downloaded'],
+                        stats['failed'], stats['skipped'], stats['first_download_start'])
         
-        return bvid_list
\ No newline at end of file
+        return bvid_list
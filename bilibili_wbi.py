@@ -0,0 +1,56 @@
+import re
+import time
+import hashlib
+from urllib.parse import urlencode
+
+# WBI签名的混淆表：按此顺序从 img_key + sub_key 中取字符，前32位即为mixin_key
+MIXIN_KEY_ENC_TAB = [
+    46, 47, 18, 2, 53, 8, 23, 32, 15, 50, 10, 31, 58, 3, 45, 35, 27, 43, 5, 49,
+    33, 9, 42, 19, 29, 28, 14, 39, 12, 38, 41, 13, 37, 48, 7, 16, 24, 55, 40,
+    61, 26, 17, 0, 1, 60, 51, 30, 4, 22, 25, 54, 21, 56, 59, 6, 63, 57, 62, 11,
+    36, 20, 34, 44, 52
+]
+
+# 签名前需要从参数值中去掉的字符
+_FILTERED_CHARS = re.compile(r"[!'()*]")
+
+# 从 wbi_img 地址中提取key，如 https://i0.hdslb.com/bfs/wbi/7cd084941338484aae1ad9425b84077c.png
+_KEY_PATTERN = re.compile(r'/wbi/(\w+)\.')
+
+
+def key_from_url(url):
+    """从 img_url / sub_url 中提取key（文件名去掉扩展名）"""
+    return url.rsplit('/', 1)[-1].split('.')[0]
+
+
+def keys_from_text(text):
+    """从包含两个wbi图片地址的文本（如页面localStorage中的 wbi_img_urls）中提取 (img_key, sub_key)，失败返回None"""
+    keys = _KEY_PATTERN.findall(text or '')
+    if len(keys) < 2:
+        return None
+    return keys[0], keys[1]
+
+
+def get_mixin_key(img_key, sub_key):
+    """根据 img_key 和 sub_key 计算签名用的mixin_key"""
+    origin = img_key + sub_key
+    return ''.join(origin[i] for i in MIXIN_KEY_ENC_TAB if i < len(origin))[:32]
+
+
+def sign_params(params, mixin_key, wts=None):
+    """为请求参数添加WBI签名（wts时间戳和w_rid）
+
+    Args:
+        params: 原始请求参数（不会被修改）
+        mixin_key: get_mixin_key()的结果
+        wts: 签名时间戳（秒），None表示使用当前时间
+
+    Returns:
+        添加了 wts 和 w_rid 的新参数字典
+    """
+    signed = {key: value for key, value in params.items() if key != 'w_rid'}
+    signed['wts'] = int(time.time()) if wts is None else int(wts)
+    signed = {key: _FILTERED_CHARS.sub('', str(signed[key])) for key in sorted(signed)}
+    query = urlencode(signed)
+    signed['w_rid'] = hashlib.md5((query + mixin_key).encode('utf-8')).hexdigest()
+    return signed
@@ -0,0 +1,248 @@
+import os
+import json
+import shutil
+import threading
+import subprocess
+
+# 磁盘缓存格式版本，结构变化时递增使旧缓存失效
+CACHE_VERSION = 1
+
+# 默认磁盘缓存位置，按ffmpeg可执行文件路径+修改时间+大小区分
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'vscript_bilibili_catch', 'ffmpeg_capabilities.json')
+
+# 输出格式到ffmpeg muxer名称的映射
+FORMAT_MUXERS = {
+    'mp4': 'mp4',
+    'mkv': 'matroska',
+    'flv': 'flv'
+}
+
+# 进程内缓存，键为请求的ffmpeg可执行文件名
+_process_cache = {}
+_cache_lock = threading.Lock()
+
+
+class FFmpegCapabilities:
+    """ffmpeg能力信息：可执行文件路径、版本、可用muxer/编码器和编译配置"""
+
+    def __init__(self, path=None, version=None, muxers=None, encoders=None, configuration=None, ffprobe_path=None):
+        """初始化能力信息
+
+        Args:
+            path: ffmpeg可执行文件的绝对路径，None表示ffmpeg不可用
+            version: ffmpeg版本字符串
+            muxers: 可用的muxer名称集合
+            encoders: 可用的编码器名称集合
+            configuration: 编译配置参数列表，如 --enable-libx264
+            ffprobe_path: 同目录或PATH中的ffprobe路径
+        """
+        self.path = path
+        self.version = version
+        self.muxers = set(muxers or [])
+        self.encoders = set(encoders or [])
+        self.configuration = list(configuration or [])
+        self.ffprobe_path = ffprobe_path
+
+    @property
+    def available(self):
+        """ffmpeg是否可用"""
+        return self.path is not None
+
+    def has_muxer(self, name):
+        """是否支持指定的muxer"""
+        return name in self.muxers
+
+    def has_encoder(self, name):
+        """是否支持指定的编码器"""
+        return name in self.encoders
+
+    def has_flag(self, flag):
+        """是否以指定的编译参数构建，如 has_flag('--enable-libx264')"""
+        return flag in self.configuration
+
+    def muxer_for_format(self, format):
+        """返回输出格式对应的muxer名称，不支持时返回None"""
+        muxer = FORMAT_MUXERS.get(format, format)
+        return muxer if self.has_muxer(muxer) else None
+
+    def to_dict(self):
+        """转换为可JSON序列化的字典"""
+        return {
+            'path': self.path,
+            'version': self.version,
+            'muxers': sorted(self.muxers),
+            'encoders': sorted(self.encoders),
+            'configuration': self.configuration,
+            'ffprobe_path': self.ffprobe_path
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """从to_dict()生成的字典恢复"""
+        return cls(
+            path=data.get('path'),
+            version=data.get('version'),
+            muxers=data.get('muxers'),
+            encoders=data.get('encoders'),
+            configuration=data.get('configuration'),
+            ffprobe_path=data.get('ffprobe_path')
+        )
+
+    def __repr__(self):
+        return f"FFmpegCapabilities(path={self.path!r}, version={self.version!r})"
+
+
+def _run_ffmpeg(path, *args):
+    """运行ffmpeg并返回标准输出文本，失败时返回空字符串"""
+    try:
+        process = subprocess.run([path, '-hide_banner', *args], stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=10)
+        return process.stdout.decode('utf-8', errors='replace')
+    except (subprocess.SubprocessError, OSError):
+        return ''
+
+
+def _parse_table(output, separator):
+    """解析 ffmpeg -muxers / -encoders 的表格输出，返回名称集合
+
+    Args:
+        output: ffmpeg输出文本
+        separator: 表头与正文之间的分隔行前缀（'--' 或 '------'）
+    """
+    names = set()
+    in_body = False
+    for line in output.splitlines():
+        stripped = line.strip()
+        if not in_body:
+            if stripped.startswith(separator) and set(stripped) == {'-'}:
+                in_body = True
+            continue
+        parts = stripped.split()
+        if len(parts) < 2:
+            continue
+        # muxer名称可能是逗号分隔的多个别名，如 "mov,mp4,m4a"
+        names.update(name for name in parts[1].split(',') if name)
+    return names
+
+
+def discover_ffmpeg_capabilities(binary='ffmpeg'):
+    """运行ffmpeg探测其能力（会启动子进程，通常应使用get_ffmpeg_capabilities）
+
+    Args:
+        binary: ffmpeg可执行文件名或路径
+
+    Returns:
+        FFmpegCapabilities
+    """
+    path = shutil.which(binary)
+    if not path:
+        return FFmpegCapabilities()
+
+    version_output = ''
+    try:
+        process = subprocess.run([path, '-version'], stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=10)
+        if process.returncode != 0:
+            return FFmpegCapabilities()
+        version_output = process.stdout.decode('utf-8', errors='replace')
+    except (subprocess.SubprocessError, OSError):
+        return FFmpegCapabilities()
+
+    version = None
+    configuration = []
+    for line in version_output.splitlines():
+        if line.startswith('ffmpeg version '):
+            version = line[len('ffmpeg version '):].split(' ', 1)[0]
+        elif line.startswith('configuration:'):
+            configuration = line[len('configuration:'):].split()
+
+    muxers = _parse_table(_run_ffmpeg(path, '-muxers'), '--')
+    encoders = _parse_table(_run_ffmpeg(path, '-encoders'), '------')
+
+    # ffprobe通常与ffmpeg位于同一目录
+    ffprobe_path = None
+    sibling = os.path.join(os.path.dirname(path), 'ffprobe' + os.path.splitext(path)[1])
+    if os.path.exists(sibling):
+        ffprobe_path = sibling
+    else:
+        ffprobe_path = shutil.which('ffprobe')
+
+    return FFmpegCapabilities(
+        path=path,
+        version=version,
+        muxers=muxers,
+        encoders=encoders,
+        configuration=configuration,
+        ffprobe_path=ffprobe_path
+    )
+
+
+def _binary_key(path):
+    """生成磁盘缓存键：路径 + 修改时间 + 文件大小"""
+    stat = os.stat(path)
+    return f"{path}|{stat.st_mtime_ns}|{stat.st_size}"
+
+
+def _load_disk_cache(cache_path):
+    """读取磁盘缓存，失败时返回空字典"""
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') == CACHE_VERSION:
+            return data.get('entries', {})
+    except (OSError, ValueError):
+        pass
+    return {}
+
+
+def _save_disk_cache(cache_path, entries):
+    """写入磁盘缓存（先写临时文件再替换，避免并发进程读到半个文件）"""
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': CACHE_VERSION, 'entries': entries}, f, ensure_ascii=False)
+        os.replace(temp_path, cache_path)
+    except OSError:
+        pass
+
+
+def get_ffmpeg_capabilities(binary='ffmpeg', cache_path=DEFAULT_CACHE_PATH, refresh=False):
+    """获取ffmpeg能力信息，每个进程只探测一次，并可通过磁盘缓存跨进程复用
+
+    Args:
+        binary: ffmpeg可执行文件名或路径
+        cache_path: 磁盘缓存文件路径，None表示不使用磁盘缓存
+        refresh: 是否忽略缓存重新探测
+
+    Returns:
+        FFmpegCapabilities
+    """
+    with _cache_lock:
+        if not refresh and binary in _process_cache:
+            return _process_cache[binary]
+
+        capabilities = None
+        path = shutil.which(binary)
+        key = None
+        entries = {}
+
+        # 可执行文件未变化时直接使用磁盘缓存，避免启动任何子进程
+        if path and cache_path:
+            try:
+                key = _binary_key(path)
+            except OSError:
+                key = None
+            if key:
+                entries = _load_disk_cache(cache_path)
+                if not refresh and key in entries:
+                    capabilities = FFmpegCapabilities.from_dict(entries[key])
+
+        if capabilities is None:
+            capabilities = discover_ffmpeg_capabilities(binary)
+            if key and capabilities.available:
+                # 只保留当前键，旧版本ffmpeg的条目随之淘汰
+                entries = {k: v for k, v in entries.items() if not k.startswith(path + '|')}
+                entries[key] = capabilities.to_dict()
+                _save_disk_cache(cache_path, entries)
+
+        _process_cache[binary] = capabilities
+        return capabilities
@@ -1,88 +1,683 @@
 import os
 import sys
+import logging
 import argparse
-from bilibili_downloader import BilibiliDownloader
-from bilibili_video_collector_api import BilibiliVideoCollectorAPI
-from bilibili_video_collector_selenium import BilibiliVideoCollectorSelenium
 
-def main():
-    """主函数，解析命令行参数并执行视频下载或列表收集"""
+# 注意：本文件只在模块级导入标准库。
+# 各子命令依赖的重型模块（requests/tqdm/selenium/webdriver_manager等）
+# 都在对应的处理函数内部按需导入，避免单视频下载进程为用不到的浏览器依赖付出启动时间。
+
+# 旧版命令行参数到子命令的映射，用于兼容 `main.py --bvid ...` 这类调用方式
+LEGACY_MODE_OPTIONS = {
+    '--bvid': 'download',
+    '--uid': 'collect-api',
+    '--selenium': 'collect-browser'
+}
+
+
+def _import_downloader():
+    """按需导入下载器类"""
+    from bilibili_downloader import BilibiliDownloader
+    return BilibiliDownloader
+
+
+def _import_api_collector():
+    """按需导入API版本视频收集器类"""
+    from bilibili_video_collector_api import BilibiliVideoCollectorAPI
+    return BilibiliVideoCollectorAPI
+
+
+def _import_selenium_collector():
+    """按需导入Selenium版本视频收集器类（会加载selenium和webdriver_manager）"""
+    from bilibili_video_collector_selenium import BilibiliVideoCollectorSelenium
+    return BilibiliVideoCollectorSelenium
+
+
+def _import_hybrid_collector():
+    """按需导入混合版本视频收集器类（同样会加载selenium）"""
+    from bilibili_video_collector_hybrid import BilibiliVideoCollectorHybrid
+    return BilibiliVideoCollectorHybrid
+
+
+def _read_bvids(args):
+    """合并命令行中的BV号和--bv-file中的BV号（每行一个，# 开头为注释），去重并保持顺序"""
+    bvids = list(args.bvid) if isinstance(args.bvid, list) else [args.bvid]
+    bv_file = getattr(args, 'bv_file', None)
+    if bv_file:
+        with open(bv_file, 'r', encoding='utf-8') as f:
+            bvids.extend(line.split('#', 1)[0].strip() for line in f)
+    return list(dict.fromkeys(bvid for bvid in bvids if bvid))
+
+
+def cmd_plan(args, bvids):
+    """download --plan：只解析视频信息和媒体流，估算下载大小、耗时和磁盘空间，不下载"""
+    BilibiliDownloader = _import_downloader()
+    from bilibili_planner import DownloadPlanner, PlanCache, summarize_plan, parse_size, format_size, format_seconds
+
+    def factory():
+        return BilibiliDownloader(cookie_path=args.cookie, proxy=args.proxy, metrics=args.metrics)
+
+    cache = PlanCache(os.path.join(args.output, '.plan_cache.json'))
+    planner = DownloadPlanner(factory, workers=args.plan_workers, cache=cache, probe_sizes=args.probe_sizes,
+                              quality=args.quality, audio_quality=args.audio_quality)
+    entries = planner.plan(bvids)
+
+    print(f"\n{'BV号':<14}{'时长':>9}{'画质':>6}{'视频':>12}{'音频':>11}{'合计':>12}  来源  标题")
+    for entry in entries:
+        if entry.get('error'):
+            print(f"{entry['bvid']:<14}  解析失败: {entry['error']}")
+            continue
+        source = '缓存' if entry.get('cached') else ('实测' if entry['source'] == 'content-length' else '估算')
+        print(f"{entry['bvid']:<14}{format_seconds(entry['duration']):>9}{entry['quality'] or '-':>6}"
+              f"{format_size(entry['video_bytes']):>12}{format_size(entry['audio_bytes']):>11}"
+              f"{format_size(entry['total_bytes']):>12}  {source}  {entry['title']}")
+
+    bandwidth = parse_size(args.bandwidth) if args.bandwidth else None
+    watermark = parse_size(args.min_free) if args.min_free else 0
+    from ffmpeg_capabilities import get_ffmpeg_capabilities
+    merge = get_ffmpeg_capabilities().available
+    summary = summarize_plan(entries, args.output, bandwidth, watermark, merge=merge)
+    print(f"\n共 {summary['videos']} 个视频（解析失败 {summary['failed']} 个）")
+    print(f"预计下载总大小: {format_size(summary['total_bytes'])}，峰值磁盘占用: {format_size(summary['peak_bytes'])}")
+    if summary['estimated_seconds'] is not None:
+        print(f"按带宽 {format_size(bandwidth)}/s 预计耗时: {format_seconds(summary['estimated_seconds'])}")
+    print(f"目标磁盘剩余空间: {format_size(summary['free_bytes'])}，水位线: {format_size(watermark)}")
+    print("磁盘空间充足" if summary['fits'] else "磁盘空间不足，请清理空间或减少视频数量")
+
+
+def cmd_download(args):
+    """download子命令：下载一个或多个视频（--plan 只估算不下载）"""
+    bvids = _read_bvids(args)
+    if not bvids:
+        print(f"BV号列表文件中没有有效的BV号: {args.bv_file}")
+        sys.exit(1)
+    if getattr(args, 'plan', False):
+        cmd_plan(args, bvids)
+        return
+
+    BilibiliDownloader = _import_downloader()
+
+    # 指定--scratch-dir时在暂存目录中下载和合并，成品由后台线程移动到输出目录
+    scratch_dir = getattr(args, 'scratch_dir', None)
+    mover = None
+    if scratch_dir:
+        from bilibili_storage import LibraryMover
+        mover = LibraryMover(verify=args.move_verify, metrics=args.metrics)
+
+    # 指定--sidecars时，封面、字幕、弹幕与媒体流同时获取
+    sidecars = None
+    if getattr(args, 'sidecars', None):
+        from bilibili_sidecar import parse_sidecar_kinds
+        try:
+            sidecars = parse_sidecar_kinds(args.sidecars)
+        except ValueError as e:
+            print(f"参数错误: {str(e)}")
+            return
+
+    # 指定--verify时，下载（和移动）完成的文件由后台线程校验，结果写入视频目录
+    verifier = None
+    if getattr(args, 'verify', False):
+        from bilibili_verify import VerificationPool
+        verifier = VerificationPool(catalog=args.video_catalog, workers=args.verify_workers)
+
+    # 指定--min-free时，剩余空间低于水位线的下载会等待或放弃（使用暂存目录时检查暂存目录所在磁盘）
+    disk_guard = None
+    if getattr(args, 'min_free', None):
+        from bilibili_planner import DiskSpaceGuard, parse_size
+        disk_guard = DiskSpaceGuard(scratch_dir or args.output, parse_size(args.min_free))
+
+    # 初始化下载器
+    downloader = BilibiliDownloader(cookie_path=args.cookie, proxy=args.proxy, metrics=args.metrics,
+                                    profiler=args.profiler, catalog=args.video_catalog, disk_guard=disk_guard,
+                                    scratch_dir=scratch_dir, mover=mover, verifier=verifier, sidecars=sidecars)
+
+    try:
+        for bvid in bvids:
+            print(f"\n开始下载视频: {bvid}")
+            output_path = downloader.download_video(
+                bvid,
+                output_dir=args.output,
+                quality=args.quality,
+                audio_quality=args.audio_quality,
+                format=args.format
+            )
+
+            if output_path:
+                print(f"\n视频下载完成: {output_path}")
+            else:
+                print("\n视频下载失败")
+    finally:
+        downloader.close()
+        if mover is not None:
+            print("\n等待移动到输出目录...")
+            stats = mover.close()
+            print(f"已移动 {stats['moved']} 个文件（{stats['bytes'] / 1024 / 1024:.1f} MB），失败 {stats['failed']} 个")
+        if verifier is not None:
+            _print_verification(verifier)
+
+
+def _print_verification(pool):
+    """等待后台校验完成并输出结果"""
+    stats = pool.close()
+    print(f"\n校验完成: 通过 {stats['ok']} 个，失败 {stats['failed']} 个，"
+          f"未安装ffprobe只检查了大小和校验值 {stats['unprobed']} 个，共 {stats['bytes'] / 1024 / 1024:.1f} MB")
+    for result in pool.failures:
+        print(f"  {result['bvid']}  {'; '.join(result['errors'])}  {result['path']}")
+
+
+def cmd_verify(args):
+    """verify子命令：并发重新校验本地视频目录中已下载的文件"""
+    from bilibili_verify import VerificationPool, MediaVerifier
+
+    if args.video_catalog is None:
+        print("未启用视频目录")
+        return
+    targets = args.video_catalog.verification_targets(uid=args.up, recheck=args.recheck)
+    if not targets:
+        print("没有需要校验的视频（--recheck 重新校验全部已下载视频）")
+        return
+    print(f"开始校验 {len(targets)} 个视频，{args.workers} 个工作线程")
+    pool = VerificationPool(MediaVerifier(hash_files=not args.no_hash), catalog=args.video_catalog,
+                            workers=args.workers)
+    pool.run(targets)
+    _print_verification(pool)
+
+
+def cmd_collect_api(args):
+    """collect-api子命令：通过API收集UP主视频列表"""
+    BilibiliVideoCollectorAPI = _import_api_collector()
+
+    # 初始化API版本视频收集器
+    collector = BilibiliVideoCollectorAPI(cookie_path=args.cookie, proxy=args.proxy, catalog=args.video_catalog)
+
+    # 收集并打印视频列表
+    collector.collect_videos_by_uid(args.uid, args.max, args.all)
+
+
+def cmd_collect_hybrid(args):
+    """collect-hybrid子命令：浏览器只获取Cookie和WBI密钥，视频列表通过HTTP接口分页获取"""
+    BilibiliVideoCollectorHybrid = _import_hybrid_collector()
+
+    collector = BilibiliVideoCollectorHybrid(cookie_path=args.cookie, proxy=args.proxy, metrics=args.metrics,
+                                             profiler=args.profiler, headless=args.headless, lean=args.lean,
+                                             use_browser=not args.no_browser, max_bootstraps=args.max_bootstraps,
+                                             catalog=args.video_catalog)
+
+    # 多个UP主共用同一份Cookie和密钥，只有遇到风控时才重新打开浏览器
+    for uid in args.uid:
+        try:
+            collector.collect_videos(uid, args.max, auto_download=args.download, output_dir=args.output,
+                                     download_workers=args.download_workers)
+        except Exception as e:
+            print(f"\n收集UP主 {uid} 的视频失败: {str(e)}")
+    print(f"\n混合收集统计: {collector.stats}")
+
+
+def cmd_collect_browser(args):
+    """collect-browser子命令：通过Selenium模拟浏览器收集UP主视频BV号"""
+    BilibiliVideoCollectorSelenium = _import_selenium_collector()
+
+    # 初始化Selenium版本视频收集器
+    collector = BilibiliVideoCollectorSelenium(cookie_path=args.cookie, proxy=args.proxy, metrics=args.metrics,
+                                               profiler=args.profiler, lean=args.lean, catalog=args.video_catalog)
+
+    # 旧版参数只有一个UID
+    uids = args.uid if isinstance(args.uid, list) else [args.uid]
+    browsers = getattr(args, 'browsers', 1)
+
+    def collect(uid):
+        try:
+            collector.collect_videos_by_selenium(uid, args.max, args.headless, auto_download=args.download,
+                                                 capture=args.capture, output_dir=args.output,
+                                                 download_workers=getattr(args, 'download_workers', 2))
+        except Exception as e:
+            print(f"\n收集UP主 {uid} 的视频失败: {str(e)}")
+
+    # 单个UP主：启动一次浏览器，用完即关闭
+    if len(uids) == 1 and browsers <= 1:
+        collect(uids[0])
+        return
+
+    # 多个UP主：浏览器池中的浏览器在各UP主之间复用，最多browsers个UP主并行收集
+    from concurrent.futures import ThreadPoolExecutor
+    pool = collector.create_browser_pool(browsers, args.headless, capture_network=args.capture == 'network',
+                                         max_uses=args.browser_max_uses, max_memory_mb=args.browser_max_memory)
+    with pool, ThreadPoolExecutor(max_workers=browsers) as executor:
+        list(executor.map(collect, uids))
+    print(f"\n浏览器池统计: {pool.stats}")
+
+
+def cmd_batch(args):
+    """batch子命令：从UID文件批量收集多个UP主的视频列表"""
+    from bilibili_batch import BatchCatalog, BatchCollector, read_uid_file
+
+    uids = read_uid_file(args.uid_file)
+    if not uids:
+        print(f"UID文件中没有有效的UID: {args.uid_file}")
+        return
+
+    catalog = BatchCatalog(args.catalog or os.path.join(args.output, 'batch_catalog.jsonl'))
+    batch = BatchCollector(catalog, method=args.method, workers=args.workers, max_videos=args.max,
+                           cookie_path=args.cookie, proxy=args.proxy, headless=args.headless, lean=args.lean,
+                           video_catalog=args.video_catalog, metrics=args.metrics, profiler=args.profiler)
+    stats = batch.run(uids, resume=args.resume)
+    print(f"\n批量收集完成: 成功 {stats['ok']}，无视频 {stats['empty']}，不完整 {stats['partial']}，"
+          f"失败 {stats['error']}，跳过 {stats['skipped']}，共 {stats['videos']} 个视频，耗时 {stats['elapsed']:.1f} 秒")
+    print(f"结果已写入: {catalog.path}")
+
+
+def cmd_export(args):
+    """export子命令：把本地视频目录导出为Parquet或CSV，供pandas等工具分析"""
+    if args.video_catalog is None:
+        print("未启用视频目录")
+        return
+    try:
+        rows = args.video_catalog.export(args.path, table=args.table)
+    except ImportError as e:
+        print(f"导出Parquet需要安装pyarrow: {str(e)}")
+        return
+    print(f"已导出 {rows} 行到: {args.path}")
+    print(f"目录统计: {args.video_catalog.stats()}")
+
+
+def cmd_query(args):
+    """query子命令：在本地视频目录中按关键词、UP主、日期、时长、下载状态查询视频"""
+    import json
+    import time
+    from bilibili_catalog import parse_date, parse_duration, format_length
+
+    if args.video_catalog is None:
+        print("未启用视频目录")
+        return
+    try:
+        since = parse_date(args.since) if args.since else None
+        until = parse_date(args.until, end=True) if args.until else None
+        min_duration = parse_duration(args.min_duration) if args.min_duration else None
+        max_duration = parse_duration(args.max_duration) if args.max_duration else None
+    except ValueError as e:
+        print(f"参数错误: {str(e)}")
+        return
+
+    start = time.perf_counter()
+    rows = args.video_catalog.search(args.keyword, up=args.up, since=since, until=until,
+                                     min_duration=min_duration, max_duration=max_duration, state=args.state,
+                                     typeid=args.typeid, order=args.order, limit=args.limit or None)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    if args.json:
+        for row in rows:
+            print(json.dumps(row, ensure_ascii=False))
+        return
+    for row in rows:
+        pub_date = time.strftime('%Y-%m-%d', time.localtime(row['created'])) if row['created'] else '日期未知'
+        print(f"{row['bvid']}  {pub_date}  {row['length'] or format_length(row['duration']) or '--:--':>8}  "
+              f"{row['download_state']:<10}  {row['up_name'] or row['uid'] or '-'}  {row['title'] or ''}")
+        if args.verbose and row['file_path']:
+            print(f"    {row['file_path']} ({row['file_size'] or 0:,} 字节)")
+    print(f"\n共 {len(rows)} 条结果，查询耗时 {elapsed_ms:.1f} ms")
+
+
+def _add_common_arguments(parser):
+    """添加所有子命令共用的参数"""
+    parser.add_argument('--cookie', type=str, default=None, help='Cookie文件路径')
+    parser.add_argument('--proxy', type=str, default=None, help='代理设置，如 http://127.0.0.1:7890')
+    parser.add_argument('--output', type=str, default='./downloads', help='输出目录')
+    parser.add_argument('--log-level', type=str, default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help='日志级别，默认INFO只输出关键进度，DEBUG输出每次探测/选择器尝试的详细信息')
+    parser.add_argument('-v', '--verbose', action='store_true', help='等同于 --log-level DEBUG')
+
+
+def _add_catalog_arguments(parser):
+    """添加本地视频目录参数"""
+    parser.add_argument('--db', type=str, default=None,
+                        help='本地视频目录（SQLite）路径，保存视频元数据和下载状态，默认为 <output>/catalog.db')
+    parser.add_argument('--no-db', action='store_true', help='不写入本地视频目录')
+
+
+def _add_download_arguments(parser):
+    """添加下载相关参数"""
+    parser.add_argument('--quality', type=int, choices=[16, 32, 64, 74, 80, 112, 116], default=None,
+                        help='视频质量代码 (16=流畅 32=高清 64=超清 74=1080P 80=1080P+ 112=4K 116=HDR)')
+    parser.add_argument('--audio_quality', type=int, choices=[30200, 30216, 30232], default=None,
+                        help='音频质量代码 (30200=普通 30216=高清 30232=无损)')
+    parser.add_argument('--format', type=str, default='mp4', choices=['mp4', 'mkv', 'flv'], help='输出视频格式')
+
+
+def _add_metrics_arguments(parser):
+    """添加下载指标导出参数"""
+    parser.add_argument('--metrics-prom', type=str, default=None,
+                        help='运行结束时导出Prometheus textfile collector格式的指标文件（如 /var/lib/node_exporter/bilibili.prom）')
+    parser.add_argument('--metrics-json', type=str, default=None, help='运行结束时导出JSON格式的指标文件')
+
+
+def _add_memory_arguments(parser):
+    """添加传输缓冲区内存预算参数"""
+    parser.add_argument('--memory-budget', type=str, default=None,
+                        help='所有下载、移动、校验共享的在途缓冲区内存上限（如 256M），用尽时新的读取等待；'
+                             '在途字节数和峰值会导出为指标')
+
+
+def _add_profile_arguments(parser):
+    """添加剖析参数"""
+    parser.add_argument('--profile', type=str, default=None, metavar='DIR',
+                        help='按阶段运行cProfile，将每个视频/UP主各阶段的.pstats写入该目录')
+    parser.add_argument('--profile-memory', action='store_true',
+                        help='与--profile一起使用，同时用tracemalloc记录各阶段的内存分配快照')
+
+
+def build_parser():
+    """构建子命令形式的参数解析器"""
+    parser = argparse.ArgumentParser(description='B站视频工具 - 支持单个视频下载和UP主视频列表收集')
+    subparsers = parser.add_subparsers(dest='command', metavar='<command>')
+    subparsers.required = True
+
+    # download: 单个视频下载
+    download_parser = subparsers.add_parser('download', help='下载一个或多个视频')
+    download_parser.add_argument('bvid', type=str, nargs='*', help='视频的BV号，可以指定多个')
+    _add_common_arguments(download_parser)
+    _add_download_arguments(download_parser)
+    download_parser.add_argument('--bv-file', type=str, default=None, help='BV号列表文件，每行一个')
+    download_parser.add_argument('--plan', action='store_true',
+                                 help='只解析视频信息和媒体流，估算每个视频和总的下载大小、耗时和磁盘空间，不下载')
+    download_parser.add_argument('--plan-workers', type=int, default=4, help='与--plan一起使用，并发解析的视频数')
+    download_parser.add_argument('--probe-sizes', action='store_true',
+                                 help='与--plan一起使用，用HEAD请求读取媒体流的实际大小（默认按码率×时长估算）')
+    download_parser.add_argument('--bandwidth', type=str, default=None,
+                                 help='与--plan一起使用，带宽上限（字节/秒，如 10M），用于估算下载耗时')
+    download_parser.add_argument('--scratch-dir', type=str, default=None,
+                                 help='暂存目录（如本地NVMe或tmpfs）：临时文件和合并都在这里进行，'
+                                      '成品由后台线程复制到--output并校验，与后续下载重叠')
+    download_parser.add_argument('--move-verify', type=str, choices=['size', 'hash'], default='size',
+                                 help='移动到--output后的校验方式：size比较字节数，hash额外比较校验值')
+    download_parser.add_argument('--sidecars', type=str, default=None,
+                                 help='与媒体流同时获取的附属文件，逗号分隔：cover（封面）、subtitles（CC字幕，转为SRT）、'
+                                      'danmaku（分段弹幕，保存为protobuf），或 all')
+    download_parser.add_argument('--verify', action='store_true',
+                                 help='下载完成后在后台校验文件：ffprobe检查时长和音视频流，计算校验值，结果写入视频目录')
+    download_parser.add_argument('--verify-workers', type=int, default=2, help='与--verify一起使用，并发校验的文件数')
+    download_parser.add_argument('--min-free', type=str, default=None,
+                                 help='磁盘水位线（如 5G）：下载时剩余空间扣除在途下载后低于该值则等待或放弃；'
+                                      '与--plan一起使用时用于判断空间是否充足')
+    _add_metrics_arguments(download_parser)
+    _add_profile_arguments(download_parser)
+    _add_memory_arguments(download_parser)
+    _add_catalog_arguments(download_parser)
+    download_parser.set_defaults(handler=cmd_download)
+
+    # collect-api: API方式收集视频列表
+    api_parser = subparsers.add_parser('collect-api', help='通过API收集UP主视频列表')
+    api_parser.add_argument('uid', type=int, help='UP主UID')
+    _add_common_arguments(api_parser)
+    api_parser.add_argument('--max', type=int, default=None, help='最大获取视频数量')
+    api_parser.add_argument('--all', action='store_true', help='显示所有信息')
+    _add_catalog_arguments(api_parser)
+    api_parser.set_defaults(handler=cmd_collect_api)
+
+    # collect-browser: Selenium方式收集视频BV号
+    browser_parser = subparsers.add_parser('collect-browser', help='通过Selenium模拟浏览器收集UP主视频BV号')
+    browser_parser.add_argument('uid', type=int, nargs='+', help='UP主UID，可以指定多个')
+    _add_common_arguments(browser_parser)
+    browser_parser.add_argument('--max', type=int, default=None, help='最大获取视频数量')
+    browser_parser.add_argument('--headless', action='store_true', default=False, help='是否使用无头模式')
+    browser_parser.add_argument('--download', action='store_true', help='边收集边自动下载每个视频')
+    browser_parser.add_argument('--download-workers', type=int, default=2, help='与--download一起使用，下载线程数')
+    browser_parser.add_argument('--capture', choices=['dom', 'network'], default='dom',
+                                help='视频列表获取方式：dom 解析页面元素，network 捕获页面的列表接口响应（含完整元数据）')
+    browser_parser.add_argument('--lean', action='store_true',
+                                help='使用精简浏览器：不加载图片、字体、音视频和统计脚本，并限制页面内存')
+    browser_parser.add_argument('--browsers', type=int, default=1,
+                                help='浏览器池大小：收集多个UP主时复用的浏览器数量，也是并行收集的UP主数量')
+    browser_parser.add_argument('--browser-max-uses', type=int, default=20,
+                                help='浏览器池中单个浏览器最多收集的UP主数量，达到后重启')
+    browser_parser.add_argument('--browser-max-memory', type=int, default=1024,
+                                help='浏览器池中单个浏览器页面内存上限（MB），超过后重启')
+    _add_metrics_arguments(browser_parser)
+    _add_profile_arguments(browser_parser)
+    _add_memory_arguments(browser_parser)
+    _add_catalog_arguments(browser_parser)
+    browser_parser.set_defaults(handler=cmd_collect_browser)
+
+    # collect-hybrid: 浏览器获取Cookie和密钥 + HTTP接口分页
+    hybrid_parser = subparsers.add_parser('collect-hybrid',
+                                          help='浏览器只获取Cookie和WBI密钥，视频列表通过HTTP接口分页获取')
+    hybrid_parser.add_argument('uid', type=int, nargs='+', help='UP主UID，可以指定多个')
+    _add_common_arguments(hybrid_parser)
+    hybrid_parser.add_argument('--max', type=int, default=None, help='最大获取视频数量')
+    hybrid_parser.add_argument('--headless', action='store_true', default=False, help='是否使用无头模式')
+    hybrid_parser.add_argument('--download', action='store_true', help='边收集边自动下载每个视频')
+    hybrid_parser.add_argument('--download-workers', type=int, default=2, help='与--download一起使用，下载线程数')
+    hybrid_parser.add_argument('--lean', action='store_true',
+                               help='使用精简浏览器：不加载图片、字体、音视频和统计脚本，并限制页面内存')
+    hybrid_parser.add_argument('--no-browser', action='store_true',
+                               help='不启动浏览器，通过finger/spi和nav接口获取设备指纹Cookie和WBI密钥')
+    hybrid_parser.add_argument('--max-bootstraps', type=int, default=3,
+                               help='遇到风控时重新获取Cookie和密钥的最大次数')
+    _add_metrics_arguments(hybrid_parser)
+    _add_profile_arguments(hybrid_parser)
+    _add_memory_arguments(hybrid_parser)
+    _add_catalog_arguments(hybrid_parser)
+    hybrid_parser.set_defaults(handler=cmd_collect_hybrid)
+
+    # batch: 从UID文件批量收集
+    batch_parser = subparsers.add_parser('batch', help='从UID文件批量收集多个UP主的视频列表')
+    batch_parser.add_argument('uid_file', type=str, help='UID文件，每行一个UID，# 开头为注释')
+    _add_common_arguments(batch_parser)
+    batch_parser.add_argument('--method', choices=['api', 'hybrid', 'browser'], default='hybrid',
+                              help='视频列表获取方式：api 直接请求接口，hybrid 浏览器获取Cookie后请求接口，'
+                                   'browser 浏览器网络捕获（每个工作线程一个浏览器）')
+    batch_parser.add_argument('--workers', type=int, default=4, help='并发收集的UP主数量')
+    batch_parser.add_argument('--max', type=int, default=None, help='每个UP主最大获取视频数量')
+    batch_parser.add_argument('--catalog', type=str, default=None,
+                              help='输出目录文件（JSON Lines），默认为 <output>/batch_catalog.jsonl')
+    batch_parser.add_argument('--resume', action='store_true', help='跳过目录文件中已成功收集的UP主')
+    batch_parser.add_argument('--headless', action='store_true', default=False, help='是否使用无头模式')
+    batch_parser.add_argument('--lean', action='store_true',
+                              help='使用精简浏览器：不加载图片、字体、音视频和统计脚本，并限制页面内存')
+    _add_metrics_arguments(batch_parser)
+    _add_profile_arguments(batch_parser)
+    _add_catalog_arguments(batch_parser)
+    batch_parser.set_defaults(handler=cmd_batch)
+
+    # query: 查询本地视频目录
+    query_parser = subparsers.add_parser('query', help='按关键词、UP主、日期、时长、下载状态查询本地视频目录')
+    query_parser.add_argument('keyword', type=str, nargs='?', default=None,
+                              help='BV号（精确查询），或标题/简介中的关键词（全文检索）')
+    _add_common_arguments(query_parser)
+    query_parser.add_argument('--up', type=str, default=None, help='UP主UID或名字')
+    query_parser.add_argument('--since', type=str, default=None, help='发布日期下界，如 2023、2023-06、2023-06-01')
+    query_parser.add_argument('--until', type=str, default=None, help='发布日期上界（包含该年/月/日），格式同--since')
+    query_parser.add_argument('--min-duration', type=str, default=None,
+                              help='最短时长，如 30m、1h、90s、1:30:00，纯数字表示分钟')
+    query_parser.add_argument('--max-duration', type=str, default=None, help='最长时长，格式同--min-duration')
+    query_parser.add_argument('--state', choices=['pending', 'downloaded', 'failed'], default=None, help='下载状态')
+    query_parser.add_argument('--typeid', type=int, default=None, help='分区ID')
+    query_parser.add_argument('--order', choices=['created', 'play', 'duration'], default='created',
+                              help='排序：created 发布时间从新到旧，play 播放数，duration 时长')
+    query_parser.add_argument('--limit', type=int, default=50, help='最多显示的条数，0表示不限制')
+    query_parser.add_argument('--json', action='store_true', help='以JSON Lines格式输出完整记录')
+    _add_catalog_arguments(query_parser)
+    query_parser.set_defaults(handler=cmd_query)
+
+    # export: 导出本地视频目录
+    export_parser = subparsers.add_parser('export', help='把本地视频目录导出为Parquet（需要pyarrow）或CSV')
+    export_parser.add_argument('path', type=str, help='导出文件路径，扩展名为 .parquet 或 .csv')
+    _add_common_arguments(export_parser)
+    export_parser.add_argument('--table', choices=['videos', 'ups'], default='videos', help='导出的表')
+    _add_catalog_arguments(export_parser)
+    export_parser.set_defaults(handler=cmd_export)
+
+    # verify: 重新校验已下载的文件
+    verify_parser = subparsers.add_parser('verify', help='并发校验本地视频目录中已下载文件的完整性')
+    _add_common_arguments(verify_parser)
+    verify_parser.add_argument('--up', type=str, default=None, help='只校验指定UID的UP主的视频')
+    verify_parser.add_argument('--recheck', action='store_true',
+                               help='重新校验全部已下载视频（默认只校验未校验过或校验失败的）')
+    verify_parser.add_argument('--workers', type=int, default=4, help='并发校验的文件数')
+    verify_parser.add_argument('--no-hash', action='store_true', help='不计算校验值（只检查大小、时长和音视频流）')
+    _add_catalog_arguments(verify_parser)
+    verify_parser.set_defaults(handler=cmd_verify)
+
+    return parser
+
+
+def build_legacy_parser():
+    """构建旧版（互斥参数形式）的参数解析器，保证已有脚本和调度任务无需修改"""
     parser = argparse.ArgumentParser(description='B站视频工具 - 支持单个视频下载和UP主视频列表收集')
-    
-    # 模式选择 - 新增互斥组
+
+    # 模式选择 - 互斥组
     mode_group = parser.add_mutually_exclusive_group(required=True)
     mode_group.add_argument('--bvid', type=str, help='单个视频的BV号（下载模式）')
     mode_group.add_argument('--uid', type=int, help='UP主UID（列表收集模式）')
     mode_group.add_argument('--selenium', type=int, help='UP主UID（Selenium模式，模拟浏览器获取视频BV号）')
     parser.add_argument('--download', action='store_true', help='当与--selenium一起使用时，收集视频后自动下载每个视频')
-    
+
     # 共同参数
-    parser.add_argument('--cookie', type=str, default=None, help='Cookie文件路径')
-    parser.add_argument('--proxy', type=str, default=None, help='代理设置，如 http://127.0.0.1:7890')
-    
+    _add_common_arguments(parser)
+
     # 下载模式参数
-    parser.add_argument('--output', type=str, default='./downloads', help='输出目录（下载模式）')
-    parser.add_argument('--quality', type=int, choices=[16, 32, 64, 74, 80, 112, 116], default=None, 
-                        help='视频质量代码 (16=流畅 32=高清 64=超清 74=1080P 80=1080P+ 112=4K 116=HDR)')
-    parser.add_argument('--audio_quality', type=int, choices=[30200, 30216, 30232], default=None,
-                        help='音频质量代码 (30200=普通 30216=高清 30232=无损)')
-    parser.add_argument('--format', type=str, default='mp4', choices=['mp4', 'mkv', 'flv'], help='输出视频格式')
-    
+    _add_download_arguments(parser)
+    _add_metrics_arguments(parser)
+    _add_profile_arguments(parser)
+    _add_memory_arguments(parser)
+    _add_catalog_arguments(parser)
+
     # 列表收集模式参数
     parser.add_argument('--max', type=int, default=None, help='最大获取视频数量（列表收集模式和Selenium模式）')
     parser.add_argument('--all', action='store_true', help='显示所有信息（列表收集模式）')
     parser.add_argument('--headless', action='store_true', default=False, help='是否使用无头模式（Selenium模式）')
-    
-    args = parser.parse_args()
-    
+    parser.add_argument('--capture', choices=['dom', 'network'], default='dom',
+                        help='视频列表获取方式（Selenium模式）：dom 解析页面元素，network 捕获页面的列表接口响应')
+    parser.add_argument('--lean', action='store_true', help='使用精简浏览器（Selenium模式）：不加载图片、字体、音视频和统计脚本')
+
+    return parser
+
+
+def _is_legacy_argv(argv):
+    """判断命令行是否为旧版参数形式（不以子命令开头且包含旧版模式参数）"""
+    if not argv or not argv[0].startswith('-') or argv[0] in ('-h', '--help'):
+        return False
+    return any(arg.split('=', 1)[0] in LEGACY_MODE_OPTIONS for arg in argv)
+
+
+def parse_args(argv=None):
+    """解析命令行参数，同时兼容子命令和旧版参数形式
+
+    Args:
+        argv: 命令行参数列表，None表示使用sys.argv
+
+    Returns:
+        argparse.Namespace，其中handler为对应子命令的处理函数
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+
+    if not _is_legacy_argv(argv):
+        parser = build_parser()
+        args = parser.parse_args(argv)
+        if args.command == 'download' and not args.bvid and not args.bv_file:
+            parser.error('download 需要至少一个BV号或 --bv-file')
+        return args
+
+    # 旧版参数：解析后映射为对应子命令的参数
+    args = build_legacy_parser().parse_args(argv)
+    if args.bvid:
+        args.command = 'download'
+        args.handler = cmd_download
+    elif args.uid:
+        args.command = 'collect-api'
+        args.handler = cmd_collect_api
+    else:
+        args.command = 'collect-browser'
+        args.handler = cmd_collect_browser
+        args.uid = args.selenium
+    return args
+
+
+def setup_logging(args):
+    """根据命令行参数配置日志输出"""
+    level = logging.DEBUG if args.verbose else getattr(logging, args.log_level)
+    logging.basicConfig(level=level, format='%(asctime)s [%(levelname)s] %(message)s', datefmt='%H:%M:%S')
+    # 第三方库的调试日志过于冗长，只在WARNING及以上输出
+    for noisy in ('urllib3', 'selenium', 'WDM'):
+        logging.getLogger(noisy).setLevel(max(level, logging.WARNING))
+
+
+def _create_metrics(args):
+    """需要导出指标时创建共享的MetricsRecorder，否则返回None"""
+    if not getattr(args, 'metrics_prom', None) and not getattr(args, 'metrics_json', None):
+        return None
+    from bilibili_metrics import MetricsRecorder
+    return MetricsRecorder()
+
+
+def _configure_memory_budget(args):
+    """指定--memory-budget时为进程内共享的内存预算设置上限"""
+    if not getattr(args, 'memory_budget', None):
+        return
+    from bilibili_planner import parse_size
+    from bilibili_memory import get_default_memory_budget
+    get_default_memory_budget().set_limit(parse_size(args.memory_budget))
+
+
+def _create_profiler(args):
+    """指定--profile时创建PhaseProfiler，否则返回None"""
+    if not getattr(args, 'profile', None):
+        return None
+    from bilibili_profiler import PhaseProfiler
+    return PhaseProfiler(args.profile, memory=args.profile_memory)
+
+
+def _create_catalog(args):
+    """打开本地视频目录，子命令不使用目录或指定了--no-db时返回None"""
+    if not hasattr(args, 'db') or args.no_db:
+        return None
+    from bilibili_catalog import VideoCatalog
+    return VideoCatalog(args.db or os.path.join(args.output, 'catalog.db'))
+
+
+def _export_metrics(args):
+    """运行结束时导出指标"""
+    if args.metrics is None:
+        return
+    try:
+        if args.metrics_prom:
+            args.metrics.write_prometheus(args.metrics_prom)
+            print(f"指标已导出到: {args.metrics_prom}")
+        if args.metrics_json:
+            args.metrics.write_json(args.metrics_json)
+            print(f"指标已导出到: {args.metrics_json}")
+    except Exception as e:
+        print(f"导出指标失败: {str(e)}")
+
+
+def main(argv=None):
+    """主函数，解析命令行参数并执行对应子命令"""
+    args = parse_args(argv)
+    setup_logging(args)
+    args.metrics = _create_metrics(args)
+    args.profiler = _create_profiler(args)
+    _configure_memory_budget(args)
+
     # 检查Cookie文件是否存在
     if args.cookie and not os.path.exists(args.cookie):
         print(f"警告: Cookie文件 '{args.cookie}' 不存在")
-    
+
     # 创建输出目录
     os.makedirs(args.output, exist_ok=True)
-    
+    args.video_catalog = _create_catalog(args)
+
     try:
-        if args.bvid:
-            # 下载模式
-            # 初始化下载器
-            downloader = BilibiliDownloader(cookie_path=args.cookie, proxy=args.proxy)
-            
-            # 下载单个视频
-            print(f"\n开始下载视频: {args.bvid}")
-            output_path = downloader.download_video(
-                args.bvid,
-                output_dir=args.output,
-                quality=args.quality,
-                audio_quality=args.audio_quality,
-                format=args.format
-            )
-            
-            if output_path:
-                print(f"\n视频下载完成: {output_path}")
-            else:
-                print("\n视频下载失败")
-        elif args.uid:
-            # 列表收集模式
-            # 初始化API版本视频收集器
-            collector = BilibiliVideoCollectorAPI(cookie_path=args.cookie, proxy=args.proxy)
-            
-            # 收集并打印视频列表
-            collector.collect_videos_by_uid(args.uid, args.max, args.all)
-        elif args.selenium:
-            # Selenium模式
-            # 初始化Selenium版本视频收集器
-            collector = BilibiliVideoCollectorSelenium(cookie_path=args.cookie, proxy=args.proxy)
-            
-            # 使用Selenium收集视频BV号
-            collector.collect_videos_by_selenium(args.selenium, args.max, args.headless, auto_download=args.download)
-    
+        args.handler(args)
     except KeyboardInterrupt:
         print("\n用户中断操作")
     except Exception as e:
         print(f"\n程序异常: {str(e)}")
         import traceback
         traceback.print_exc()
-    
+    finally:
+        _export_metrics(args)
+        if args.video_catalog is not None:
+            args.video_catalog.close()
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,62 @@
+import time
+import unittest
+
+import requests
+
+from bilibili_retry import Retrier, RetryPolicy, CircuitBreaker, CircuitOpenError
+
+
+class CircuitBreakerProbeTest(unittest.TestCase):
+    """半开状态下的探测请求因不可重试的异常中断时，熔断器不能一直拒绝该主机"""
+
+    def setUp(self):
+        self.retrier = Retrier(policy=RetryPolicy(max_attempts=1), failure_threshold=5, reset_timeout=0.05,
+                               sleep=lambda seconds: None)
+
+    def _open_circuit(self):
+        def fail():
+            raise requests.ConnectionError('connection refused')
+
+        for _ in range(5):
+            with self.assertRaises(requests.ConnectionError):
+                self.retrier.call(fail, host='h')
+        self.assertEqual(self.retrier.breaker('h').state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.retrier.call(lambda: 'ok', host='h')
+        time.sleep(0.06)
+
+    def test_probe_released_after_unexpected_exception(self):
+        self._open_circuit()
+
+        def disk_full():
+            raise OSError(28, 'No space left on device')
+
+        with self.assertRaises(OSError):
+            self.retrier.call(disk_full, host='h')
+        self.assertEqual(self.retrier.call(lambda: 'ok', host='h'), 'ok')
+        self.assertEqual(self.retrier.breaker('h').state, CircuitBreaker.CLOSED)
+
+    def test_probe_released_after_value_error(self):
+        self._open_circuit()
+
+        def bad_json():
+            raise ValueError('Expecting value')
+
+        with self.assertRaises(ValueError):
+            self.retrier.call(bad_json, host='h')
+        self.assertEqual(self.retrier.call(lambda: 'ok', host='h'), 'ok')
+
+    def test_failed_probe_reopens(self):
+        self._open_circuit()
+
+        def fail():
+            raise requests.ConnectionError('connection refused')
+
+        with self.assertRaises(requests.ConnectionError):
+            self.retrier.call(fail, host='h')
+        with self.assertRaises(CircuitOpenError):
+            self.retrier.call(lambda: 'ok', host='h')
+
+
+if __name__ == '__main__':
+    unittest.main()